@@ -0,0 +1,99 @@
+# backend/auth_cache.py
+# CACHÉ DE IDENTIDADES (PRINCIPALS) YA VERIFICADAS
+#
+# Cada request autenticado decodificaba el JWT y además buscaba al usuario en la base
+# de datos. Aquí se guarda, por token, una identidad mínima (id, email, activo, rol)
+# durante un TTL corto que nunca supera la expiración del propio token. Los cambios
+# de estado, perfil o la eliminación del usuario invalidan sus entradas al instante.
+#
+# Nota: la invalidación es local a cada proceso; en despliegues con varios workers
+# el TTL (PRINCIPAL_CACHE_TTL_SECONDS) acota cuánto puede tardar en propagarse.
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from config import settings
+import roles
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+    is_active: bool
+    is_admin: bool
+    role: str = roles.DEFAULT_ROLE
+
+    def can(self, permission: str) -> bool:
+        return roles.registry.has(self.role, permission)
+
+
+class PrincipalCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # token -> (principal, vence_en)
+        self._tokens_by_user = {}  # user_id -> {tokens}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _drop(self, token: str):
+        principal, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.id)
+        if tokens:
+            tokens.discard(token)
+            if not tokens: del self._tokens_by_user[principal.id]
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry[0]
+            if entry is not None: self._drop(token)
+            self.misses += 1
+            return None
+
+    def put(self, token: str, principal: Principal, token_exp: Optional[float] = None):
+        """Guarda la identidad; `token_exp` es el claim exp del JWT (segundos epoch)."""
+        ttl = self.ttl
+        if token_exp is not None: ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0: return
+        with self._lock:
+            if token in self._entries: self._drop(token)
+            self._entries[token] = (principal, time.monotonic() + ttl)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._drop(token)
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                # Cada acierto es una consulta de usuario que ya no llega a la base de datos.
+                "db_queries_saved": self.hits,
+                "db_queries_saved_per_request": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,99 @@
+# backend/benchmarks/bench_cotizacion_save.py
+# Latencia y número de sentencias SQL al guardar cotizaciones según la cantidad de
+# líneas. Compara la ruta anterior (dos commits, productos uno por uno, borrar y
+# reinsertar todo al editar) contra la actual (una transacción, inserción masiva,
+# edición por diferencias).
+#
+# Uso (desde backend/):  DATABASE_URL=postgresql://... python benchmarks/bench_cotizacion_save.py
+# Sin DATABASE_URL usa un SQLite temporal.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import event
+
+import crud, models, schemas, migrations, numbering
+from database import SessionLocal, engine
+
+statements = 0
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def legacy_create(db, cotizacion: schemas.CotizacionCreate, user_id: int):
+    db_cotizacion = models.Cotizacion(**cotizacion.model_dump(exclude={"productos"}), owner_id=user_id, numero_cotizacion=numbering.allocator.next_number(user_id))
+    db.add(db_cotizacion)
+    db.commit(); db.refresh(db_cotizacion)
+    for producto_data in cotizacion.productos:
+        db.add(models.Producto(**producto_data.model_dump(exclude={"id"}), cotizacion_id=db_cotizacion.id))
+    db.commit(); db.refresh(db_cotizacion)
+    return db_cotizacion
+
+def legacy_update(db, cotizacion_id: int, cotizacion_data: schemas.CotizacionCreate, owner_id: int):
+    db_cotizacion = crud.get_cotizacion_by_id(db, cotizacion_id=cotizacion_id, owner_id=owner_id)
+    for key, value in cotizacion_data.model_dump(exclude={"productos"}).items():
+        setattr(db_cotizacion, key, value)
+    db.query(models.Producto).filter(models.Producto.cotizacion_id == cotizacion_id).delete()
+    for producto_data in cotizacion_data.productos:
+        db.add(models.Producto(**producto_data.model_dump(exclude={"id"}), cotizacion_id=cotizacion_id))
+    db.commit(); db.refresh(db_cotizacion)
+    return db_cotizacion
+
+
+def payload(n: int) -> schemas.CotizacionCreate:
+    return schemas.CotizacionCreate(
+        nombre_cliente="Cliente", direccion_cliente="-", tipo_documento="DNI", nro_documento="12345678",
+        moneda="SOLES", monto_total=10.0 * n,
+        productos=[schemas.ProductoCreate(descripcion=f"Item {i}", unidades=1, precio_unitario=10.0, total=10.0) for i in range(n)],
+    )
+
+def edited(db_cotizacion) -> schemas.CotizacionCreate:
+    # Simula la edición típica: se cambia una sola línea.
+    productos = [schemas.ProductoCreate(id=p.id, descripcion=p.descripcion, unidades=p.unidades, precio_unitario=p.precio_unitario, total=p.total) for p in db_cotizacion.productos]
+    productos[0] = productos[0].model_copy(update={"unidades": 2})  # el total lo recalcula pricing.py
+    return payload(len(productos)).model_copy(update={"productos": productos})
+
+def measure(fn, repeat: int):
+    global statements
+    statements, start = 0, time.perf_counter()
+    for _ in range(repeat): fn()
+    return (time.perf_counter() - start) / repeat * 1000, statements / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    migrations.run_migrations(engine)
+    with SessionLocal() as db:
+        user = models.User(email=f"bench_{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user); db.commit(); user_id = user.id
+
+    print(f"{'líneas':>7} | {'crear antes':>16} {'crear ahora':>16} | {'editar antes':>16} {'editar ahora':>16}")
+    for n in (1, 10, 100, 500):
+        data = payload(n)
+        row = [f"{n:>7} |"]
+        for create in (legacy_create, crud.create_cotizacion):
+            with SessionLocal() as db:
+                ms, stmts = measure(lambda: create(db, data, user_id), args.repeat)
+            row.append(f"{ms:>8.1f}ms {stmts:>4.0f}q")
+        row.append("|")
+        for update in (legacy_update, crud.update_cotizacion):
+            with SessionLocal() as db:
+                db_cotizacion = crud.create_cotizacion(db, data, user_id)
+                ms, stmts = measure(lambda: update(db, db_cotizacion.id, edited(db_cotizacion), user_id), args.repeat)
+            row.append(f"{ms:>8.1f}ms {stmts:>4.0f}q")
+        print(" ".join(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# backend/benchmarks/bench_logo.py
+# Efecto del procesamiento de logos sobre el PDF: tamaño del archivo y tiempo de
+# render usando la foto original (como se guardaba antes) y la variante optimizada
+# de logo_pipeline. Se mide con plantilla fría (primer PDF del usuario o tras editar
+# el perfil, cuando ReportLab decodifica el logo) y con plantilla ya cacheada.
+#
+# Uso (desde backend/):  python benchmarks/bench_logo.py [--size 4032x3024] [--repeat 5]
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from PIL import Image
+
+import logo_pipeline, pdf_generator, storage
+from bench_pdf_template import make_cotizacion, make_user
+
+
+def phone_photo(width: int, height: int) -> bytes:
+    # Ruido con degradado: comprime mal, como una foto real de celular.
+    noise = Image.effect_noise((width, height), 64).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    output = io.BytesIO()
+    Image.blend(noise, gradient, 0.5).save(output, format="JPEG", quality=95)
+    return output.getvalue()
+
+def measure(user, cotizacion, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat): pdf = pdf_generator.create_pdf_buffer(cotizacion, user, pdf_generator.PdfTemplate(user)).getvalue()
+    cold = (time.perf_counter() - start) / repeat * 1000
+    pdf_generator.create_pdf_buffer(cotizacion, user)
+    start = time.perf_counter()
+    for _ in range(repeat): pdf_generator.create_pdf_buffer(cotizacion, user)
+    warm = (time.perf_counter() - start) / repeat * 1000
+    return len(pdf), cold, warm
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", default="4032x3024", help="ancho x alto de la foto original en px")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    os.chdir(tempfile.mkdtemp())
+
+    raw = phone_photo(*(int(v) for v in args.size.split("x")))
+    storage.get_backend().save(logo_pipeline.key_for("original.jpg"), raw)
+    start = time.perf_counter()
+    processed = logo_pipeline.process(raw)
+    process_ms = (time.perf_counter() - start) * 1000
+    optimized = logo_pipeline.save(1, processed)
+
+    print(f"logo original {len(raw) / 1024:.0f} KB -> optimizado {len(processed.content) / 1024:.0f} KB "
+          f"({processed.width}x{processed.height} px, procesado en {process_ms:.0f} ms)")
+    cotizacion = make_cotizacion(10)
+    print(f"{'logo':>11} {'PDF (KB)':>9} {'frío (ms)':>10} {'cacheado (ms)':>14}")
+    for label, filename in (("original", "original.jpg"), ("optimizado", optimized)):
+        size, cold, warm = measure(make_user(filename), cotizacion, args.repeat)
+        print(f"{label:>11} {size / 1024:>9.0f} {cold:>10.1f} {warm:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# backend/benchmarks/bench_pdf_memory.py
+# Memoria pico (tracemalloc) según la cantidad de líneas de la cotización, en los
+# dos lados del render:
+#   - worker: armar el PDF en un BytesIO y devolver los bytes (antes) o escribirlo en
+#     un archivo temporal (modo streaming, pdf_engine.render_pdf_file).
+#   - API: recibir los bytes del worker y armar la respuesta (antes) o leer el archivo
+#     en bloques de 64 KB (StreamingResponse con Content-Length).
+# ReportLab arma el documento completo antes de escribirlo, así que el pico del worker
+# baja poco; el ahorro está en el proceso de la API, que con el streaming queda acotado.
+#
+# Uso (desde backend/):  python benchmarks/bench_pdf_memory.py [--lines 50,500,2000,5000]
+
+import argparse
+import os
+import pickle
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.responses import Response
+
+import pdf_engine, pdf_generator
+from bench_pdf_template import make_cotizacion, make_user
+
+
+def peak_mb(fn):
+    tracemalloc.start()
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+def receive_buffered(payload: bytes):
+    # Lo que hacía la API: los bytes llegan del worker (pickle) y van enteros al cuerpo.
+    return len(Response(content=pickle.loads(payload), media_type="application/pdf").body)
+
+def receive_streamed(rendered: pdf_engine.RenderedFile):
+    return sum(len(chunk) for chunk in rendered.chunks())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", default="50,500,2000,5000")
+    args = parser.parse_args()
+    user = make_user(None)
+    pdf_generator.get_template(user)  # la plantilla cacheada no cuenta en las mediciones
+    print(f"{'líneas':>7} {'PDF (KB)':>9} | {'worker antes':>12} {'worker archivo':>14} | {'API antes':>10} {'API streaming':>13}  (MB pico)")
+    for n in (int(v) for v in args.lines.split(",")):
+        cotizacion = make_cotizacion(n)
+        data, worker_buffered = peak_mb(lambda: pdf_engine.render_pdf_bytes(cotizacion, user))
+        (path, size), worker_file = peak_mb(lambda: pdf_engine.render_pdf_file(cotizacion, user, ""))
+        payload = pickle.dumps(data); del data
+        _, api_buffered = peak_mb(lambda: receive_buffered(payload))
+        rendered = pdf_engine.RenderedFile(path=path, size=size)
+        _, api_streamed = peak_mb(lambda: receive_streamed(rendered))
+        rendered.discard()
+        print(f"{n:>7} {size / 1024:>9.0f} | {worker_buffered:>12.1f} {worker_file:>14.1f} | {api_buffered:>10.2f} {api_streamed:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
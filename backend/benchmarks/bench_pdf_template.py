@@ -0,0 +1,93 @@
+# backend/benchmarks/bench_pdf_template.py
+# Compara renders/segundo reconstruyendo la plantilla del usuario en cada PDF
+# (comportamiento anterior) contra la plantilla precompilada y cacheada.
+#
+# Uso (desde backend/):  python benchmarks/bench_pdf_template.py [--seconds 3]
+
+import argparse
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timezone
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pdf_generator, pricing
+from pdf_engine import CotizacionSnapshot, ProductoSnapshot, UserSnapshot
+
+
+def write_png(path: str, width: int, height: int):
+    # PNG RGB sin dependencias extra, del tamaño típico de una foto de celular reducida.
+    row = b"\x00" + bytes((x * 7) % 256 for x in range(width * 3))
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+                + chunk(b"IDAT", zlib.compress(row * height)) + chunk(b"IEND", b""))
+
+
+def make_user(logo_filename=None) -> UserSnapshot:
+    return UserSnapshot(
+        id=1, email="ventas@example.com", business_name="Negocio de Prueba SAC",
+        business_address="Av. Siempre Viva 742, Lima", business_ruc="20123456789",
+        business_phone="999 888 777", logo_filename=logo_filename, primary_color="#004aad",
+        pdf_note_1="TODO TRABAJO SE REALIZA CON EL 50% DE ADELANTO", pdf_note_1_color="#FF0000",
+        pdf_note_2="LOS PRECIOS NO INCLUYEN ENVIOS",
+        bank_accounts=[
+            {"banco": "BCP", "tipo_cuenta": "Cta Corriente", "moneda": "Soles", "cuenta": "191-1234567-0-01", "cci": "002-191-001234567001-55"},
+            {"banco": "Banco de la Nación", "moneda": "Soles", "cuenta": "00-000-123456", "cci": ""},
+        ],
+    )
+
+
+def make_cotizacion(n_productos: int) -> CotizacionSnapshot:
+    totals = pricing.engine.compute([(2, Decimal("59"))] * n_productos)
+    productos = tuple(
+        ProductoSnapshot(id=i, descripcion=f"Producto de prueba número {i}", unidades=2, precio_unitario=line.precio_unitario, total=line.total, igv=line.igv)
+        for i, line in enumerate(totals.lines)
+    )
+    return CotizacionSnapshot(
+        id=1, owner_id=1, numero_cotizacion="0001", nombre_cliente="Cliente de Prueba",
+        direccion_cliente="Jr. Los Olivos 123", tipo_documento="RUC", nro_documento="20987654321",
+        moneda="SOLES", monto_total=totals.monto_total, monto_igv=totals.monto_igv, monto_gravado=totals.monto_gravado,
+        fecha_creacion=datetime.now(timezone.utc), productos=productos,
+    )
+
+
+def renders_per_second(render, seconds: float) -> float:
+    render()  # calentamiento
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        render(); count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--logo-size", default="1200x600", help="ancho x alto del logo en px; 0 para no usar logo")
+    args = parser.parse_args()
+    # pdf_generator busca los logos en ./logos, así que trabajamos en un directorio temporal.
+    os.chdir(tempfile.mkdtemp())
+    logo_filename = None
+    if args.logo_size != "0":
+        os.makedirs("logos")
+        width, height = (int(v) for v in args.logo_size.split("x"))
+        logo_filename = "bench_logo.png"
+        write_png(os.path.join("logos", logo_filename), width, height)
+    user = make_user(logo_filename)
+    print(f"{'productos':>10} {'antes (r/s)':>12} {'después (r/s)':>14} {'mejora':>8}")
+    for n in (1, 10, 200):
+        cotizacion = make_cotizacion(n)
+        before = renders_per_second(lambda: pdf_generator.create_pdf_buffer(cotizacion, user, pdf_generator.PdfTemplate(user)), args.seconds)
+        after = renders_per_second(lambda: pdf_generator.create_pdf_buffer(cotizacion, user), args.seconds)
+        print(f"{n:>10} {before:>12.1f} {after:>14.1f} {after / before:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
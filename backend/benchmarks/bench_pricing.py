@@ -0,0 +1,56 @@
+# backend/benchmarks/bench_pricing.py
+# Costo del motor de precios en cotizaciones grandes: tiempo de pricing.compute por
+# cotización y por línea, comparado con el cálculo anterior en float (IGV por línea
+# como total * 18/118 más la suma de los totales), y el error que acumulaba el float.
+#
+# Uso (desde backend/):  python benchmarks/bench_pricing.py [--lines 100,1000,5000,20000] [--repeat 20]
+
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pricing
+
+
+def make_lines(n: int):
+    rng = random.Random(n)
+    return [(rng.randint(1, 50), Decimal(rng.randint(1, 500_000)) / 100) for _ in range(n)]
+
+def legacy_float(lines):
+    # Lo que hacían el frontend (totales) y pdf_generator (IGV) antes de pricing.py.
+    totals = [unidades * float(precio) for unidades, precio in lines]
+    igvs = [total * (18 / 118) for total in totals]
+    monto_total = sum(totals)
+    return monto_total, monto_total * (18 / 118), igvs
+
+def per_call_ms(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat): fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", default="100,1000,5000,20000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    engine = pricing.engine
+    print(f"{'líneas':>7} {'float (ms)':>11} {'Decimal (ms)':>13} {'µs/línea':>9} {'desvío float':>13}")
+    for n in (int(v) for v in args.lines.split(",")):
+        lines = make_lines(n)
+        legacy_ms = per_call_ms(lambda: legacy_float(lines), args.repeat)
+        exact_ms = per_call_ms(lambda: engine.compute(lines), args.repeat)
+        exact = engine.compute(lines)
+        drift = abs(Decimal(repr(legacy_float(lines)[0])) - exact.monto_total)
+        assert exact.monto_total == sum(line.total for line in exact.lines)
+        print(f"{n:>7} {legacy_ms:>11.2f} {exact_ms:>13.2f} {exact_ms * 1000 / n:>9.2f} {drift:>13.2E}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# backend/benchmarks/bench_search.py
+# Búsqueda de cotizaciones sobre un conjunto generado (por defecto 1M de productos
+# repartidos entre varios usuarios). Compara, para un usuario, lo que había antes
+# (LIKE '%término%' recorriendo sus cotizaciones y productos) con crud.search_cotizaciones:
+# en Postgres los índices GIN de pg_trgm y tsvector; en SQLite el índice en memoria,
+# primero en frío (incluye armarlo) y luego ya armado.
+#
+# Uso (desde backend/):  python benchmarks/bench_search.py [--productos 1000000] [--owners 50]
+#                        DATABASE_URL=postgresql://... python benchmarks/bench_search.py
+# Sin DATABASE_URL usa un SQLite temporal. Los datos se generan una vez por base (se
+# reutilizan si ya hay usuarios bench_search_*).
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import func, insert, or_, select
+
+import crud, models, schemas, migrations, search
+from database import SessionLocal, engine
+
+LINES_PER_QUOTE = 10
+BATCH = 20000
+WORDS = ("tornillo", "cemento", "tubo", "pvc", "cable", "codo", "llave", "pintura", "latex", "brocha", "clavo", "alambre",
+         "ladrillo", "arena", "fierro", "corrugado", "malla", "cinta", "aislante", "interruptor", "tomacorriente", "foco",
+         "led", "manguera", "valvula", "bisagra", "cerradura", "taladro", "broca", "lija", "sellador", "silicona", "yeso")
+NAMES = ("Constructora", "Ferretería", "Inversiones", "Servicios", "Comercial", "Distribuidora", "Grupo", "Corporación")
+SURNAMES = ("Pérez", "Quispe", "Rojas", "García", "Mamani", "Flores", "Huamán", "Torres", "Vargas", "Castillo", "Ramos")
+
+
+def description(rng: random.Random) -> str:
+    return " ".join(rng.sample(WORDS, 3)) + f" {rng.randint(1, 99)}mm"
+
+def generate(total_productos: int, owners: int, seed: int = 7):
+    rng = random.Random(seed)
+    quotes = total_productos // LINES_PER_QUOTE
+    with engine.begin() as conn:
+        owner_ids = [conn.execute(insert(models.User).values(email=f"bench_search_{i}@example.com", hashed_password="x").returning(models.User.id)).scalar_one() for i in range(owners)]
+        first_id = (conn.execute(select(func.max(models.Cotizacion.id))).scalar() or 0) + 1
+    start = time.perf_counter()
+    for offset in range(0, quotes, BATCH // LINES_PER_QUOTE):
+        count = min(BATCH // LINES_PER_QUOTE, quotes - offset)
+        ids = range(first_id + offset, first_id + offset + count)
+        cotizaciones = [{
+            "id": cid, "owner_id": owner_ids[cid % owners], "numero_cotizacion": f"B{cid:08d}",
+            "nombre_cliente": f"{rng.choice(NAMES)} {rng.choice(SURNAMES)} {rng.choice(SURNAMES)}", "direccion_cliente": "-",
+            "tipo_documento": "RUC", "nro_documento": f"20{rng.randint(0, 10**9 - 1):09d}", "moneda": "SOLES",
+            "monto_total": 0, "monto_igv": 0, "monto_gravado": 0,
+        } for cid in ids]
+        productos = [{"cotizacion_id": cid, "descripcion": description(rng), "unidades": 1, "precio_unitario": 1, "total": 1, "igv": 0}
+                     for cid in ids for _ in range(LINES_PER_QUOTE)]
+        with engine.begin() as conn:
+            conn.execute(insert(models.Cotizacion), cotizaciones)
+            conn.execute(insert(models.Producto), productos)
+        print(f"\r  {offset + count:>9} / {quotes} cotizaciones", end="", flush=True)
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn: conn.exec_driver_sql("ANALYZE cotizaciones; ANALYZE productos")
+    print(f"  ({time.perf_counter() - start:.0f} s)")
+
+def legacy_search(db, owner_id: int, term: str, limit: int):
+    # Sin índice utilizable: LIKE '%término%' sobre todas las cotizaciones y líneas del usuario.
+    C, P = models.Cotizacion, models.Producto
+    pattern = f"%{term}%"
+    lines = select(P.cotizacion_id).join(C, C.id == P.cotizacion_id).where(C.owner_id == owner_id, P.descripcion.ilike(pattern))
+    stmt = select(C.id).where(C.owner_id == owner_id, or_(C.nombre_cliente.ilike(pattern), C.nro_documento.ilike(pattern), C.id.in_(lines)))
+    return db.execute(stmt.order_by(C.id.desc()).limit(limit)).all()
+
+def queries(rng: random.Random, n: int):
+    typo = lambda w: w[:2] + w[3:] if len(w) > 4 else w
+    pool = [lambda: rng.choice(WORDS), lambda: typo(rng.choice(WORDS)), lambda: rng.choice(SURNAMES).lower(), lambda: f"20{rng.randint(10, 99)}"]
+    return [rng.choice(pool)() for _ in range(n)]
+
+def timed(fn, terms):
+    times, results = [], 0
+    for term in terms:
+        start = time.perf_counter()
+        results += len(fn(term))
+        times.append((time.perf_counter() - start) * 1000)
+    return times, results / len(terms)
+
+def report(label: str, times, avg_results: float):
+    times = sorted(times)
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    print(f"{label:<34} {statistics.median(times):>9.1f} {p95:>9.1f} {avg_results:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--productos", type=int, default=1_000_000)
+    parser.add_argument("--owners", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    migrations.run_migrations(engine)
+
+    with SessionLocal() as db:
+        owner_id = db.scalar(select(models.User.id).where(models.User.email == "bench_search_0@example.com"))
+    if owner_id is None:
+        print(f"Generando {args.productos} productos para {args.owners} usuarios...")
+        generate(args.productos, args.owners)
+        with SessionLocal() as db:
+            owner_id = db.scalar(select(models.User.id).where(models.User.email == "bench_search_0@example.com"))
+    with SessionLocal() as db:
+        total = db.scalar(select(func.count(models.Producto.id)))
+        own = db.scalar(select(func.count(models.Producto.id)).join(models.Cotizacion).where(models.Cotizacion.owner_id == owner_id))
+    print(f"{engine.dialect.name}: {total} productos en total, {own} del usuario medido\n")
+
+    terms = queries(random.Random(1), args.queries)
+    print(f"{'método':<34} {'p50 (ms)':>9} {'p95 (ms)':>9} {'resultados':>10}")
+    with SessionLocal() as db:
+        report("LIKE '%término%' (antes)", *timed(lambda t: legacy_search(db, owner_id, t, args.limit), terms))
+        run = lambda t: crud.search_cotizaciones(db, owner_id, schemas.CotizacionSearchQuery(q=t, limit=args.limit))
+        if engine.dialect.name == "postgresql":
+            report("pg_trgm + tsvector", *timed(run, terms))
+        else:
+            cold = []
+            for term in terms[:5]:
+                search.index_cache.invalidate_owner(owner_id)
+                cold.append(timed(run, [term]))
+            report("índice en memoria (frío)", [t for times, _ in cold for t in times], statistics.mean(r for _, r in cold))
+            report("índice en memoria (armado)", *timed(run, terms))
+    print(f"\n{search.index_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
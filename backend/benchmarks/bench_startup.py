@@ -0,0 +1,105 @@
+# backend/benchmarks/bench_startup.py
+# Mide el arranque en frío, cada vez en un proceso nuevo (como una instancia recién
+# creada por el autoescalado):
+#   - import: cuánto tarda `import main` y qué librerías pesadas quedan cargadas
+#     (ReportLab, Pillow, httpx, passlib, boto3 deberían cargarse recién al usarse);
+#   - primera respuesta: desde que se lanza `uvicorn main:app` hasta que responde el
+#     primer request (incluye el lifespan: migraciones y roles).
+#
+# Uso (desde backend/):  python benchmarks/bench_startup.py [--repeat 5] [--output startup.json]
+#                        DATABASE_URL=postgresql://... python benchmarks/bench_startup.py
+# Sin DATABASE_URL usa SQLite en memoria (DATABASE_URL=sqlite://), así que cada arranque
+# aplica todas las migraciones sobre una base vacía.
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("reportlab", "PIL", "httpx", "passlib", "requests", "boto3")
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def measure_import(env: dict) -> dict:
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND, env=env, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_seconds"] = time.perf_counter() - start  # incluye levantar el intérprete
+    return result
+
+def measure_first_response(env: dict, timeout: float = 60) -> float:
+    """Segundos desde lanzar uvicorn hasta la primera respuesta HTTP (cualquier código)."""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+                               cwd=BACKEND, env=env)
+    try:
+        while True:
+            if process.poll() is not None: raise RuntimeError("uvicorn terminó antes de responder")
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/users/me/", timeout=2)
+                break
+            except urllib.error.HTTPError:
+                break  # 401 sin token: la aplicación ya atiende requests
+            except OSError:
+                pass
+            if time.perf_counter() - start > timeout: raise RuntimeError("uvicorn no respondió a tiempo")
+            time.sleep(0.01)
+        return time.perf_counter() - start
+    finally:
+        process.terminate()
+        try: process.wait(timeout=15)
+        except subprocess.TimeoutExpired: process.kill()
+
+def summarize(samples) -> dict:
+    return {"min_ms": round(min(samples) * 1000, 1), "p50_ms": round(statistics.median(samples) * 1000, 1), "max_ms": round(max(samples) * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque en frío de la API.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="archivo JSON con los resultados")
+    args = parser.parse_args()
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    database = env["DATABASE_URL"].split(":", 1)[0]
+
+    imports = [measure_import(env) for _ in range(args.repeat)]
+    boots = [measure_first_response(env) for _ in range(args.repeat)]
+    loaded = sorted({module for result in imports for module in result["loaded"]})
+    report = {
+        "database": database, "repeat": args.repeat, "python": sys.version.split()[0],
+        "import_main": summarize([r["seconds"] for r in imports]),
+        "import_process": summarize([r["process_seconds"] for r in imports]),
+        "first_response": summarize(boots),
+        "heavy_modules_loaded": loaded,
+    }
+    print(f"base: {database}, {args.repeat} repeticiones\n")
+    print(f"{'medición':<34} {'mín ms':>9} {'p50 ms':>9} {'máx ms':>9}")
+    for name, label in (("import_main", "import main"), ("import_process", "proceso con import main"), ("first_response", "uvicorn hasta la 1.ª respuesta")):
+        print(f"{label:<34} {report[name]['min_ms']:>9} {report[name]['p50_ms']:>9} {report[name]['max_ms']:>9}")
+    print(f"\nlibrerías pesadas cargadas por import main: {', '.join(loaded) or 'ninguna'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
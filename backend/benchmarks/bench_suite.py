@@ -0,0 +1,273 @@
+# backend/benchmarks/bench_suite.py
+# SUITE DE BENCHMARKS REPRODUCIBLE, CON RESULTADOS EN JSON
+#
+#   1. Siembra la base con datos sintéticos (benchmarks/seed.py, semilla fija).
+#   2. Microbenchmarks de crud (crear, editar, listar, detalle, buscar, estadísticas)
+#      y de pdf_generator.create_pdf_buffer, con p50/p95/p99 y sentencias SQL por llamada.
+#   3. Prueba de carga HTTP: levanta uvicorn sobre la misma base y cada cliente virtual
+#      repite login → listado → crear → PDF; reporta throughput y p50/p95/p99 por paso.
+#
+# El JSON incluye el commit, la versión de Python, la base, la escala y los datos
+# sembrados, para comparar dos corridas con benchmarks/compare_results.py:
+#
+#   python benchmarks/bench_suite.py --output antes.json          (desde backend/)
+#   git checkout otra-rama && python benchmarks/bench_suite.py --output despues.json
+#   python benchmarks/compare_results.py antes.json despues.json
+#
+# Sin DATABASE_URL usa un SQLite temporal nuevo en cada corrida (lo más reproducible).
+# Con Postgres conviene una base recién creada: las corridas anteriores dejan cotizaciones.
+# BCRYPT_ROUNDS baja a 4 por defecto para que el login no tape al resto del escenario.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import httpx
+from sqlalchemy import event, select
+
+import crud, models, schemas, migrations, pdf_engine, pdf_generator
+from config import settings
+from database import SessionLocal, engine
+import seed
+
+SCHEMA_VERSION = 1
+WRITER_EMAIL = "bench_suite_writer@example.com"
+SEARCH_TERM = "tornillo"
+
+statements = 0
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def summarize(samples_ms, queries=None) -> dict:
+    """Resumen de una lista de latencias en ms (percentiles por rango más cercano)."""
+    ordered = sorted(samples_ms)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    result = {
+        "n": len(ordered), "mean_ms": round(statistics.fmean(ordered), 3), "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(pick(0.95), 3), "p99_ms": round(pick(0.99), 3), "min_ms": round(ordered[0], 3), "max_ms": round(ordered[-1], 3),
+        "ops_per_s": round(1000 * len(ordered) / sum(ordered), 2) if sum(ordered) else None,
+    }
+    if queries is not None: result["queries"] = round(queries, 2)
+    return result
+
+def timed(fn, iterations: int, warmup: int = 2) -> dict:
+    global statements
+    for _ in range(warmup): fn()
+    samples, statements = [], 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples, statements / iterations)
+
+
+# --- Microbenchmarks ---
+def quote_payload(lines: int, unidades: int = 1, ids=None) -> schemas.CotizacionCreate:
+    productos = [schemas.ProductoCreate(id=ids[i] if ids else None, descripcion=f"Producto de prueba {i}", unidades=unidades if i == 0 else 1, precio_unitario=12.5)
+                 for i in range(lines)]
+    return schemas.CotizacionCreate(nombre_cliente="Cliente Benchmark SAC", direccion_cliente="Av. Prueba 123", tipo_documento="RUC",
+                                    nro_documento="20123456789", moneda="SOLES", productos=productos)
+
+def in_session(fn):
+    # Una sesión nueva por llamada, como en cada request.
+    def call():
+        with SessionLocal() as db: return fn(db)
+    return call
+
+def writer_user_id() -> int:
+    """Usuario propio para las escrituras: no altera los datos sembrados y se borra al terminar."""
+    with SessionLocal() as db:
+        user = crud.get_user_by_email(db, WRITER_EMAIL)
+        if user is not None: crud.delete_user(db, user.id)
+        user = models.User(email=WRITER_EMAIL, hashed_password="x")
+        db.add(user); db.commit()
+        return user.id
+
+def run_micro(owner_id: int, iterations: int, log=print) -> dict:
+    writer = writer_user_id()
+    with SessionLocal() as db:
+        cotizacion_id = db.scalar(select(models.Cotizacion.id).where(models.Cotizacion.owner_id == owner_id).order_by(models.Cotizacion.id.desc()))
+        edited = crud.create_cotizacion(db, quote_payload(10), writer)
+        edited_id, line_ids = edited.id, [p.id for p in edited.productos]
+        long_quote = crud.create_cotizacion(db, quote_payload(100), writer)
+        snapshots = {lines: (pdf_engine.snapshot_cotizacion(crud.get_cotizacion_with_owner(db, cid)), pdf_engine.snapshot_user(crud.get_user_by_id(db, user)))
+                     for lines, cid, user in ((10, cotizacion_id, owner_id), (100, long_quote.id, writer))}
+    toggle = iter(range(10**9))
+    cases = {
+        "crud.create_cotizacion[10 lineas]": (in_session(lambda db: crud.create_cotizacion(db, quote_payload(10), writer)), iterations),
+        "crud.update_cotizacion[1 de 10 lineas]": (in_session(lambda db: crud.update_cotizacion(db, edited_id, quote_payload(10, 1 + next(toggle) % 2, line_ids), writer)), iterations),
+        "crud.get_cotizaciones_by_owner": (in_session(lambda db: crud.get_cotizaciones_by_owner(db, owner_id, schemas.CotizacionListQuery(limit=settings.COTIZACIONES_PAGE_SIZE))), iterations),
+        "crud.get_cotizacion_with_owner": (in_session(lambda db: crud.get_cotizacion_with_owner(db, cotizacion_id, owner_id)), iterations),
+        "crud.search_cotizaciones": (in_session(lambda db: crud.search_cotizaciones(db, owner_id, schemas.CotizacionSearchQuery(q=SEARCH_TERM, limit=settings.SEARCH_PAGE_SIZE))), iterations),
+        "crud.get_admin_dashboard_stats": (in_session(crud.get_admin_dashboard_stats), iterations),
+        "pdf_generator.create_pdf_buffer[10 lineas]": (lambda: pdf_generator.create_pdf_buffer(*snapshots[10]), max(5, iterations // 5)),
+        "pdf_generator.create_pdf_buffer[100 lineas]": (lambda: pdf_generator.create_pdf_buffer(*snapshots[100]), max(3, iterations // 10)),
+    }
+    results = {}
+    for name, (fn, n) in cases.items():
+        results[name] = timed(fn, n)
+        if log: log(f"{name:<46} {results[name]['p50_ms']:>9.2f} {results[name]['p95_ms']:>9.2f} {results[name]['p99_ms']:>9.2f} {results[name]['queries']:>6.1f}")
+    with SessionLocal() as db: crud.delete_user(db, writer)
+    return results
+
+
+# --- Prueba de carga HTTP ---
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@contextmanager
+def serve(timeout: float = 60):
+    """Levanta `uvicorn main:app` sobre la misma DATABASE_URL y espera a que responda."""
+    port = free_port()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+                               cwd=BACKEND, env=dict(os.environ))
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None: raise RuntimeError("uvicorn terminó antes de aceptar conexiones")
+            try:
+                if httpx.get(f"{url}/openapi.json", timeout=2).status_code == 200: break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline: raise RuntimeError("uvicorn no respondió a tiempo")
+            time.sleep(0.2)
+        yield url
+    finally:
+        process.terminate()
+        try: process.wait(timeout=15)
+        except subprocess.TimeoutExpired: process.kill()
+
+def load_payload(lines: int) -> dict:
+    return quote_payload(lines).model_dump(mode="json", exclude={"productos": {"__all__": {"id", "catalogo_item_id"}}})
+
+async def scenario(client: httpx.AsyncClient, email: str, iterations: int, lines: int, samples: dict, errors: dict):
+    """login → listado → crear → PDF, `iterations` veces. Un paso fallido corta esa vuelta."""
+    payload = load_payload(lines)
+
+    async def step(name, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            response = None
+        samples[name].append((time.perf_counter() - start) * 1000)
+        if response is None or response.status_code >= 400:
+            errors[name] = errors.get(name, 0) + 1
+            return None
+        return response
+
+    for _ in range(iterations):
+        response = await step("login", client.post("/token", data={"username": email, "password": seed.PASSWORD}))
+        if response is None: continue
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        if await step("list", client.get("/cotizaciones/", headers=headers)) is None: continue
+        response = await step("create", client.post("/cotizaciones/", json=payload, headers=headers))
+        if response is None: continue
+        await step("pdf", client.get(f"/cotizaciones/{response.json()['id']}/pdf", headers=headers))
+
+async def run_level(url: str, emails, concurrency: int, iterations: int, lines: int) -> dict:
+    samples, errors = {name: [] for name in ("login", "list", "create", "pdf")}, {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(scenario(client, emails[i % len(emails)], iterations, lines, samples, errors) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    requests = sum(len(s) for s in samples.values())
+    return {
+        "concurrency": concurrency, "iterations": iterations, "duration_s": round(elapsed, 3),
+        "scenarios_per_s": round(len(samples["pdf"]) / elapsed, 2), "requests_per_s": round(requests / elapsed, 2),
+        "requests": requests, "errors": errors,
+        "steps": {name: summarize(s) for name, s in samples.items() if s},
+    }
+
+def run_load(url: str, emails, levels, iterations: int, lines: int, log=print) -> dict:
+    # Una vuelta previa: arranca los workers de PDFs y llena las cachés de plantillas.
+    asyncio.run(run_level(url, emails, 1, 1, lines))
+    results = {}
+    for concurrency in levels:
+        result = results[f"c{concurrency}"] = asyncio.run(run_level(url, emails, concurrency, iterations, lines))
+        if log:
+            steps = " ".join(f"{name} {s['p50_ms']:.0f}/{s['p95_ms']:.0f}/{s['p99_ms']:.0f}" for name, s in result["steps"].items())
+            log(f"{concurrency:>8} {result['requests_per_s']:>8.1f} {result['scenarios_per_s']:>8.1f} {sum(result['errors'].values()):>7}  {steps}")
+    return results
+
+
+# --- Metadatos ---
+def git_info() -> dict:
+    def git(*args):
+        try: return subprocess.run(["git", *args], cwd=BACKEND, capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError): return ""
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", "."))}
+
+def metadata(args, scale) -> dict:
+    with engine.connect() as conn: dataset = seed.dataset_counts(conn)
+    return {
+        "schema": SCHEMA_VERSION, "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"), "git": git_info(),
+        "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+        "database": engine.dialect.name, "scale": dict(zip(("users", "quotes", "lines"), scale), name=args.scale, seed=args.seed),
+        "dataset": dataset,
+        "settings": {name: getattr(settings, name) for name in ("BCRYPT_ROUNDS", "PDF_RENDER_WORKERS", "PASSWORD_HASH_WORKERS", "DB_POOL_SIZE")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de crud, PDFs y prueba de carga HTTP, con resultados en JSON.")
+    parser.add_argument("--scale", choices=seed.SCALES, default="small")
+    parser.add_argument("--users", type=int); parser.add_argument("--quotes", type=int); parser.add_argument("--lines", type=int)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--only", choices=("micro", "load"), help="correr solo una parte")
+    parser.add_argument("--iterations", type=int, default=50, help="llamadas por microbenchmark (los PDFs usan menos)")
+    parser.add_argument("--concurrency", default="1,8,32", help="clientes virtuales de la prueba de carga, separados por comas")
+    parser.add_argument("--load-iterations", type=int, default=10, help="vueltas del escenario por cliente")
+    parser.add_argument("--url", help="servidor ya levantado sobre la misma base (si no, se levanta uvicorn)")
+    parser.add_argument("--output", help="archivo JSON (por defecto bench-<commit>.json)")
+    args = parser.parse_args()
+    users, quotes, lines = seed.SCALES[args.scale]
+    scale = (args.users or users, args.quotes or quotes, args.lines or lines)
+
+    migrations.run_migrations(engine)
+    print(f"Sembrando {scale[0]} usuarios x {scale[1]} cotizaciones x {scale[2]} líneas ({engine.dialect.name})...")
+    owner_ids = seed.seed(engine, *scale, seed=args.seed)
+    report = metadata(args, scale)
+
+    if args.only in (None, "micro"):
+        print(f"\n{'microbenchmark':<46} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'SQL':>6}")
+        report["micro"] = run_micro(owner_ids[0], args.iterations)
+    if args.only in (None, "load"):
+        levels = [int(c) for c in args.concurrency.split(",")]
+        emails = [seed.user_email(i) for i in range(len(owner_ids))]
+        print(f"\n{'clientes':>8} {'req/s':>8} {'esc/s':>8} {'errores':>7}  p50/p95/p99 ms por paso")
+        if args.url:
+            report["load"] = run_load(args.url, emails, levels, args.load_iterations, scale[2])
+        else:
+            with serve() as url: report["load"] = run_load(url, emails, levels, args.load_iterations, scale[2])
+
+    output = args.output or f"bench-{(report['git']['commit'] or 'local')[:10]}.json"
+    with open(output, "w", encoding="utf-8") as f: json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# backend/benchmarks/check_query_budget.py
+# Verifica cuántas sentencias SQL emite cada endpoint. Se prepara un usuario con
+# varias cotizaciones de varias líneas, así que una relación cargada de forma
+# perezosa (N+1) se nota como un exceso sobre el presupuesto. Termina con código 1
+# si algún endpoint lo supera; pensado para correrse antes de cada despliegue:
+#
+#   python benchmarks/check_query_budget.py            (SQLite en memoria)
+#   DATABASE_URL=postgresql://... python benchmarks/check_query_budget.py
+#
+# La identidad del usuario ya está en auth_cache al medir, de modo que los números
+# corresponden al caso común (token en caché).
+
+import os
+import sys
+import tempfile
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_workdir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("PDF_RENDER_WORKERS", "0")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("ADMIN_EMAIL", "budget-admin@example.com")
+os.makedirs(os.path.join(_workdir, "logos"), exist_ok=True)
+os.chdir(_workdir)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import database, main
+
+QUOTES = 5
+LINES = 4
+PASSWORD = "budget-password"
+
+# (método, ruta, máximo de sentencias). {cid} es una cotización del usuario y {uid} su id.
+BUDGETS = [
+    ("GET", "/users/me/", 1),
+    ("PUT", "/profile/", 2),
+    ("GET", "/cotizaciones/", 1),
+    ("GET", "/cotizaciones/search?q=Cliente", 3),  # SQLite: 2 para armar el índice en memoria + 1
+    ("GET", "/cotizaciones/{cid}", 2),
+    ("GET", "/cotizaciones/{cid}/pdf", 2),
+    ("POST", "/cotizaciones/", 6),
+    ("PUT", "/cotizaciones/{cid}", 6),
+    ("POST", "/cotizaciones/export", 3),
+    ("GET", "/catalogo/", 1),
+    ("POST", "/catalogo/", 1),
+    ("GET", "/catalogo/autocomplete?prefix=lin", 1),  # primera consulta: arma el índice
+    ("GET", "/admin/stats/", 1),
+    ("GET", "/admin/stats/trends/", 1),
+    ("GET", "/admin/users/", 1),
+    ("GET", "/admin/users/{uid}", 1),
+    ("GET", "/admin/users/{uid}/cotizaciones", 1),
+    ("GET", "/admin/cotizaciones/{cid}/pdf", 2),
+    ("PUT", "/admin/users/{uid}/status", 2),
+    ("DELETE", "/cotizaciones/{cid}", 5),
+    ("DELETE", "/admin/users/{uid}", 7),
+]
+
+
+def payload(lines: int) -> dict:
+    productos = [{"descripcion": f"Línea {i}", "unidades": 1, "precio_unitario": 10.0, "total": 10.0} for i in range(lines)]
+    return {"nombre_cliente": "Cliente", "direccion_cliente": "-", "tipo_documento": "DNI", "nro_documento": "12345678",
+            "moneda": "SOLES", "monto_total": 10.0 * lines, "productos": productos}
+
+def body_for(method: str, path: str):
+    if path == "/profile/": return {"business_name": "Negocio"}
+    if path == "/cotizaciones/export": return {"fecha_desde": "2000-01-01"}
+    if path == "/catalogo/": return {"descripcion": "Línea de catálogo", "precio_unitario": 10.0}
+    if path.endswith("/status"): return {"is_active": True}
+    if method in ("POST", "PUT"): return payload(LINES)
+    return None
+
+def login(client: TestClient, email: str) -> dict:
+    client.post("/users/", json={"email": email, "password": PASSWORD})
+    token = client.post("/token", data={"username": email, "password": PASSWORD}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get("/users/me/", headers=headers)  # deja la identidad en auth_cache
+    return headers
+
+
+def main_check() -> int:
+    statements = [0]
+    def count(*_): statements[0] += 1
+    for engine in {database.engine, database.async_engine.sync_engine}:
+        event.listen(engine, "before_cursor_execute", count)
+
+    # Con `with` corre el lifespan de la aplicación (migraciones y roles).
+    with TestClient(main.app) as client:
+        admin = login(client, main.settings.ADMIN_EMAIL)
+        user = login(client, f"budget_{uuid.uuid4().hex[:8]}@example.com")
+        ids = [client.post("/cotizaciones/", json=payload(LINES), headers=user).json()["id"] for _ in range(QUOTES)]
+        uid = client.get("/users/me/", headers=user).json()["id"]
+
+        failures = 0
+        print(f"{'endpoint':<44} {'consultas':>9} {'máximo':>7}")
+        for method, template, budget in BUDGETS:
+            is_admin = template.startswith("/admin/")
+            path = template.format(cid=ids[-1], uid=uid)
+            client.get("/users/me/", headers=admin if is_admin else user)  # un cambio anterior pudo invalidar auth_cache
+            statements[0] = 0
+            response = client.request(method, path, json=body_for(method, template), headers=admin if is_admin else user)
+            used = statements[0]
+            ok = response.status_code < 400 and used <= budget
+            failures += not ok
+            print(f"{method + ' ' + template:<44} {used:>9} {budget:>7}  {'ok' if ok else f'EXCEDIDO (HTTP {response.status_code})'}")
+        return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_check())
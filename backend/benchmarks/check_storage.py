@@ -0,0 +1,81 @@
+# backend/benchmarks/check_storage.py
+# Verifica que un backend de almacenamiento cumpla el contrato que usan los logos y
+# la caché de PDFs: guardar desde bytes, archivos e iterables, leer en bloques,
+# existencia, borrado (también por prefijo), URLs firmadas y la caché de bytes.
+# Termina con código 1 si algo falla.
+#
+#   python benchmarks/check_storage.py                       (directorio temporal)
+#   STORAGE_BACKEND=s3 S3_ENDPOINT_URL=http://127.0.0.1:9000 S3_BUCKET=pruebas \
+#   S3_ACCESS_KEY_ID=minioadmin S3_SECRET_ACCESS_KEY=minioadmin python benchmarks/check_storage.py
+#
+# Con S3 las claves se escriben bajo un prefijo aleatorio que se borra al terminar.
+
+import io
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("STORAGE_LOCAL_DIR", tempfile.mkdtemp())
+
+import storage
+
+BIG = os.urandom(3 * storage.CHUNK_SIZE + 123)  # obliga a leer/escribir en varios bloques
+
+
+def checks(backend, base: str):
+    yield "bytes", lambda: backend.save(f"{base}/a.bin", b"hola") or backend.read(f"{base}/a.bin") == b"hola"
+    yield "archivo (streaming)", lambda: backend.save(f"{base}/big.bin", io.BytesIO(BIG)) or backend.read(f"{base}/big.bin") == BIG
+    yield "iterable (streaming)", lambda: backend.save(f"{base}/it.bin", (BIG[i:i + 1000] for i in range(0, len(BIG), 1000))) or backend.read(f"{base}/it.bin") == BIG
+    yield "lectura en bloques", lambda: max(len(chunk) for chunk in backend.open(f"{base}/big.bin")) <= storage.CHUNK_SIZE
+    yield "sobrescribir", lambda: backend.save(f"{base}/a.bin", b"chau") or backend.read(f"{base}/a.bin") == b"chau"
+    yield "exists", lambda: backend.exists(f"{base}/a.bin") and not backend.exists(f"{base}/nada.bin")
+    yield "StorageNotFound", lambda: _raises(storage.StorageNotFound, backend.open, f"{base}/nada.bin")
+    yield "clave inválida", lambda: _raises(ValueError, backend.read, "../fuera.bin")
+    yield "delete", lambda: backend.delete(f"{base}/a.bin") or backend.delete(f"{base}/a.bin") or not backend.exists(f"{base}/a.bin")
+    yield "url firmada", lambda: _check_url(backend, f"{base}/it.bin")
+    yield "delete_prefix", lambda: backend.delete_prefix(base) or not (backend.exists(f"{base}/big.bin") or backend.exists(f"{base}/it.bin"))
+    yield "caché de bytes", lambda: _check_byte_cache(backend, f"{base}/logo.bin")
+
+def _raises(exc, fn, *args) -> bool:
+    try: fn(*args)
+    except exc: return True
+    return False
+
+def _check_url(backend, key: str) -> bool:
+    url = backend.url(key, expires_in=60)
+    if not backend.redirects:
+        # La URL local la sirve /files; aquí se comprueba la firma y su vencimiento.
+        query = dict(part.split("=") for part in url.split("?", 1)[1].split("&"))
+        return backend.verify(key, int(query["expires"]), query["signature"]) and not backend.verify(key, int(time.time()) - 1, query["signature"])
+    with urllib.request.urlopen(url, timeout=10) as response: return response.read() == BIG
+
+def _check_byte_cache(backend, key: str) -> bool:
+    backend.save(key, b"logo")
+    first = storage.read_cached(key)
+    backend.delete(key)  # la segunda lectura debe salir de memoria
+    return first == storage.read_cached(key) == b"logo" and storage.bytes_cache.stats()["hits"] >= 1
+
+
+def main() -> int:
+    backend = storage.get_backend()
+    base = f"check-storage/{uuid.uuid4().hex[:12]}"
+    print(f"backend: {type(backend).__name__}")
+    failures = 0
+    try:
+        for name, check in checks(backend, base):
+            try: ok, error = bool(check()), ""
+            except Exception as e: ok, error = False, f" ({type(e).__name__}: {e})"
+            failures += not ok
+            print(f"{name:<22} {'ok' if ok else 'FALLA' + error}")
+    finally:
+        backend.delete_prefix(base)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# backend/benchmarks/compare_results.py
+# Compara dos resultados de benchmarks/bench_suite.py (p. ej. antes y después de un
+# cambio) y termina con código 1 si hay regresiones:
+#   - microbenchmarks: p50 más lento que --threshold (por defecto 10 %), o más sentencias SQL;
+#   - prueba de carga: menos req/s o un p95 por paso más lento que --threshold, o más errores.
+#
+# Uso (desde backend/):  python benchmarks/compare_results.py antes.json despues.json [--threshold 0.1]
+# Con muestras chicas el ruido supera fácilmente el 10 %: comparar corridas de la misma
+# máquina y escala, y repetir ante una regresión dudosa.
+
+import argparse
+import json
+import sys
+
+
+def row(name: str, base, new, higher_is_better: bool, threshold: float, exact: bool = False):
+    """(línea de la tabla, ¿regresión?) para una métrica. Con exact cualquier empeoramiento cuenta."""
+    if base is None or new is None: return f"{name:<58} {'-':>10} {'-':>10}", False
+    worse_by = base - new if higher_is_better else new - base
+    limit = 0 if exact else threshold * abs(base)
+    regression, improvement = worse_by > limit, worse_by < -limit
+    delta = f"{(new - base) / base:>+8.1%}" if base else f"{'':>8}"
+    return f"{name:<58} {base:>10.2f} {new:>10.2f} {delta}  {'REGRESIÓN' if regression else 'mejora' if improvement else ''}", regression
+
+def compare(base: dict, new: dict, threshold: float):
+    lines, regressions = [], 0
+    def add(*args, **kwargs):
+        nonlocal regressions
+        line, regression = row(*args, threshold=threshold, **kwargs)
+        lines.append(line); regressions += regression
+
+    for name in sorted(set(base.get("micro", {})) | set(new.get("micro", {}))):
+        b, n = base.get("micro", {}).get(name, {}), new.get("micro", {}).get(name, {})
+        add(f"{name} p50 ms", b.get("p50_ms"), n.get("p50_ms"), higher_is_better=False)
+        add(f"{name} SQL", b.get("queries"), n.get("queries"), higher_is_better=False, exact=True)
+    for level in sorted(set(base.get("load", {})) | set(new.get("load", {})), key=lambda key: int(key.lstrip("c"))):
+        b, n = base.get("load", {}).get(level, {}), new.get("load", {}).get(level, {})
+        add(f"carga {level} req/s", b.get("requests_per_s"), n.get("requests_per_s"), higher_is_better=True)
+        add(f"carga {level} errores", sum(b.get("errors", {}).values()) if b else None, sum(n.get("errors", {}).values()) if n else None, higher_is_better=False, exact=True)
+        for step in sorted(set(b.get("steps", {})) | set(n.get("steps", {}))):
+            add(f"carga {level} {step} p95 ms", b.get("steps", {}).get(step, {}).get("p95_ms"), n.get("steps", {}).get(step, {}).get("p95_ms"), higher_is_better=False)
+    return lines, regressions
+
+def describe(report: dict) -> str:
+    git = report.get("git", {})
+    commit = (git.get("commit") or "?")[:10] + ("+cambios" if git.get("dirty") else "")
+    return f"{commit} {report.get('database')} {report.get('dataset')} ({report.get('created_at')})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dos resultados de bench_suite.py.")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="variación tolerada (0.10 = 10 %%)")
+    args = parser.parse_args()
+    with open(args.base, encoding="utf-8") as f: base = json.load(f)
+    with open(args.new, encoding="utf-8") as f: new = json.load(f)
+    print(f"base:  {describe(base)}\nnuevo: {describe(new)}")
+    if base.get("dataset") != new.get("dataset") or base.get("database") != new.get("database"):
+        print("Aviso: las corridas usan bases o datos distintos; la comparación es solo orientativa.")
+    lines, regressions = compare(base, new, args.threshold)
+    print(f"\n{'métrica':<58} {'base':>10} {'nuevo':>10} {'cambio':>8}")
+    print("\n".join(lines))
+    print(f"\n{regressions} regresiones (umbral {args.threshold:.0%})")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# backend/benchmarks/load_test_async.py
+# Prueba de carga de la API: latencia p50/p99 y throughput con 50, 200 y 1000
+# clientes concurrentes sobre el listado, el detalle de una cotización y /users/me/.
+# Cada cliente repite las peticiones en secuencia durante --requests vueltas.
+#
+# Para comparar la versión síncrona con la asíncrona, levantar ambas contra el mismo
+# Postgres local (p. ej. la anterior desde un `git worktree`) y pasar las dos URLs:
+#
+#   DATABASE_URL=postgresql://... uvicorn main:app --port 8000 --workers 1
+#   python benchmarks/load_test_async.py --url http://127.0.0.1:8000 --baseline-url http://127.0.0.1:8001
+#
+# Con una sola URL solo mide esa instancia.
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+PASSWORD = "loadtest-password"
+
+
+def payload(i: int) -> dict:
+    return {
+        "nombre_cliente": f"Cliente {i}", "direccion_cliente": "Av. Prueba 123", "tipo_documento": "RUC",
+        "nro_documento": f"20{i:09d}", "moneda": "SOLES", "monto_total": 100.0,
+        "productos": [{"descripcion": "Servicio", "unidades": 1, "precio_unitario": 100.0, "total": 100.0}],
+    }
+
+async def prepare(client: httpx.AsyncClient, quotes: int):
+    """Crea un usuario con algunas cotizaciones y devuelve sus cabeceras y un id de cotización."""
+    email = f"load_{uuid.uuid4().hex[:12]}@example.com"
+    (await client.post("/users/", json={"email": email, "password": PASSWORD})).raise_for_status()
+    token = (await client.post("/token", data={"username": email, "password": PASSWORD})).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = []
+    for i in range(quotes):
+        response = await client.post("/cotizaciones/", json=payload(i), headers=headers)
+        response.raise_for_status()
+        ids.append(response.json()["id"])
+    return headers, ids[0]
+
+async def run_level(base_url: str, concurrency: int, requests: int, quotes: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        headers, cotizacion_id = await prepare(client, quotes)
+        paths = ("/cotizaciones/", f"/cotizaciones/{cotizacion_id}", "/users/me/")
+        latencies, errors = [], 0
+
+        async def worker():
+            nonlocal errors
+            for i in range(requests):
+                start = time.perf_counter()
+                try:
+                    response = await client.get(paths[i % len(paths)], headers=headers)
+                    if response.status_code != 200: errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "rps": len(latencies) / elapsed,
+        "errors": errors,
+    }
+
+def fmt(result: dict) -> str:
+    return f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['rps']:>8.0f} {result['errors']:>6}"
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--baseline-url", help="Instancia de referencia (p. ej. la versión síncrona)")
+    parser.add_argument("--concurrency", default="50,200,1000", help="Niveles de concurrencia separados por comas")
+    parser.add_argument("--requests", type=int, default=20, help="Peticiones por cliente")
+    parser.add_argument("--quotes", type=int, default=20, help="Cotizaciones creadas para el usuario de prueba")
+    args = parser.parse_args()
+
+    targets = [("actual", args.url)] + ([("referencia", args.baseline_url)] if args.baseline_url else [])
+    header = " | ".join(f"{name:^33}" for name, _ in targets)
+    print(f"{'clientes':>8} | {header}")
+    print(f"{'':>8} | " + " | ".join(f"{'p50 ms':>8} {'p99 ms':>8} {'req/s':>8} {'errores':>6}" for _ in targets))
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        results = [await run_level(url, concurrency, args.requests, args.quotes) for _, url in targets]
+        print(f"{concurrency:>8} | " + " | ".join(fmt(r) for r in results))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
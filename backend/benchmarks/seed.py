@@ -0,0 +1,128 @@
+# backend/benchmarks/seed.py
+# DATOS SINTÉTICOS PARA BENCHMARKS: USUARIOS, COTIZACIONES Y PRODUCTOS
+#
+# Genera siempre los mismos datos para una misma semilla y escala (clientes,
+# descripciones, montos y fechas repartidas en los últimos 90 días), con inserciones
+# masivas y en lotes. Todos los usuarios comparten la contraseña PASSWORD, así que la
+# prueba de carga puede iniciar sesión con cualquiera de ellos. También deja listos los
+# acumulados diarios (rollups) y el contador de cotizaciones de cada usuario.
+#
+# Uso (desde backend/):  python benchmarks/seed.py --users 50 --quotes 200 --lines 10
+#                        DATABASE_URL=postgresql://... python benchmarks/seed.py --scale medium
+# Si la base ya tiene usuarios con el prefijo indicado no se vuelve a sembrar.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import delete, func, insert, select
+
+import models, password_hashing, pricing, rollups
+
+PASSWORD = "bench-password"
+PREFIX = "bench_suite"
+BATCH = 20000  # productos por transacción
+SCALES = {  # usuarios, cotizaciones por usuario, líneas por cotización
+    "small": (5, 40, 10),
+    "medium": (50, 200, 10),
+    "large": (200, 500, 10),
+}
+WORDS = ("tornillo", "cemento", "tubo", "pvc", "cable", "codo", "llave", "pintura", "latex", "brocha", "clavo", "alambre",
+         "ladrillo", "arena", "fierro", "corrugado", "malla", "cinta", "aislante", "interruptor", "tomacorriente", "foco")
+NAMES = ("Constructora", "Ferretería", "Inversiones", "Servicios", "Comercial", "Distribuidora", "Grupo", "Corporación")
+SURNAMES = ("Pérez", "Quispe", "Rojas", "García", "Mamani", "Flores", "Huamán", "Torres", "Vargas", "Castillo", "Ramos")
+
+
+def user_email(i: int, prefix: str = PREFIX) -> str:
+    return f"{prefix}_{i}@example.com"
+
+def seeded_user_ids(conn, prefix: str = PREFIX):
+    """Ids de los usuarios sembrados, en el orden en que se crearon."""
+    return conn.execute(select(models.User.id).where(models.User.email.like(f"{prefix}\\_%", escape="\\")).order_by(models.User.id)).scalars().all()
+
+def dataset_counts(conn) -> dict:
+    return {table: conn.execute(select(func.count()).select_from(getattr(models, model).__table__)).scalar()
+            for table, model in (("users", "User"), ("cotizaciones", "Cotizacion"), ("productos", "Producto"))}
+
+
+def seed(engine, users: int, quotes: int, lines: int, seed: int = 7, prefix: str = PREFIX, log=print):
+    """Siembra `users` usuarios con `quotes` cotizaciones de `lines` líneas cada uno. Devuelve sus ids."""
+    with engine.connect() as conn:
+        existing = seeded_user_ids(conn, prefix)
+    if existing:
+        if log: log(f"Ya hay {len(existing)} usuarios {prefix}_*: se reutilizan.")
+        return existing
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    hashed = password_hashing.hash_password(PASSWORD)  # un solo hash: bcrypt es caro a propósito
+    with engine.begin() as conn:
+        owner_ids = [conn.execute(insert(models.User).values(
+            email=user_email(i, prefix), hashed_password=hashed, business_name=f"{rng.choice(NAMES)} {rng.choice(SURNAMES)} SAC",
+            business_address="Av. Prueba 123, Lima", business_ruc=f"20{rng.randint(0, 10**9 - 1):09d}", cotizaciones_count=quotes,
+        ).returning(models.User.id)).scalar_one() for i in range(users)]
+        first_id = (conn.execute(select(func.max(models.Cotizacion.id))).scalar() or 0) + 1
+
+    total, per_batch, start = users * quotes, max(1, BATCH // max(lines, 1)), time.perf_counter()
+    daily = defaultdict(lambda: [0, Decimal(0)])  # (día, usuario, moneda) -> [cantidad, monto]
+    for offset in range(0, total, per_batch):
+        cotizaciones, productos = [], []
+        for cid in range(first_id + offset, first_id + min(offset + per_batch, total)):
+            owner_id = owner_ids[(cid - first_id) % users]
+            lineas = [(rng.randint(1, 20), Decimal(rng.randint(100, 50000)) / 100) for _ in range(lines)]
+            totals = pricing.engine.compute(lineas)
+            fecha = now - timedelta(days=rng.randint(0, 89), seconds=rng.randint(0, 86399))
+            moneda = "SOLES" if rng.random() < 0.8 else "DOLARES"
+            cotizaciones.append({
+                "id": cid, "owner_id": owner_id, "numero_cotizacion": f"{cid:04d}", "fecha_creacion": fecha,
+                "nombre_cliente": f"{rng.choice(NAMES)} {rng.choice(SURNAMES)} {rng.choice(SURNAMES)}", "direccion_cliente": "Jr. Los Olivos 456",
+                "tipo_documento": "RUC", "nro_documento": f"20{rng.randint(0, 10**9 - 1):09d}", "moneda": moneda,
+                "monto_total": totals.monto_total, "monto_igv": totals.monto_igv, "monto_gravado": totals.monto_gravado,
+            })
+            productos.extend({
+                "cotizacion_id": cid, "descripcion": " ".join(rng.sample(WORDS, 3)) + f" {rng.randint(1, 99)}mm",
+                "unidades": unidades, "precio_unitario": line.precio_unitario, "total": line.total, "igv": line.igv,
+            } for (unidades, _), line in zip(lineas, totals.lines))
+            group = daily[(rollups.day_of(fecha), owner_id, moneda)]
+            group[0] += 1; group[1] += totals.monto_total
+        with engine.begin() as conn:
+            conn.execute(insert(models.Cotizacion), cotizaciones)
+            if productos: conn.execute(insert(models.Producto), productos)
+        if log: print(f"\r  {offset + len(cotizaciones):>9} / {total} cotizaciones", end="", flush=True)
+    with engine.begin() as conn:
+        for (dia, owner_id, moneda), (count, monto) in daily.items():
+            conn.execute(rollups.upsert_statement(conn.dialect.name, datetime.combine(dia, datetime.min.time()), owner_id, moneda, count, monto))
+        # La numeración continúa desde el mayor número existente la próxima vez que se use.
+        conn.execute(delete(models.CotizacionSequence))
+        if conn.dialect.name == "postgresql": conn.exec_driver_sql("ANALYZE users; ANALYZE cotizaciones; ANALYZE productos")
+    if log: print(f"  ({time.perf_counter() - start:.1f} s)")
+    return owner_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Siembra datos sintéticos para los benchmarks.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--users", type=int, help="sobrescribe la escala")
+    parser.add_argument("--quotes", type=int, help="cotizaciones por usuario")
+    parser.add_argument("--lines", type=int, help="líneas por cotización")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--prefix", default=PREFIX)
+    args = parser.parse_args()
+    users, quotes, lines = SCALES[args.scale]
+    import migrations
+    from database import engine
+    migrations.run_migrations(engine)
+    seed(engine, args.users or users, args.quotes or quotes, args.lines or lines, args.seed, args.prefix)
+    with engine.connect() as conn: print(dataset_counts(conn))
+
+
+if __name__ == "__main__":
+    main()
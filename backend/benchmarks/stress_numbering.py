@@ -0,0 +1,97 @@
+# backend/benchmarks/stress_numbering.py
+# Prueba de estrés de la numeración: lanza cientos de creaciones de cotizaciones en
+# paralelo y verifica que no haya números repetidos, ni errores, ni ningún
+# IntegrityError en la base (es decir, ningún reintento). Corre dos veces sobre la
+# misma base: con hilos y crud.create_cotizacion (next_number) y con asyncio y
+# crud_async.create_cotizacion (next_number_async, el camino de los endpoints).
+# Conviene correrlo contra un Postgres local:
+#
+#   DATABASE_URL=postgresql://... python benchmarks/stress_numbering.py --creates 500 --threads 50
+#
+# Sin DATABASE_URL usa un SQLite temporal.
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/stress.db")
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+import crud, crud_async, models, schemas, migrations, numbering
+from database import AsyncSessionLocal, SessionLocal, async_engine, engine
+
+
+def run_sync(payload, owners, creates: int, threads: int):
+    def create(i: int):
+        with SessionLocal() as db:
+            owner_id = owners[i % len(owners)]
+            return owner_id, crud.create_cotizacion(db, payload, user_id=owner_id).numero_cotizacion
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(create, range(creates)))
+
+async def run_async(payload, owners, creates: int, concurrency: int):
+    limit = asyncio.Semaphore(concurrency)
+
+    async def create(i: int):
+        async with limit, AsyncSessionLocal() as db:
+            owner_id = owners[i % len(owners)]
+            return owner_id, (await crud_async.create_cotizacion(db, payload, user_id=owner_id)).numero_cotizacion
+
+    return await asyncio.gather(*(create(i) for i in range(creates)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--creates", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=50, help="hilos (síncrono) y corrutinas simultáneas (asíncrono)")
+    parser.add_argument("--owners", type=int, default=5)
+    args = parser.parse_args()
+
+    migrations.run_migrations(engine)
+    with SessionLocal() as db:
+        owners = []
+        for i in range(args.owners):
+            user = models.User(email=f"stress_{time.time_ns()}_{i}@example.com", hashed_password="x")
+            db.add(user); db.commit(); owners.append(user.id)
+
+    # Cualquier IntegrityError (número repetido, fila de secuencia creada dos veces)
+    # cuenta como reintento aunque el código lo haya absorbido.
+    integrity_errors = [0]
+    def on_error(context):
+        if isinstance(context.sqlalchemy_exception, IntegrityError): integrity_errors[0] += 1
+    for eng in (engine, async_engine.sync_engine):
+        event.listen(eng, "handle_error", on_error)
+
+    payload = schemas.CotizacionCreate(
+        nombre_cliente="Cliente", direccion_cliente="-", tipo_documento="DNI", nro_documento="12345678",
+        moneda="SOLES", monto_total=10.0,
+        productos=[schemas.ProductoCreate(descripcion="Item", unidades=1, precio_unitario=10.0, total=10.0)],
+    )
+    results = []
+    for name, run in (("síncrono", lambda: run_sync(payload, owners, args.creates, args.threads)),
+                      ("asíncrono", lambda: asyncio.run(run_async(payload, owners, args.creates, args.threads)))):
+        start = time.perf_counter()
+        batch = run()
+        elapsed = time.perf_counter() - start
+        results.extend(batch)
+        print(f"{name:<10} {len(batch)} cotizaciones en {elapsed:.2f}s ({len(batch) / elapsed:.1f}/s)")
+
+    # Con numeración global un mismo número no puede repetirse ni entre usuarios distintos.
+    keys = [numero for _, numero in results] if not numbering.allocator.per_owner else results
+    duplicates = [key for key, count in Counter(keys).items() if count > 1]
+    print(f"duplicados: {len(duplicates)}, IntegrityError: {integrity_errors[0]}")
+    assert not duplicates, f"Números duplicados: {duplicates[:10]}"
+    assert not integrity_errors[0], f"{integrity_errors[0]} IntegrityError (reintentos) durante la prueba"
+
+
+if __name__ == "__main__":
+    main()
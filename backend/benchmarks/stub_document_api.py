@@ -0,0 +1,69 @@
+# backend/benchmarks/stub_document_api.py
+# Servidor local que imita los endpoints de apis.net.pe usados en /consultar-documento.
+# Sirve para pruebas y pruebas de carga sin consumir la cuota real:
+#
+#   python benchmarks/stub_document_api.py --port 8765 --latency 0.2
+#   DOCUMENT_API_BASE_URL=http://127.0.0.1:8765/v2 API_TOKEN=stub uvicorn main:app
+#
+# Los números que terminan en 0 responden 404 (no encontrado) y los que terminan
+# en 9 responden 503, para probar el caché negativo y los reintentos.
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+calls = 0
+calls_lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        global calls
+        with calls_lock: calls += 1
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        numero = parse_qs(url.query).get("numero", [""])[0]
+        if numero.endswith("0"): return self._send(404, {"message": "not found"})
+        if numero.endswith("9"): return self._send(503, {"message": "unavailable"})
+        if url.path.endswith("/reniec/dni"):
+            return self._send(200, {"nombres": "JUAN", "apellidoPaterno": "PEREZ", "apellidoMaterno": f"STUB{numero[-3:]}"})
+        if url.path.endswith("/sunat/ruc"):
+            return self._send(200, {"razonSocial": f"EMPRESA {numero} S.A.C.", "direccion": "AV. STUB 123 - LIMA"})
+        self._send(404, {"message": "ruta desconocida"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int = 0, latency: float = 0.0) -> ThreadingHTTPServer:
+    """Levanta el stub en un hilo y devuelve el servidor (server.server_port tiene el puerto)."""
+    handler = type("Handler", (StubHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    server = serve(args.port, args.latency)
+    print(f"Stub escuchando en http://127.0.0.1:{server.server_port}/v2")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,160 @@
+# backend/catalog.py
+# CATÁLOGO DE PRODUCTOS POR USUARIO Y AUTOCOMPLETADO
+#
+# Cada cotización volvía a escribir sus líneas como texto libre, así que las mismas
+# descripciones y precios se repetían miles de veces en `productos` sin nada que las
+# relacione. Ahora cada usuario tiene un catálogo (catalogo_items) y una línea puede
+# indicar de qué producto del catálogo salió (productos.catalogo_item_id); la línea
+# conserva su propia descripción y precio, como una copia.
+#
+# Autocompletado: por usuario se arma en memoria una lista ordenada con el inicio de
+# cada palabra de cada descripción ("tornillo hex 1/2", "hex 1/2", "1/2"), y un
+# prefijo se resuelve con búsqueda binaria. El índice se arma la primera vez que se
+# consulta y se descarta al crear, editar o borrar productos del catálogo.
+#
+# Catálogos a partir de cotizaciones anteriores:  python catalog.py [--batch-size 5000]
+# Recorre los productos todavía sin catalogo_item_id, en lotes y cada lote en su propia
+# transacción: se puede interrumpir y volver a correr sin duplicar nada.
+
+import argparse
+import bisect
+import heapq
+import re
+import time
+import unicodedata
+from decimal import Decimal
+from typing import List, Optional, Sequence
+
+from sqlalchemy import bindparam, func, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import settings
+import models, search
+
+_COMBINING = re.compile(r"[\u0300-\u036f]")
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+MAX_SCAN = 5000  # entradas revisadas como máximo por consulta (prefijos de una letra en catálogos enormes)
+LOOKUP_CHUNK = 500  # pares (usuario, clave) por consulta al enlazar las líneas de un lote
+
+
+class DuplicateItem(Exception):
+    """Ya existe un producto con la misma descripción (normalizada) en el catálogo."""
+
+class UnknownItems(ValueError):
+    """Una línea hace referencia a un producto que no está en el catálogo del usuario."""
+
+
+def clave(descripcion: str) -> str:
+    """Descripción normalizada: sin tildes, sin mayúsculas y con espacios simples."""
+    text = _COMBINING.sub("", unicodedata.normalize("NFKD", descripcion or "")).casefold()
+    return " ".join(text.split())
+
+
+class AutocompleteIndex:
+    """Inicios de palabra de las descripciones de un catálogo, ordenados para buscar por prefijo."""
+
+    def __init__(self, items: Sequence):
+        # items: filas (id, descripcion, precio_unitario, uso_count)
+        self.items = {item.id: item for item in items}
+        entries = []
+        for item in items:
+            words = clave(item.descripcion).split(" ")
+            for position in range(len(words)):
+                entries.append((" ".join(words[position:]), position == 0, item.id))
+        entries.sort()
+        self.keys = [key for key, _, _ in entries]
+        self.entries = entries
+
+    def suggest(self, prefix: str, limit: int) -> List:
+        """
+        Productos cuya descripción, o alguna de sus palabras, empieza con `prefix`.
+        Primero los que coinciden desde el inicio; luego los más usados.
+        """
+        prefix = clave(prefix)
+        if not prefix: return []
+        best = {}
+        start = bisect.bisect_left(self.keys, prefix)
+        for key, at_start, item_id in self.entries[start:start + MAX_SCAN]:
+            if not key.startswith(prefix): break
+            best[item_id] = best.get(item_id, False) or at_start
+        items = self.items
+        ranked = heapq.nsmallest(limit, best.items(), key=lambda entry: (not entry[1], -items[entry[0]].uso_count, items[entry[0]].descripcion))
+        return [items[item_id] for item_id, _ in ranked]
+
+    def __len__(self):
+        return len(self.items)
+
+
+def items_statement(owner_id: int):
+    C = models.CatalogoItem
+    return select(C.id, C.descripcion, C.precio_unitario, C.uso_count).where(C.owner_id == owner_id)
+
+def upsert_statement(dialect_name: str):
+    """INSERT de productos del catálogo que, si la descripción ya existe, suma su uso y toma el último precio."""
+    table = models.CatalogoItem.__table__
+    stmt = _UPSERT_DIALECTS[dialect_name](table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.owner_id, table.c.clave],
+        set_={"uso_count": table.c.uso_count + stmt.excluded.uso_count, "precio_unitario": stmt.excluded.precio_unitario, "actualizado_en": func.now()},
+    )
+
+
+# --- Backfill: catálogos a partir de las líneas ya guardadas ---
+def backfill_batch(conn, after_id: int, batch_size: int, owner_id: Optional[int] = None):
+    """
+    Procesa un lote de productos sin catalogo_item_id con id > after_id: agrupa por
+    (usuario, clave), inserta o actualiza los productos del catálogo y enlaza las
+    líneas. Devuelve (último id procesado o None si no quedan, líneas enlazadas, usuarios).
+    """
+    P, C, I = models.Producto, models.Cotizacion, models.CatalogoItem
+    stmt = (select(P.id, P.descripcion, P.precio_unitario, C.owner_id).join(C, C.id == P.cotizacion_id)
+            .where(P.catalogo_item_id.is_(None), P.id > after_id).order_by(P.id).limit(batch_size))
+    if owner_id is not None: stmt = stmt.where(C.owner_id == owner_id)
+    rows = conn.execute(stmt).all()
+    if not rows: return None, 0, set()
+    groups = {}
+    for producto_id, descripcion, precio, row_owner in rows:
+        key = clave(descripcion)
+        if not key or row_owner is None: continue
+        group = groups.setdefault((row_owner, key), {"owner_id": row_owner, "clave": key, "uso_count": 0, "productos": []})
+        # Las líneas vienen por id ascendente: la última define descripción y precio.
+        group.update(descripcion=descripcion.strip(), precio_unitario=precio if precio is not None else Decimal(0))
+        group["uso_count"] += 1
+        group["productos"].append(producto_id)
+    if groups:
+        conn.execute(upsert_statement(conn.dialect.name), [{k: v for k, v in group.items() if k != "productos"} for group in groups.values()])
+        keys, ids = list(groups), {}
+        for i in range(0, len(keys), LOOKUP_CHUNK):
+            lookup = select(I.id, I.owner_id, I.clave).where(tuple_(I.owner_id, I.clave).in_(keys[i:i + LOOKUP_CHUNK]))
+            ids.update(((o, k), item_id) for item_id, o, k in conn.execute(lookup))
+        links = [{"pid": producto_id, "iid": ids[key]} for key, group in groups.items() for producto_id in group["productos"]]
+        conn.execute(update(P).where(P.id == bindparam("pid")).values(catalogo_item_id=bindparam("iid")), links)
+    return rows[-1].id, sum(len(group["productos"]) for group in groups.values()), {owner for owner, _ in groups}
+
+def backfill(engine, batch_size: int = None, owner_id: Optional[int] = None, log=print) -> dict:
+    """Arma o completa los catálogos con las líneas que todavía no tienen producto de catálogo."""
+    batch_size = batch_size or settings.CATALOG_BACKFILL_BATCH_SIZE
+    last_id, linked, batches, owners, start = 0, 0, 0, set(), time.perf_counter()
+    while True:
+        with engine.begin() as conn:
+            last_id, count, batch_owners = backfill_batch(conn, last_id, batch_size, owner_id)
+        if last_id is None: break
+        batches += 1; linked += count; owners |= batch_owners
+        for owner in batch_owners: index_cache.invalidate_owner(owner)
+        if log: log(f"lote {batches}: hasta el producto {last_id}, {linked} líneas enlazadas")
+    return {"batches": batches, "linked": linked, "owners": len(owners), "seconds": round(time.perf_counter() - start, 2)}
+
+
+index_cache = search.OwnerIndexCache(max_owners=settings.CATALOG_INDEX_MAX_OWNERS, ttl=settings.CATALOG_INDEX_TTL_SECONDS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arma los catálogos de productos a partir de las cotizaciones guardadas.")
+    parser.add_argument("--batch-size", type=int, default=settings.CATALOG_BACKFILL_BATCH_SIZE)
+    parser.add_argument("--owner", type=int, default=None, help="solo el catálogo de este usuario")
+    args = parser.parse_args()
+    import migrations
+    from database import engine, require_configured
+    require_configured()
+    migrations.run_migrations(engine)
+    print(backfill(engine, args.batch_size, args.owner))
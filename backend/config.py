@@ -18,19 +18,132 @@ class Settings(BaseSettings):
     Clase para gestionar la configuración de la aplicación.
     Carga las variables de entorno desde el archivo .env.
     """
-    # Configuración de la base de datos
+    # Configuración de la base de datos ("sqlite://" = SQLite en memoria, ver database.py)
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    # Réplica de solo lectura opcional para listados, PDFs y estadísticas
+    DATABASE_REPLICA_URL: str = os.getenv("DATABASE_REPLICA_URL", "")
+
+    # Pool de conexiones (ignorado con SQLite y con DB_PGBOUNCER=true)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 300))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_USE_LIFO: bool = os.getenv("DB_POOL_USE_LIFO", "true").lower() == "true"
+    DB_PGBOUNCER: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+    # Aplicar las migraciones pendientes al arrancar; false si el despliegue ya corre
+    # `python migrations.py` antes de levantar las instancias
+    RUN_MIGRATIONS_ON_STARTUP: bool = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() == "true"
 
     # Configuración de seguridad para JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "un_secreto_muy_seguro_por_defecto")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+    # Hash de contraseñas: costo de bcrypt y pool de procesos dedicado
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", 1))
+
+    # Límite de intentos fallidos de login (por cuenta y por IP) dentro de la ventana
+    LOGIN_MAX_FAILURES_PER_ACCOUNT: int = int(os.getenv("LOGIN_MAX_FAILURES_PER_ACCOUNT", 5))
+    LOGIN_MAX_FAILURES_PER_IP: int = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", 20))
+    LOGIN_THROTTLE_WINDOW_SECONDS: int = int(os.getenv("LOGIN_THROTTLE_WINDOW_SECONDS", 300))
+    # Cabecera con la IP real que pone el proxy de confianza (fly.io); vacía = usar la conexión
+    CLIENT_IP_HEADER: str = os.getenv("CLIENT_IP_HEADER", "Fly-Client-IP")
+
+    # Caché de identidades verificadas (evita buscar al usuario en cada request)
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", 10000))
+
     # Configuración de roles y APIs externas
     ADMIN_EMAIL: str = os.getenv("ADMIN_EMAIL", "")
     # --- CORRECCIÓN: Renombramos la variable para que coincida con el .env ---
     API_TOKEN: str = os.getenv("API_TOKEN", "")
 
+    # Consulta de DNI/RUC (apis.net.pe). La URL base se puede apuntar a un stub local.
+    DOCUMENT_API_BASE_URL: str = os.getenv("DOCUMENT_API_BASE_URL", "https://api.apis.net.pe/v2")
+    DOCUMENT_API_TIMEOUT_SECONDS: float = float(os.getenv("DOCUMENT_API_TIMEOUT_SECONDS", 5))
+    DOCUMENT_API_RETRIES: int = int(os.getenv("DOCUMENT_API_RETRIES", 2))
+    DOCUMENT_API_MAX_CONNECTIONS: int = int(os.getenv("DOCUMENT_API_MAX_CONNECTIONS", 20))
+    DOCUMENT_LOOKUP_TTL_SECONDS: int = int(os.getenv("DOCUMENT_LOOKUP_TTL_SECONDS", 7 * 24 * 3600))
+    DOCUMENT_LOOKUP_NEGATIVE_TTL_SECONDS: int = int(os.getenv("DOCUMENT_LOOKUP_NEGATIVE_TTL_SECONDS", 3600))
+    DOCUMENT_LOOKUP_MEMORY_ENTRIES: int = int(os.getenv("DOCUMENT_LOOKUP_MEMORY_ENTRIES", 5000))
+
+    # Numeración de cotizaciones: "global" o "owner" (una secuencia por usuario)
+    COTIZACION_NUMBER_SCOPE: str = os.getenv("COTIZACION_NUMBER_SCOPE", "global")
+    COTIZACION_NUMBER_BLOCK_SIZE: int = int(os.getenv("COTIZACION_NUMBER_BLOCK_SIZE", 1))
+
+    # Paginación de listados
+    COTIZACIONES_PAGE_SIZE: int = int(os.getenv("COTIZACIONES_PAGE_SIZE", 100))
+    COTIZACIONES_MAX_PAGE_SIZE: int = int(os.getenv("COTIZACIONES_MAX_PAGE_SIZE", 500))
+
+    # Búsqueda de cotizaciones (ver search.py)
+    SEARCH_PAGE_SIZE: int = int(os.getenv("SEARCH_PAGE_SIZE", 20))
+    SEARCH_MAX_PAGE_SIZE: int = int(os.getenv("SEARCH_MAX_PAGE_SIZE", 100))
+    SEARCH_TS_CONFIG: str = os.getenv("SEARCH_TS_CONFIG", "spanish")  # configuración de tsvector en Postgres
+    SEARCH_MIN_SIMILARITY: float = float(os.getenv("SEARCH_MIN_SIMILARITY", 0.6))  # índice en memoria (SQLite)
+    SEARCH_INDEX_MAX_OWNERS: int = int(os.getenv("SEARCH_INDEX_MAX_OWNERS", 256))
+    SEARCH_INDEX_TTL_SECONDS: float = float(os.getenv("SEARCH_INDEX_TTL_SECONDS", 300))
+
+    # Catálogo de productos y autocompletado (ver catalog.py)
+    CATALOG_AUTOCOMPLETE_LIMIT: int = int(os.getenv("CATALOG_AUTOCOMPLETE_LIMIT", 10))
+    CATALOG_AUTOCOMPLETE_MAX_LIMIT: int = int(os.getenv("CATALOG_AUTOCOMPLETE_MAX_LIMIT", 50))
+    CATALOG_INDEX_MAX_OWNERS: int = int(os.getenv("CATALOG_INDEX_MAX_OWNERS", 256))
+    CATALOG_INDEX_TTL_SECONDS: float = float(os.getenv("CATALOG_INDEX_TTL_SECONDS", 300))
+    CATALOG_BACKFILL_BATCH_SIZE: int = int(os.getenv("CATALOG_BACKFILL_BATCH_SIZE", 5000))
+
+    # Métricas (ver metrics.py): /metrics en formato Prometheus y cabecera Server-Timing opcional.
+    # Desactivadas por defecto: exponen tráfico por ruta y detalles internos de la base.
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")  # /metrics exige "Authorization: Bearer <token>"; definirlo siempre fuera de desarrollo
+    METRICS_SLOW_QUERY_MS: float = float(os.getenv("METRICS_SLOW_QUERY_MS", 200))  # 0 = no registrar consultas lentas
+    METRICS_SERVER_TIMING: bool = os.getenv("METRICS_SERVER_TIMING", "false").lower() == "true"
+
+    # Caché de PDFs generados (memoria LRU + prefijo opcional en el almacenamiento de archivos)
+    PDF_CACHE_MAX_ENTRIES: int = int(os.getenv("PDF_CACHE_MAX_ENTRIES", 256))
+    PDF_CACHE_MAX_BYTES: int = int(os.getenv("PDF_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    PDF_CACHE_DIR: str = os.getenv("PDF_CACHE_DIR", "")
+
+    # Motor de renderizado de PDFs (0 workers = renderizar en el threadpool)
+    PDF_RENDER_WORKERS: int = int(os.getenv("PDF_RENDER_WORKERS", 2))
+    PDF_RENDER_MAX_PENDING: int = int(os.getenv("PDF_RENDER_MAX_PENDING", 16))
+    PDF_RENDER_TIMEOUT_SECONDS: float = float(os.getenv("PDF_RENDER_TIMEOUT_SECONDS", 30))
+    PDF_RENDER_RETRY_AFTER_SECONDS: int = int(os.getenv("PDF_RENDER_RETRY_AFTER_SECONDS", 5))
+    PDF_EXPORT_CONCURRENCY: int = int(os.getenv("PDF_EXPORT_CONCURRENCY", 4))
+    PDF_EXPORT_MAX_COTIZACIONES: int = int(os.getenv("PDF_EXPORT_MAX_COTIZACIONES", 2000))
+    # Cuánto espera cada PDF de una exportación a que la cola del motor tenga lugar
+    PDF_EXPORT_QUEUE_WAIT_SECONDS: float = float(os.getenv("PDF_EXPORT_QUEUE_WAIT_SECONDS", 60))
+    # Desde cuántas líneas el PDF se genera en un archivo temporal y se envía en bloques (0 = nunca)
+    PDF_STREAM_MIN_LINES: int = int(os.getenv("PDF_STREAM_MIN_LINES", 200))
+    PDF_STREAM_TMP_DIR: str = os.getenv("PDF_STREAM_TMP_DIR", "")
+
+    # Logos: tamaño máximo de la subida y resolución de la variante optimizada
+    LOGO_MAX_UPLOAD_BYTES: int = int(os.getenv("LOGO_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+    LOGO_RENDER_DPI: int = int(os.getenv("LOGO_RENDER_DPI", 300))
+    LOGO_JPEG_QUALITY: int = int(os.getenv("LOGO_JPEG_QUALITY", 85))
+
+    # Cálculo de totales e IGV (ver pricing.py)
+    PRICING_IGV_RATE: str = os.getenv("PRICING_IGV_RATE", "0.18")
+    PRICING_PRICES_INCLUDE_IGV: bool = os.getenv("PRICING_PRICES_INCLUDE_IGV", "true").lower() == "true"
+    PRICING_DECIMALS: int = int(os.getenv("PRICING_DECIMALS", 2))
+    PRICING_ROUNDING: str = os.getenv("PRICING_ROUNDING", "half_up")
+    PRICING_IGV_ROUNDING: str = os.getenv("PRICING_IGV_ROUNDING", "total")  # "total" o "line"
+
+    # Almacenamiento de archivos: "local" (directorio) o "s3" (AWS, MinIO u otro compatible)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    STORAGE_LOCAL_DIR: str = os.getenv("STORAGE_LOCAL_DIR", ".")
+    STORAGE_URL_TTL_SECONDS: int = int(os.getenv("STORAGE_URL_TTL_SECONDS", 3600))
+    STORAGE_MAX_CONNECTIONS: int = int(os.getenv("STORAGE_MAX_CONNECTIONS", 20))
+    STORAGE_BYTE_CACHE_MAX_BYTES: int = int(os.getenv("STORAGE_BYTE_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_PREFIX: str = os.getenv("S3_PREFIX", "")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")  # p. ej. http://localhost:9000 para MinIO
+    S3_REGION: str = os.getenv("S3_REGION", "")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -38,6 +151,5 @@ class Settings(BaseSettings):
 # Creamos una instancia única de la configuración para ser importada en otros módulos
 settings = Settings()
 
-# Verificación para asegurarnos de que las variables críticas se cargaron
-if not settings.DATABASE_URL:
-    raise ValueError("No se encontró la DATABASE_URL. Asegúrate de que esté definida en tu archivo backend/.env")
+# DATABASE_URL ya no se verifica aquí: importar la configuración no debe fallar (scripts,
+# herramientas, workers). La aplicación la exige al arrancar (database.require_configured).
@@ -1,121 +1,402 @@
 # backend/crud.py
 # CORREGIDO: Se ha solucionado un error de variable no definida.
 
-from sqlalchemy.orm import Session, noload, subqueryload
-from sqlalchemy import func, case
-from datetime import datetime, timedelta
-import models, schemas, security
+from sqlalchemy.orm import Session, noload, joinedload, selectinload
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, case, insert, delete, update, select, or_, and_
+from datetime import date, datetime, timedelta, timezone
+import base64, binascii, json
+from typing import List, Optional
+import models, schemas, pdf_cache, numbering, auth_cache, rollups, roles, pricing, search, catalog
+
+# --- Estrategias de carga por endpoint ---
+# Cada lectura declara qué relaciones necesita su respuesta, para que nada se cargue
+# de forma perezosa al serializar (N+1). Las usan crud.py y crud_async.py; los
+# presupuestos de consultas por endpoint se verifican con benchmarks/check_query_budget.py.
+USER_ONLY = (noload(models.User.cotizaciones),)  # perfil, autenticación y vistas de admin
+COTIZACION_DETAIL = (selectinload(models.Cotizacion.productos),)
+# PDF: el dueño (muchos a uno) viene en el mismo SELECT y los productos en uno más.
+COTIZACION_WITH_OWNER = (selectinload(models.Cotizacion.productos), joinedload(models.Cotizacion.owner).noload(models.User.cotizaciones))
+# Borrado de una cuenta: el cascade necesita todas sus cotizaciones y productos.
+USER_WITH_COTIZACIONES = (selectinload(models.User.cotizaciones).selectinload(models.Cotizacion.productos),)
+
+def user_statement(*criteria, options=USER_ONLY):
+    return select(models.User).options(*options).where(*criteria)
+
+def cotizacion_statement(cotizacion_id: int, owner_id: Optional[int] = None, options=COTIZACION_DETAIL):
+    stmt = select(models.Cotizacion).options(*options).where(models.Cotizacion.id == cotizacion_id)
+    if owner_id is not None: stmt = stmt.where(models.Cotizacion.owner_id == owner_id)
+    return stmt
 
 # --- Funciones de Usuario (sin cambios) ---
 def get_user_by_email(db: Session, email: str):
-    return db.query(models.User)\
-        .options(noload(models.User.cotizaciones))\
-        .filter(models.User.email == email).first()
+    return db.scalar(user_statement(models.User.email == email))
+
+def get_user_by_id(db: Session, user_id: int):
+    return db.scalar(user_statement(models.User.id == user_id))
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = security.pwd_context.hash(user.password)
-    db_user = models.User(email=user.email, hashed_password=hashed_password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
+    # El hash se calcula antes, en el pool de password_hashing, fuera de los workers.
+    role = roles.role_for_email(user.email)
+    db_user = models.User(email=user.email, hashed_password=hashed_password, role=role, is_admin=role == roles.ADMIN_ROLE)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user_by_email(db, email=email)
-    if not user: return None
-    if not security.verify_password(password, user.hashed_password): return None
-    return user
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.query(models.User).filter(models.User.id == user_id).update({models.User.hashed_password: hashed_password})
+    db.commit()
+
+# --- Funciones de Cotización ---
+# Los importes que envía el cliente (total y monto_total) se ignoran: pricing.py los
+# recalcula una vez por petición y el resultado se usa para la cabecera y las líneas.
+def price_cotizacion(cotizacion: schemas.CotizacionCreate) -> pricing.QuoteTotals:
+    return pricing.engine.compute((p.unidades, p.precio_unitario) for p in cotizacion.productos)
+
+def cotizacion_values(cotizacion: schemas.CotizacionCreate, totals: pricing.QuoteTotals) -> dict:
+    return {**cotizacion.model_dump(exclude={"productos", "monto_total"}), "monto_total": totals.monto_total, "monto_igv": totals.monto_igv, "monto_gravado": totals.monto_gravado}
+
+def producto_values(producto_data: schemas.ProductoCreate, line: pricing.LineTotals) -> dict:
+    return {**producto_data.model_dump(exclude={"id", "total"}), "precio_unitario": line.precio_unitario, "total": line.total, "igv": line.igv}
+
+def new_cotizacion(cotizacion: schemas.CotizacionCreate, totals: pricing.QuoteTotals, user_id: int, numero_cotizacion: str) -> models.Cotizacion:
+    # La fecha se fija aquí (UTC) para que el resumen diario use el mismo día que la cotización.
+    return models.Cotizacion(**cotizacion_values(cotizacion, totals), owner_id=user_id, numero_cotizacion=numero_cotizacion, fecha_creacion=datetime.now(timezone.utc))
+
+def producto_rows(productos_data: List[schemas.ProductoCreate], totals: pricing.QuoteTotals, cotizacion_id: int) -> List[dict]:
+    return [{**producto_values(producto_data, line), "cotizacion_id": cotizacion_id} for producto_data, line in zip(productos_data, totals.lines)]
+
+def productos_statement(cotizacion_id: int):
+    return select(models.Producto).where(models.Producto.cotizacion_id == cotizacion_id).order_by(models.Producto.id)
+
+def delete_cotizacion_statements(cotizacion_id: int):
+    # Borrado en bloque: no hace falta cargar los productos para que el cascade los elimine.
+    return (
+        delete(models.Producto).where(models.Producto.cotizacion_id == cotizacion_id).execution_options(synchronize_session=False),
+        delete(models.Cotizacion).where(models.Cotizacion.id == cotizacion_id).execution_options(synchronize_session=False),
+    )
 
-# --- Funciones de Cotización (sin cambios) ---
-def get_next_cotizacion_number(db: Session):
-    last_cotizacion = db.query(models.Cotizacion).order_by(models.Cotizacion.id.desc()).first()
-    if not last_cotizacion or not last_cotizacion.numero_cotizacion: return "0001"
-    last_num = int(last_cotizacion.numero_cotizacion)
-    return f"{last_num + 1:04d}"
+def cotizaciones_count_delta(user_id: int, delta: int):
+    return update(models.User).where(models.User.id == user_id).values(cotizaciones_count=models.User.cotizaciones_count + delta)
+
+# Líneas tomadas del catálogo: se verifica que los productos sean del usuario y se
+# suma uno a su contador de uso (solo por las referencias nuevas de la cotización).
+def catalogo_item_ids(productos_data: List[schemas.ProductoCreate], already=()) -> set:
+    return {p.catalogo_item_id for p in productos_data if p.catalogo_item_id is not None} - set(already)
+
+def owned_catalogo_items_statement(owner_id: int, item_ids):
+    return select(models.CatalogoItem.id).where(models.CatalogoItem.owner_id == owner_id, models.CatalogoItem.id.in_(item_ids))
+
+def check_catalogo_items(item_ids: set, found):
+    missing = item_ids - set(found)
+    if missing: raise catalog.UnknownItems(f"Productos de catálogo no encontrados: {', '.join(map(str, sorted(missing)))}")
+
+def catalogo_usage_statement(item_ids):
+    return update(models.CatalogoItem).where(models.CatalogoItem.id.in_(item_ids)).values(uso_count=models.CatalogoItem.uso_count + 1)
+
+def use_catalogo_items(db: Session, owner_id: int, productos_data: List[schemas.ProductoCreate], already=()):
+    item_ids = catalogo_item_ids(productos_data, already)
+    if not item_ids: return
+    check_catalogo_items(item_ids, db.scalars(owned_catalogo_items_statement(owner_id, item_ids)).all())
+    db.execute(catalogo_usage_statement(item_ids))
 
 def create_cotizacion(db: Session, cotizacion: schemas.CotizacionCreate, user_id: int):
-    numero_cotizacion = get_next_cotizacion_number(db)
-    db_cotizacion = models.Cotizacion(**cotizacion.model_dump(exclude={"productos"}), owner_id=user_id, numero_cotizacion=numero_cotizacion)
-    db.add(db_cotizacion)
-    db.commit(); db.refresh(db_cotizacion)
-    for producto_data in cotizacion.productos:
-        db.add(models.Producto(**producto_data.model_dump(), cotizacion_id=db_cotizacion.id))
+    totals = price_cotizacion(cotizacion)
+    db_cotizacion = new_cotizacion(cotizacion, totals, user_id, numbering.allocator.next_number(user_id))
+    # Después de reservar el número: la reserva usa su propia conexión y en SQLite
+    # quedaría bloqueada por la escritura pendiente de esta sesión.
+    use_catalogo_items(db, user_id, cotizacion.productos)
+    # Una sola transacción: INSERT ... RETURNING de la cabecera y un executemany con
+    # todos los productos, en lugar de un INSERT por producto y dos commits.
+    db.add(db_cotizacion); db.flush()
+    db.execute(insert(models.Producto), producto_rows(cotizacion.productos, totals, db_cotizacion.id))
+    rollups.record_cotizacion(db, db_cotizacion)
+    db.execute(cotizaciones_count_delta(user_id, 1))
     db.commit(); db.refresh(db_cotizacion)
+    search.index_cache.invalidate_owner(user_id)
     return db_cotizacion
 
-def get_cotizaciones_by_owner(db: Session, owner_id: int):
-    return db.query(models.Cotizacion).options(noload(models.Cotizacion.productos)).filter(models.Cotizacion.owner_id == owner_id).order_by(models.Cotizacion.id.desc()).all()
+COTIZACION_LIST_FIELDS = tuple(schemas.CotizacionInList.model_fields)
+
+def cotizaciones_page_statement(owner_id: int, params: schemas.CotizacionListQuery):
+    """
+    Página de cotizaciones (id descendente) con una fila de más para saber si hay otra.
+    Solo se consultan las columnas pedidas; el id siempre se incluye porque es el cursor.
+    """
+    fields = ["id"] + [f for f in (params.fields or COTIZACION_LIST_FIELDS) if f != "id"]
+    stmt = select(*(getattr(models.Cotizacion, f) for f in fields)).where(models.Cotizacion.owner_id == owner_id)
+    if params.cursor is not None: stmt = stmt.where(models.Cotizacion.id < params.cursor)
+    if params.fecha_desde: stmt = stmt.where(models.Cotizacion.fecha_creacion >= params.fecha_desde)
+    if params.fecha_hasta: stmt = stmt.where(models.Cotizacion.fecha_creacion < params.fecha_hasta + timedelta(days=1))
+    if params.moneda: stmt = stmt.where(models.Cotizacion.moneda == params.moneda)
+    if params.monto_min is not None: stmt = stmt.where(models.Cotizacion.monto_total >= params.monto_min)
+    if params.monto_max is not None: stmt = stmt.where(models.Cotizacion.monto_total <= params.monto_max)
+    if params.cliente:
+        pattern = f"%{params.cliente}%"
+        stmt = stmt.where(or_(models.Cotizacion.nombre_cliente.ilike(pattern), models.Cotizacion.nro_documento.ilike(pattern)))
+    return stmt.order_by(models.Cotizacion.id.desc()).limit(params.limit + 1)
+
+def split_page(rows, limit: int, cursor_for):
+    """Separa la fila extra pedida por *_page_statement y calcula el cursor siguiente."""
+    next_cursor = cursor_for(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def get_cotizaciones_by_owner(db: Session, owner_id: int, params: schemas.CotizacionListQuery):
+    """Devuelve una página de cotizaciones y el cursor (id) de la siguiente."""
+    rows = db.execute(cotizaciones_page_statement(owner_id, params)).all()
+    return split_page(rows, params.limit, lambda row: row.id)
+
+def cotizaciones_export_statement(owner_id: int, export: schemas.CotizacionExportRequest, limit: int):
+    # Una consulta para las cotizaciones y otra (selectinload) para todos sus productos.
+    stmt = select(models.Cotizacion).options(selectinload(models.Cotizacion.productos)).where(models.Cotizacion.owner_id == owner_id)
+    if export.ids: stmt = stmt.where(models.Cotizacion.id.in_(export.ids))
+    if export.fecha_desde: stmt = stmt.where(models.Cotizacion.fecha_creacion >= export.fecha_desde)
+    if export.fecha_hasta: stmt = stmt.where(models.Cotizacion.fecha_creacion < export.fecha_hasta + timedelta(days=1))
+    return stmt.order_by(models.Cotizacion.id).limit(limit)
+
+def get_cotizaciones_for_export(db: Session, owner_id: int, export: schemas.CotizacionExportRequest, limit: int):
+    return db.scalars(cotizaciones_export_statement(owner_id, export, limit)).all()
+
+def search_cotizaciones(db: Session, owner_id: int, params: schemas.CotizacionSearchQuery):
+    """Cotizaciones del usuario que coinciden con params.q, de la más a la menos relevante (ver search.py)."""
+    if db.get_bind().dialect.name == "postgresql": return db.execute(search.postgres_statement(owner_id, params.q, params.limit)).all()
+    index = search.index_cache.get(owner_id)
+    if index is None:
+        generation = search.index_cache.generation(owner_id)
+        index = search.OwnerIndex(search.owner_texts(*(db.execute(stmt).all() for stmt in search.owner_texts_statements(owner_id))))
+        search.index_cache.put(owner_id, index, generation)
+    scored = index.search(params.q, params.limit)
+    return search.ranked_rows(db.execute(search.select_by_ids([cid for _, cid in scored])).all(), scored) if scored else []
 
 def get_cotizacion_by_id(db: Session, cotizacion_id: int, owner_id: int):
-    return db.query(models.Cotizacion).filter(models.Cotizacion.id == cotizacion_id, models.Cotizacion.owner_id == owner_id).first()
+    return db.scalar(cotizacion_statement(cotizacion_id, owner_id))
+
+def get_cotizacion_with_owner(db: Session, cotizacion_id: int, owner_id: Optional[int] = None):
+    return db.scalar(cotizacion_statement(cotizacion_id, owner_id, options=COTIZACION_WITH_OWNER))
+
+def diff_productos(db_cotizacion: models.Cotizacion, productos_data: List[schemas.ProductoCreate], totals: pricing.QuoteTotals):
+    """
+    Compara las líneas recibidas con las guardadas: actualiza en memoria las que traen
+    un id existente y cambiaron, y devuelve las sentencias para eliminar en bloque las
+    que ya no vienen e insertar en bloque las nuevas.
+    """
+    existing = {producto.id: producto for producto in db_cotizacion.productos}
+    keep, new_rows = set(), []
+    for producto_data, line in zip(productos_data, totals.lines):
+        values = producto_values(producto_data, line)
+        db_producto = existing.get(producto_data.id) if producto_data.id is not None else None
+        if db_producto is None or db_producto.id in keep:
+            new_rows.append({**values, "cotizacion_id": db_cotizacion.id})
+            continue
+        keep.add(db_producto.id)
+        for key, value in values.items():
+            if getattr(db_producto, key) != value: setattr(db_producto, key, value)
+    statements = []
+    removed = [producto_id for producto_id in existing if producto_id not in keep]
+    if removed:
+        statements.append((delete(models.Producto).where(models.Producto.id.in_(removed)).execution_options(synchronize_session=False), None))
+    if new_rows:
+        statements.append((insert(models.Producto), new_rows))
+    return statements
+
+def sync_productos(db: Session, db_cotizacion: models.Cotizacion, productos_data: List[schemas.ProductoCreate], totals: pricing.QuoteTotals):
+    for stmt, rows in diff_productos(db_cotizacion, productos_data, totals): db.execute(stmt, rows)
+
+def apply_cotizacion_changes(db_cotizacion: models.Cotizacion, cotizacion_data: schemas.CotizacionCreate, totals: pricing.QuoteTotals):
+    """Copia los campos de cabecera que cambiaron; devuelve los ajustes al resumen diario."""
+    previous = (db_cotizacion.moneda, db_cotizacion.monto_total)
+    for key, value in cotizacion_values(cotizacion_data, totals).items():
+        if getattr(db_cotizacion, key) != value: setattr(db_cotizacion, key, value)
+    if (db_cotizacion.moneda, db_cotizacion.monto_total) == previous: return []
+    return [
+        (db_cotizacion.fecha_creacion, db_cotizacion.owner_id, previous[0], -1, -(previous[1] or 0)),
+        (db_cotizacion.fecha_creacion, db_cotizacion.owner_id, db_cotizacion.moneda, 1, db_cotizacion.monto_total),
+    ]
 
 def update_cotizacion(db: Session, cotizacion_id: int, cotizacion_data: schemas.CotizacionCreate, owner_id: int):
     db_cotizacion = get_cotizacion_by_id(db, cotizacion_id=cotizacion_id, owner_id=owner_id)
     if not db_cotizacion: return None
-    for key, value in cotizacion_data.model_dump(exclude={"productos"}).items():
-        setattr(db_cotizacion, key, value)
-    db.query(models.Producto).filter(models.Producto.cotizacion_id == cotizacion_id).delete()
-    for producto_data in cotizacion_data.productos:
-        db.add(models.Producto(**producto_data.model_dump(), cotizacion_id=cotizacion_id))
+    use_catalogo_items(db, owner_id, cotizacion_data.productos, already=(p.catalogo_item_id for p in db_cotizacion.productos))
+    totals = price_cotizacion(cotizacion_data)
+    rollup_changes = apply_cotizacion_changes(db_cotizacion, cotizacion_data, totals)
+    sync_productos(db, db_cotizacion, cotizacion_data.productos, totals)
+    for change in rollup_changes: rollups.record(db, *change)
     db.commit(); db.refresh(db_cotizacion)
+    pdf_cache.cache.invalidate_cotizacion(cotizacion_id, owner_id)
+    search.index_cache.invalidate_owner(owner_id)
     return db_cotizacion
 
 def delete_cotizacion(db: Session, cotizacion_id: int, owner_id: int):
-    db_cotizacion = get_cotizacion_by_id(db, cotizacion_id=cotizacion_id, owner_id=owner_id)
+    db_cotizacion = db.scalar(cotizacion_statement(cotizacion_id, owner_id, options=()))
     if not db_cotizacion: return False
-    db.delete(db_cotizacion); db.commit()
+    rollups.record_cotizacion(db, db_cotizacion, sign=-1)
+    db.execute(cotizaciones_count_delta(owner_id, -1))
+    for stmt in delete_cotizacion_statements(cotizacion_id): db.execute(stmt)
+    db.expunge(db_cotizacion); db.commit()
+    pdf_cache.cache.invalidate_cotizacion(cotizacion_id, owner_id)
+    search.index_cache.invalidate_owner(owner_id)
+    return True
+
+# --- Catálogo de productos (ver catalog.py) ---
+def catalogo_page_statement(owner_id: int, cursor: Optional[int], limit: int):
+    stmt = select(models.CatalogoItem).where(models.CatalogoItem.owner_id == owner_id)
+    if cursor is not None: stmt = stmt.where(models.CatalogoItem.id < cursor)
+    return stmt.order_by(models.CatalogoItem.id.desc()).limit(limit + 1)
+
+def catalogo_item_statement(owner_id: int, item_id: int):
+    return select(models.CatalogoItem).where(models.CatalogoItem.owner_id == owner_id, models.CatalogoItem.id == item_id)
+
+def catalogo_item_values(item_data) -> dict:
+    values = item_data.model_dump(exclude_unset=True, exclude_none=True)
+    if "descripcion" in values: values["clave"] = catalog.clave(values["descripcion"])
+    return values
+
+def catalogo_unlink_statement(item_id: int):
+    # Las líneas que lo usaban conservan su copia; solo se pierde la referencia.
+    return update(models.Producto).where(models.Producto.catalogo_item_id == item_id).values(catalogo_item_id=None)
+
+def get_catalogo_items(db: Session, owner_id: int, cursor: Optional[int], limit: int):
+    return split_page(db.scalars(catalogo_page_statement(owner_id, cursor, limit)).all(), limit, lambda item: item.id)
+
+def create_catalogo_item(db: Session, owner_id: int, item: schemas.CatalogoItemCreate):
+    db_item = models.CatalogoItem(owner_id=owner_id, uso_count=0, **catalogo_item_values(item))
+    db.add(db_item)
+    try: db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise catalog.DuplicateItem(item.descripcion)
+    catalog.index_cache.invalidate_owner(owner_id)
+    return db_item
+
+def update_catalogo_item(db: Session, owner_id: int, item_id: int, item_data: schemas.CatalogoItemUpdate):
+    db_item = db.scalar(catalogo_item_statement(owner_id, item_id))
+    if db_item is None: return None
+    for key, value in catalogo_item_values(item_data).items(): setattr(db_item, key, value)
+    try: db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise catalog.DuplicateItem(item_data.descripcion)
+    catalog.index_cache.invalidate_owner(owner_id)
+    return db_item
+
+def delete_catalogo_item(db: Session, owner_id: int, item_id: int):
+    db_item = db.scalar(catalogo_item_statement(owner_id, item_id))
+    if db_item is None: return False
+    db.execute(catalogo_unlink_statement(item_id))
+    db.delete(db_item); db.commit()
+    catalog.index_cache.invalidate_owner(owner_id)
     return True
 
+def autocomplete_catalogo(db: Session, owner_id: int, prefix: str, limit: int):
+    """Sugerencias del catálogo para `prefix`; el índice en memoria se arma la primera vez."""
+    index = catalog.index_cache.get(owner_id)
+    if index is None:
+        generation = catalog.index_cache.generation(owner_id)
+        index = catalog.AutocompleteIndex(db.execute(catalog.items_statement(owner_id)).all())
+        catalog.index_cache.put(owner_id, index, generation)
+    return index.suggest(prefix, limit)
+
 # --- Funciones de Administrador ---
-def get_admin_dashboard_stats(db: Session):
-    total_users = db.query(func.count(models.User.id)).scalar()
-    active_users = db.query(func.count(models.User.id)).filter(models.User.is_active == True).scalar()
-    total_cotizaciones = db.query(func.count(models.Cotizacion.id)).scalar()
-    
+def admin_stats_statement():
+    # Una sola consulta: los conteos de usuarios con COUNT(CASE ...) y el total de
+    # cotizaciones desde el resumen diario, sin recorrer la tabla de cotizaciones.
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    new_users_last_30_days = db.query(func.count(models.User.id)).filter(models.User.creation_date >= thirty_days_ago).scalar()
-    
-    return schemas.AdminDashboardStats(
-        total_users=total_users,
-        active_users=active_users,
-        total_cotizaciones=total_cotizaciones,
-        new_users_last_30_days=new_users_last_30_days
+    total_cotizaciones = select(func.coalesce(func.sum(models.CotizacionDailyRollup.cotizaciones_count), 0)).scalar_subquery()
+    return select(
+        func.count(models.User.id).label("total_users"),
+        func.count(case((models.User.is_active == True, 1))).label("active_users"),
+        func.count(case((models.User.creation_date >= thirty_days_ago, 1))).label("new_users_last_30_days"),
+        total_cotizaciones.label("total_cotizaciones"),
     )
 
-def get_all_users(db: Session):
-    results = db.query(
-        models.User,
-        func.count(models.Cotizacion.id).label("cotizaciones_count")
-    ).outerjoin(models.Cotizacion, models.User.id == models.Cotizacion.owner_id)\
-     .group_by(models.User.id)\
-     .order_by(models.User.id)\
-     .all()
-    
-    users_with_counts = []
-    for user, count in results:
-        user.cotizaciones_count = count
-        users_with_counts.append(user)
-        
-    return users_with_counts
+def get_admin_dashboard_stats(db: Session):
+    return schemas.AdminDashboardStats(**db.execute(admin_stats_statement()).one()._mapping)
+
+def trends_statement(desde: date, owner_id: Optional[int] = None):
+    rollup = models.CotizacionDailyRollup
+    stmt = select(
+        rollup.dia, rollup.moneda,
+        func.sum(rollup.cotizaciones_count).label("cotizaciones_count"),
+        func.sum(rollup.monto_total).label("monto_total"),
+    ).where(rollup.dia >= desde)
+    if owner_id is not None: stmt = stmt.where(rollup.owner_id == owner_id)
+    return stmt.group_by(rollup.dia, rollup.moneda).order_by(rollup.dia, rollup.moneda)
+
+def get_cotizacion_trends(db: Session, desde: date, owner_id: Optional[int] = None):
+    return db.execute(trends_statement(desde, owner_id)).all()
+
+ADMIN_USER_LIST_COLUMNS = ("id", "email", "is_active", "is_admin", "creation_date", "cotizaciones_count", "deactivation_reason")
+
+def encode_user_cursor(value, user_id: int) -> str:
+    if isinstance(value, datetime): value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, user_id]).encode()).decode()
+
+def decode_user_cursor(cursor: str, sort: str):
+    """Devuelve (valor, id); lanza ValueError si el cursor no es válido."""
+    try:
+        value, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if sort == "creation_date": value = datetime.fromisoformat(value)
+        return value, int(user_id)
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError("Cursor no válido")
+
+def users_page_statement(params: schemas.AdminUserListQuery, dialect_name: str):
+    """
+    Página de usuarios para el panel de administración (con una fila de más).
+    El conteo de cotizaciones sale de la columna desnormalizada (sin JOIN ni GROUP BY)
+    y el orden usa (columna, id) para que el keyset sea estable con valores repetidos.
+    Lanza ValueError si el cursor no es válido.
+    """
+    sort_column = order_column = getattr(models.User, params.sort)
+    stmt = select(*(getattr(models.User, c) for c in ADMIN_USER_LIST_COLUMNS))
+    if params.search:
+        pattern = f"%{params.search.strip()}%"
+        stmt = stmt.where(or_(models.User.email.ilike(pattern), models.User.business_name.ilike(pattern)))
+    if params.cursor:
+        value, last_id = decode_user_cursor(params.cursor, params.sort)
+        if params.sort == "creation_date" and dialect_name == "sqlite":
+            # SQLite guarda CURRENT_TIMESTAMP como texto sin microsegundos y SQLAlchemy los
+            # agrega al parámetro; se normalizan ambos lados para que la igualdad funcione.
+            sort_column, value = func.datetime(sort_column), func.datetime(value)
+        if params.order == "desc":
+            stmt = stmt.where(or_(sort_column < value, and_(sort_column == value, models.User.id < last_id)))
+        else:
+            stmt = stmt.where(or_(sort_column > value, and_(sort_column == value, models.User.id > last_id)))
+    if params.order == "desc": stmt = stmt.order_by(order_column.desc(), models.User.id.desc())
+    else: stmt = stmt.order_by(order_column.asc(), models.User.id.asc())
+    return stmt.limit(params.limit + 1)
+
+def get_users_for_admin(db: Session, params: schemas.AdminUserListQuery):
+    """Página de usuarios y el cursor de la siguiente."""
+    rows = db.execute(users_page_statement(params, db.get_bind().dialect.name)).all()
+    return split_page(rows, params.limit, lambda row: encode_user_cursor(getattr(row, params.sort), row.id))
 
 def get_user_by_id_for_admin(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return get_user_by_id(db, user_id)
 
 # --- FUNCIÓN CORREGIDA ---
 # Se cambió la variable 'reason' por 'deactivation_reason' para que coincida con el parámetro de la función.
 def update_user_status(db: Session, user_id: int, is_active: bool, deactivation_reason: str = None):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    db_user = get_user_by_id(db, user_id)
     if db_user:
         db_user.is_active = is_active
         db_user.deactivation_reason = deactivation_reason if not is_active else None
         db.commit()
         db.refresh(db_user)
+        auth_cache.cache.invalidate_user(user_id)
     return db_user
 
 def delete_user(db: Session, user_id: int):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    db_user = db.scalar(user_statement(models.User.id == user_id, options=USER_WITH_COTIZACIONES))
     if db_user:
+        db.query(models.CotizacionDailyRollup).filter(models.CotizacionDailyRollup.owner_id == user_id).delete()
+        db.execute(delete(models.CatalogoItem).where(models.CatalogoItem.owner_id == user_id))
         db.delete(db_user)
         db.commit()
+        pdf_cache.cache.invalidate_owner(user_id)
+        auth_cache.cache.invalidate_user(user_id)
+        search.index_cache.invalidate_owner(user_id)
+        catalog.index_cache.invalidate_owner(user_id)
         return True
     return False
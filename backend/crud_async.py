@@ -0,0 +1,210 @@
+# backend/crud_async.py
+# CAPA DE DATOS ASÍNCRONA (AsyncSession)
+#
+# Las mismas operaciones que crud.py, para los endpoints async. Las consultas se
+# arman con los constructores de crud.py (cotizaciones_page_statement,
+# users_page_statement, ...) para que ambas versiones no se separen; aquí solo
+# cambia la forma de ejecutarlas. En modo asíncrono no hay carga perezosa: cada
+# relación que la respuesta necesita se carga con la estrategia declarada en crud.py.
+
+import asyncio
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import date
+from typing import Optional
+import crud, models, schemas, pdf_cache, numbering, auth_cache, rollups, roles, search, catalog
+
+
+def _dialect(db: AsyncSession) -> str:
+    return db.bind.dialect.name
+
+async def _record_rollup(db: AsyncSession, *change):
+    await db.execute(rollups.upsert_statement(_dialect(db), *change))
+
+# --- Funciones de Usuario ---
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(crud.user_statement(models.User.email == email))
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    return await db.scalar(crud.user_statement(models.User.id == user_id))
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: str):
+    role = roles.role_for_email(user.email)
+    db_user = models.User(email=user.email, hashed_password=hashed_password, role=role, is_admin=role == roles.ADMIN_ROLE)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)  # creation_date y cotizaciones_count los asigna la base de datos
+    return db_user
+
+async def update_password_hash(db: AsyncSession, user_id: int, hashed_password: str):
+    await db.execute(update(models.User).where(models.User.id == user_id).values(hashed_password=hashed_password))
+    await db.commit()
+
+async def update_profile(db: AsyncSession, db_user: models.User, profile_data: schemas.ProfileUpdate):
+    for key, value in profile_data.model_dump(exclude_unset=True).items(): setattr(db_user, key, value)
+    await db.commit()
+    pdf_cache.cache.invalidate_owner(db_user.id)
+    auth_cache.cache.invalidate_user(db_user.id)
+    return db_user
+
+async def update_logo(db: AsyncSession, db_user: models.User, filename: str):
+    db_user.logo_filename = filename
+    await db.commit()
+    pdf_cache.cache.invalidate_owner(db_user.id)
+    auth_cache.cache.invalidate_user(db_user.id)
+    return db_user
+
+# --- Funciones de Cotización ---
+async def use_catalogo_items(db: AsyncSession, owner_id: int, productos_data, already=()):
+    item_ids = crud.catalogo_item_ids(productos_data, already)
+    if not item_ids: return
+    crud.check_catalogo_items(item_ids, (await db.scalars(crud.owned_catalogo_items_statement(owner_id, item_ids))).all())
+    await db.execute(crud.catalogo_usage_statement(item_ids))
+
+async def create_cotizacion(db: AsyncSession, cotizacion: schemas.CotizacionCreate, user_id: int):
+    totals = crud.price_cotizacion(cotizacion)
+    db_cotizacion = crud.new_cotizacion(cotizacion, totals, user_id, await numbering.allocator.next_number_async(user_id))
+    await use_catalogo_items(db, user_id, cotizacion.productos)  # después de la reserva del número (ver crud.py)
+    db.add(db_cotizacion); await db.flush()
+    await db.execute(insert(models.Producto), crud.producto_rows(cotizacion.productos, totals, db_cotizacion.id))
+    # Un SELECT directo de las líneas recién insertadas (refresh() consultaría también la cabecera).
+    set_committed_value(db_cotizacion, "productos", (await db.scalars(crud.productos_statement(db_cotizacion.id))).all())
+    await _record_rollup(db, *rollups.cotizacion_change(db_cotizacion))
+    await db.execute(crud.cotizaciones_count_delta(user_id, 1))
+    await db.commit()
+    search.index_cache.invalidate_owner(user_id)
+    return db_cotizacion
+
+async def get_cotizaciones_by_owner(db: AsyncSession, owner_id: int, params: schemas.CotizacionListQuery):
+    rows = (await db.execute(crud.cotizaciones_page_statement(owner_id, params))).all()
+    return crud.split_page(rows, params.limit, lambda row: row.id)
+
+async def get_cotizaciones_for_export(db: AsyncSession, owner_id: int, export: schemas.CotizacionExportRequest, limit: int):
+    return (await db.scalars(crud.cotizaciones_export_statement(owner_id, export, limit))).all()
+
+async def search_cotizaciones(db: AsyncSession, owner_id: int, params: schemas.CotizacionSearchQuery):
+    if _dialect(db) == "postgresql": return (await db.execute(search.postgres_statement(owner_id, params.q, params.limit))).all()
+    index = search.index_cache.get(owner_id)
+    if index is None:
+        generation = search.index_cache.generation(owner_id)
+        headers, lines = search.owner_texts_statements(owner_id)
+        texts = search.owner_texts((await db.execute(headers)).all(), (await db.execute(lines)).all())
+        index = await asyncio.to_thread(search.OwnerIndex, texts)  # armar el índice es CPU: fuera del event loop
+        search.index_cache.put(owner_id, index, generation)
+    scored = index.search(params.q, params.limit)
+    if not scored: return []
+    return search.ranked_rows((await db.execute(search.select_by_ids([cid for _, cid in scored]))).all(), scored)
+
+async def get_cotizacion_by_id(db: AsyncSession, cotizacion_id: int, owner_id: int):
+    return await db.scalar(crud.cotizacion_statement(cotizacion_id, owner_id))
+
+async def get_cotizacion_with_owner(db: AsyncSession, cotizacion_id: int, owner_id: Optional[int] = None):
+    """Cotización con sus productos y su dueño, para generar el PDF."""
+    return await db.scalar(crud.cotizacion_statement(cotizacion_id, owner_id, options=crud.COTIZACION_WITH_OWNER))
+
+async def update_cotizacion(db: AsyncSession, cotizacion_id: int, cotizacion_data: schemas.CotizacionCreate, owner_id: int):
+    db_cotizacion = await get_cotizacion_by_id(db, cotizacion_id=cotizacion_id, owner_id=owner_id)
+    if not db_cotizacion: return None
+    await use_catalogo_items(db, owner_id, cotizacion_data.productos, already=(p.catalogo_item_id for p in db_cotizacion.productos))
+    totals = crud.price_cotizacion(cotizacion_data)
+    rollup_changes = crud.apply_cotizacion_changes(db_cotizacion, cotizacion_data, totals)
+    for stmt, rows in crud.diff_productos(db_cotizacion, cotizacion_data.productos, totals): await db.execute(stmt, rows)
+    for change in rollup_changes: await _record_rollup(db, *change)
+    await db.commit()
+    # Las líneas se insertaron y borraron en bloque: se recarga la colección.
+    await db.refresh(db_cotizacion, ["productos"])
+    pdf_cache.cache.invalidate_cotizacion(cotizacion_id, owner_id)
+    search.index_cache.invalidate_owner(owner_id)
+    return db_cotizacion
+
+async def delete_cotizacion(db: AsyncSession, cotizacion_id: int, owner_id: int):
+    db_cotizacion = await db.scalar(crud.cotizacion_statement(cotizacion_id, owner_id, options=()))
+    if not db_cotizacion: return False
+    await _record_rollup(db, *rollups.cotizacion_change(db_cotizacion, sign=-1))
+    await db.execute(crud.cotizaciones_count_delta(owner_id, -1))
+    for stmt in crud.delete_cotizacion_statements(cotizacion_id): await db.execute(stmt)
+    db.expunge(db_cotizacion); await db.commit()
+    pdf_cache.cache.invalidate_cotizacion(cotizacion_id, owner_id)
+    search.index_cache.invalidate_owner(owner_id)
+    return True
+
+# --- Catálogo de productos (ver catalog.py) ---
+async def get_catalogo_items(db: AsyncSession, owner_id: int, cursor: Optional[int], limit: int):
+    return crud.split_page((await db.scalars(crud.catalogo_page_statement(owner_id, cursor, limit))).all(), limit, lambda item: item.id)
+
+async def create_catalogo_item(db: AsyncSession, owner_id: int, item: schemas.CatalogoItemCreate):
+    db_item = models.CatalogoItem(owner_id=owner_id, uso_count=0, **crud.catalogo_item_values(item))
+    db.add(db_item)
+    try: await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise catalog.DuplicateItem(item.descripcion)
+    catalog.index_cache.invalidate_owner(owner_id)
+    return db_item
+
+async def update_catalogo_item(db: AsyncSession, owner_id: int, item_id: int, item_data: schemas.CatalogoItemUpdate):
+    db_item = await db.scalar(crud.catalogo_item_statement(owner_id, item_id))
+    if db_item is None: return None
+    for key, value in crud.catalogo_item_values(item_data).items(): setattr(db_item, key, value)
+    try: await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise catalog.DuplicateItem(item_data.descripcion)
+    catalog.index_cache.invalidate_owner(owner_id)
+    return db_item
+
+async def delete_catalogo_item(db: AsyncSession, owner_id: int, item_id: int):
+    db_item = await db.scalar(crud.catalogo_item_statement(owner_id, item_id))
+    if db_item is None: return False
+    await db.execute(crud.catalogo_unlink_statement(item_id))
+    await db.delete(db_item); await db.commit()
+    catalog.index_cache.invalidate_owner(owner_id)
+    return True
+
+async def autocomplete_catalogo(db: AsyncSession, owner_id: int, prefix: str, limit: int):
+    index = catalog.index_cache.get(owner_id)
+    if index is None:
+        generation = catalog.index_cache.generation(owner_id)
+        items = (await db.execute(catalog.items_statement(owner_id))).all()
+        index = await asyncio.to_thread(catalog.AutocompleteIndex, items)
+        catalog.index_cache.put(owner_id, index, generation)
+    return index.suggest(prefix, limit)
+
+# --- Funciones de Administrador ---
+async def get_admin_dashboard_stats(db: AsyncSession):
+    return schemas.AdminDashboardStats(**(await db.execute(crud.admin_stats_statement())).one()._mapping)
+
+async def get_cotizacion_trends(db: AsyncSession, desde: date, owner_id: Optional[int] = None):
+    return (await db.execute(crud.trends_statement(desde, owner_id))).all()
+
+async def get_users_for_admin(db: AsyncSession, params: schemas.AdminUserListQuery):
+    rows = (await db.execute(crud.users_page_statement(params, _dialect(db)))).all()
+    return crud.split_page(rows, params.limit, lambda row: crud.encode_user_cursor(getattr(row, params.sort), row.id))
+
+async def get_user_by_id_for_admin(db: AsyncSession, user_id: int):
+    return await get_user_by_id(db, user_id)
+
+async def update_user_status(db: AsyncSession, user_id: int, is_active: bool, deactivation_reason: str = None):
+    db_user = await get_user_by_id(db, user_id)
+    if db_user:
+        db_user.is_active = is_active
+        db_user.deactivation_reason = deactivation_reason if not is_active else None
+        await db.commit()
+        auth_cache.cache.invalidate_user(user_id)
+    return db_user
+
+async def delete_user(db: AsyncSession, user_id: int):
+    db_user = await db.scalar(crud.user_statement(models.User.id == user_id, options=crud.USER_WITH_COTIZACIONES))
+    if db_user:
+        await db.execute(delete(models.CotizacionDailyRollup).where(models.CotizacionDailyRollup.owner_id == user_id))
+        await db.execute(delete(models.CatalogoItem).where(models.CatalogoItem.owner_id == user_id))
+        await db.delete(db_user)
+        await db.commit()
+        pdf_cache.cache.invalidate_owner(user_id)
+        auth_cache.cache.invalidate_user(user_id)
+        search.index_cache.invalidate_owner(user_id)
+        catalog.index_cache.invalidate_owner(user_id)
+        return True
+    return False
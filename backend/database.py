@@ -1,19 +1,199 @@
 # backend/database.py
 # MODIFICADO PARA AÑADIR pool_pre_ping Y MEJORAR LA ESTABILIDAD DE LA CONEXIÓN
+#
+# El pool se configura desde config.Settings (tamaño, overflow, reciclaje, LIFO).
+# Con DB_PGBOUNCER=true la aplicación no mantiene pool propio: PgBouncer ya reparte
+# las conexiones. Si DATABASE_REPLICA_URL está definida, las sesiones de solo lectura
+# (ReadSessionLocal) van a la réplica; si no, usan la base principal.
+#
+# Los endpoints usan la versión asíncrona (AsyncSessionLocal / AsyncReadSessionLocal,
+# asyncpg en Postgres y aiosqlite en desarrollo), de modo que esperar a la base de
+# datos no ocupa un hilo del threadpool. El motor síncrono se conserva para las
+# migraciones, el arranque y los scripts de benchmarks/.
+#
+# Importar este módulo no abre conexiones. Con DATABASE_URL="sqlite://" (o
+# "sqlite:///:memory:") la aplicación arranca contra una base SQLite descartable:
+# un archivo en /dev/shm (memoria) propio del proceso que se borra al salir. No se usa
+# una base :memory: de verdad porque los motores síncrono y asíncrono necesitan ver
+# los mismos datos desde conexiones distintas.
+
+import atexit
+import os
+import tempfile
+import threading
+import time
+import uuid
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from config import settings
 
-# CORRECCIÓN: Se añade pool_pre_ping=True.
-# Esto asegura que la conexión a la base de datos (Neon) esté activa antes de cada consulta,
-# evitando errores de "SSL connection has been closed unexpectedly".
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True
-)
+
+class PoolMetrics:
+    """Cuánto esperan los requests por una conexión del pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out: self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.waits,
+                "wait_avg_ms": round(self.wait_total / self.waits * 1000, 3) if self.waits else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "timeouts": self.timeouts,
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Mide el tiempo de espera de cada checkout del pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def async_url(url: str):
+    """Traduce DATABASE_URL al driver asíncrono (asyncpg / aiosqlite)."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite": return parsed.set(drivername="sqlite+aiosqlite")
+    # asyncpg no entiende los parámetros de libpq que trae la URL de Neon.
+    query = dict(parsed.query)
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    if sslmode and sslmode != "disable": query["ssl"] = sslmode
+    if settings.DB_PGBOUNCER: query["prepared_statement_cache_size"] = "0"
+    return parsed.set(drivername="postgresql+asyncpg", query=query)
+
+def _engine_kwargs(url, is_async: bool = False) -> dict:
+    # SQLite (desarrollo) usa el pool por defecto de SQLAlchemy.
+    if make_url(url).get_backend_name() == "sqlite": return {}
+    if settings.DB_PGBOUNCER:
+        # En modo transacción PgBouncer ya multiplexa: cada checkout abre y cierra contra él.
+        # asyncpg además no debe cachear sentencias preparadas (cambian de conexión).
+        return {"poolclass": NullPool, "connect_args": {"statement_cache_size": 0}} if is_async else {"poolclass": NullPool}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        # CORRECCIÓN: pool_pre_ping asegura que la conexión (Neon) siga viva antes de usarla,
+        # evitando "SSL connection has been closed unexpectedly". Con pool_recycle corto se
+        # puede desactivar para ahorrar un round trip por checkout.
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        # LIFO reutiliza las conexiones más recientes y deja que las ociosas expiren.
+        "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+    }
+
+MEMORY_URLS = {"sqlite://", "sqlite:///:memory:"}
+
+def is_memory_url(url: str) -> bool:
+    return url.strip() in MEMORY_URLS
+
+_memory_path = None
+
+def _memory_database_url() -> str:
+    # SQLite crea el archivo recién en la primera conexión.
+    global _memory_path
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+    _memory_path = os.path.join(directory, f"cotizacion-{os.getpid()}-{uuid.uuid4().hex[:8]}.db")
+    atexit.register(remove_memory_database)
+    return f"sqlite:///{_memory_path}"
+
+def remove_memory_database():
+    """Borra la base descartable (si se usó). uvicorn termina con la señal recibida y no corre atexit."""
+    if _memory_path is None: return
+    engine.dispose()
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        try: os.remove(_memory_path + suffix)
+        except FileNotFoundError: pass
+
+def require_configured():
+    """Falla si no hay base configurada. Se llama al arrancar la aplicación, no al importar."""
+    if not settings.DATABASE_URL:
+        raise ValueError("No se encontró la DATABASE_URL. Asegúrate de que esté definida en tu archivo backend/.env (o usa DATABASE_URL=sqlite:// para una base en memoria)")
+
+# Sin DATABASE_URL los motores apuntan igual a una base descartable para que el import
+# funcione; la aplicación no arranca hasta que se configure (require_configured).
+DATABASE_URL = settings.DATABASE_URL if settings.DATABASE_URL and not is_memory_url(settings.DATABASE_URL) else _memory_database_url()
+REPLICA_URL = "" if is_memory_url(settings.DATABASE_REPLICA_URL) else settings.DATABASE_REPLICA_URL
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
+
+replica_engine = engine
+if REPLICA_URL:
+    replica_engine = create_engine(REPLICA_URL, **_engine_kwargs(REPLICA_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+async_engine = create_async_engine(async_url(DATABASE_URL), **_engine_kwargs(DATABASE_URL, is_async=True))
+async_replica_engine = async_engine
+if REPLICA_URL:
+    async_replica_engine = create_async_engine(async_url(REPLICA_URL), **_engine_kwargs(REPLICA_URL, is_async=True))
+
+# expire_on_commit=False: tras el commit los objetos se siguen leyendo sin volver a la base
+# (en modo asíncrono no hay carga perezosa al serializar la respuesta).
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
+
+
+def pool_stats() -> dict:
+    """Estado de los pools (principal y réplica, síncronos y asíncronos) para /admin/runtime-stats/."""
+    stats = {}
+    engines = (("primary", engine), ("replica", replica_engine), ("primary_async", async_engine.sync_engine), ("replica_async", async_replica_engine.sync_engine))
+    for name, eng in engines:
+        if name == "replica" and eng is engine: continue
+        if name == "replica_async" and eng is async_engine.sync_engine: continue
+        pool = eng.pool
+        entry = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            })
+        if isinstance(pool, _InstrumentedPoolMixin): entry.update(pool.metrics.snapshot())
+        stats[name] = entry
+    return stats
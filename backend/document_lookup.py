@@ -0,0 +1,231 @@
+# backend/document_lookup.py
+# CONSULTA DE DNI (RENIEC) Y RUC (SUNAT) CON CACHÉ
+#
+# Antes cada consulta abría una conexión TLS nueva con `requests.get`, sin timeout,
+# dentro de un handler síncrono. Ahora:
+#   - un único cliente httpx asíncrono reutiliza conexiones (pool acotado),
+#   - cada llamada tiene timeout y se reintenta con backoff exponencial y jitter,
+#   - los resultados normalizados se guardan en memoria y en la tabla
+#     documento_consultas (también los "no encontrado", con un TTL más corto),
+#   - consultas idénticas simultáneas comparten una sola llamada a la API.
+#
+# DOCUMENT_API_BASE_URL permite apuntar a un servidor local de pruebas
+# (ver benchmarks/stub_document_api.py). httpx se importa al crear el cliente, en la
+# primera consulta que no está en caché.
+
+import asyncio
+import logging
+import random
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import settings
+from database import AsyncSessionLocal
+import metrics, models
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+DOCUMENT_LENGTHS = {"DNI": 8, "RUC": 11}
+ENDPOINTS = {"DNI": "/reniec/dni", "RUC": "/sunat/ruc"}
+RETRY_BACKOFF_SECONDS = 0.2
+_MISS = object()
+
+
+class DocumentNotFound(Exception):
+    """La API respondió que el documento no existe."""
+
+class DocumentLookupError(Exception):
+    """La API externa no respondió correctamente tras los reintentos."""
+
+class _Retryable(Exception):
+    pass
+
+
+def normalize(tipo_documento: str, numero_documento: str) -> Tuple[str, str]:
+    tipo = (tipo_documento or "").strip().upper()
+    numero = re.sub(r"\D", "", numero_documento or "")
+    if tipo not in DOCUMENT_LENGTHS or len(numero) != DOCUMENT_LENGTHS[tipo]:
+        raise ValueError(f"Número de {tipo or 'documento'} inválido")
+    return tipo, numero
+
+def parse_response(tipo: str, data: dict) -> dict:
+    if tipo == "DNI": return {"nombre": f"{data.get('nombres', '')} {data.get('apellidoPaterno', '')} {data.get('apellidoMaterno', '')}".strip(), "direccion": ""}
+    return {"nombre": data.get('razonSocial', ''), "direccion": data.get('direccion', '')}
+
+
+class DocumentLookupService:
+    def __init__(self, base_url: str, timeout: float, retries: int, max_connections: int, ttl: int, negative_ttl: int, memory_entries: int):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.retries = retries
+        self.max_connections = max_connections
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory_entries = memory_entries
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._memory = OrderedDict()  # (tipo, numero) -> (resultado o None, vence_en)
+        self._inflight = {}  # (tipo, numero) -> asyncio.Task
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    # --- Caché en memoria ---
+    def _memory_get(self, key):
+        entry = self._memory.get(key)
+        if entry is None: return _MISS
+        if entry[1] <= time.time():
+            del self._memory[key]
+            return _MISS
+        self._memory.move_to_end(key)
+        return entry[0]
+
+    def _memory_put(self, key, result: Optional[dict], expires_at: float):
+        self._memory[key] = (result, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries: self._memory.popitem(last=False)
+
+    # --- Caché persistente ---
+    async def _load_persisted(self, key):
+        try:
+            async with AsyncSessionLocal() as db:
+                row = await db.get(models.DocumentoConsultaCache, key)
+        except SQLAlchemyError:
+            logger.warning("No se pudo leer el caché de %s %s; se consulta la API", *key, exc_info=True)
+            return _MISS
+        if row is None: return _MISS
+        consultado_en = row.consultado_en
+        if consultado_en.tzinfo is None: consultado_en = consultado_en.replace(tzinfo=timezone.utc)
+        expires_at = consultado_en.timestamp() + (self.ttl if row.encontrado else self.negative_ttl)
+        if expires_at <= time.time(): return _MISS
+        result = {"nombre": row.nombre or "", "direccion": row.direccion or ""} if row.encontrado else None
+        return result, expires_at
+
+    async def _persist(self, key, result: Optional[dict]):
+        # Upsert: otra instancia puede estar guardando el mismo documento al mismo tiempo
+        # (la coalescencia es por proceso). Si la escritura falla, el resultado ya obtenido
+        # se devuelve igual; solo se pierde el caché persistente de esta consulta.
+        table = models.DocumentoConsultaCache.__table__
+        values = {"tipo_documento": key[0], "numero_documento": key[1], "encontrado": result is not None,
+                  "nombre": result["nombre"] if result else None, "direccion": result["direccion"] if result else None,
+                  "consultado_en": datetime.now(timezone.utc)}
+        try:
+            async with AsyncSessionLocal() as db:
+                stmt = _UPSERT_DIALECTS[db.get_bind().dialect.name](table).values(**values)
+                await db.execute(stmt.on_conflict_do_update(
+                    index_elements=[table.c.tipo_documento, table.c.numero_documento],
+                    set_={column: stmt.excluded[column] for column in ("encontrado", "nombre", "direccion", "consultado_en")},
+                ))
+                await db.commit()
+        except SQLAlchemyError:
+            logger.warning("No se pudo guardar la consulta de %s %s en el caché", *key, exc_info=True)
+
+    # --- API externa ---
+    async def _fetch(self, tipo: str, numero: str) -> Optional[dict]:
+        import httpx
+        headers = {"Authorization": f"Bearer {settings.API_TOKEN}"}
+        for attempt in range(self.retries + 1):
+            try:
+                self.upstream_calls += 1
+                start = time.perf_counter()
+                try:
+                    response = await self._get_client().get(ENDPOINTS[tipo], params={"numero": numero}, headers=headers)
+                except httpx.TransportError:
+                    metrics.DOCUMENT_API_DURATION.observe(("transport_error",), time.perf_counter() - start)
+                    raise
+                metrics.DOCUMENT_API_DURATION.observe((str(response.status_code),), time.perf_counter() - start)
+                if response.status_code in (404, 422): return None
+                if response.status_code == 429 or response.status_code >= 500: raise _Retryable(response.status_code)
+                response.raise_for_status()
+                return parse_response(tipo, response.json())
+            except (httpx.TransportError, _Retryable):
+                if attempt == self.retries: break
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt + random.uniform(0, RETRY_BACKOFF_SECONDS))
+            except (httpx.HTTPStatusError, ValueError):
+                break  # token inválido u otra respuesta que no mejora reintentando
+        self.errors += 1
+        raise DocumentLookupError()
+
+    async def _resolve(self, key) -> Optional[dict]:
+        persisted = await self._load_persisted(key)
+        if persisted is not _MISS:
+            self.db_hits += 1
+            result, expires_at = persisted
+        else:
+            result = await self._fetch(*key)
+            await self._persist(key, result)
+            expires_at = time.time() + (self.ttl if result is not None else self.negative_ttl)
+        self._memory_put(key, result, expires_at)
+        return result
+
+    async def lookup(self, tipo_documento: str, numero_documento: str) -> dict:
+        """Devuelve {"nombre", "direccion"}. Lanza ValueError, DocumentNotFound o DocumentLookupError."""
+        key = normalize(tipo_documento, numero_documento)
+        start = time.perf_counter()
+        result = self._memory_get(key)
+        if result is not _MISS:
+            self.memory_hits += 1
+            source = "memory"
+        else:
+            task = self._inflight.get(key)
+            if task is None:
+                task = self._inflight[key] = asyncio.ensure_future(self._resolve(key))
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+                source = "resolved"  # tabla documento_consultas o API externa
+            else:
+                self.coalesced += 1
+                source = "coalesced"
+            # shield: si un cliente cancela, la consulta sigue para los demás que la esperan.
+            result = await asyncio.shield(task)
+        elapsed = time.perf_counter() - start
+        metrics.DOCUMENT_LOOKUP_DURATION.observe((source,), elapsed)
+        metrics.record("lookup", elapsed)
+        if result is None: raise DocumentNotFound()
+        return result
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "errors": self.errors,
+        }
+
+
+service = DocumentLookupService(
+    base_url=settings.DOCUMENT_API_BASE_URL,
+    timeout=settings.DOCUMENT_API_TIMEOUT_SECONDS,
+    retries=settings.DOCUMENT_API_RETRIES,
+    max_connections=settings.DOCUMENT_API_MAX_CONNECTIONS,
+    ttl=settings.DOCUMENT_LOOKUP_TTL_SECONDS,
+    negative_ttl=settings.DOCUMENT_LOOKUP_NEGATIVE_TTL_SECONDS,
+    memory_entries=settings.DOCUMENT_LOOKUP_MEMORY_ENTRIES,
+)
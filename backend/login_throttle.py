@@ -0,0 +1,84 @@
+# backend/login_throttle.py
+# LÍMITE DE INTENTOS FALLIDOS DE LOGIN
+#
+# Cada intento de login cuesta un hash bcrypt. Para que un ataque de fuerza bruta o
+# de relleno de credenciales no pueda multiplicar ese costo, se cuentan los fallos
+# recientes por cuenta y por IP (ventana deslizante) y, al superar el límite, se
+# responde 429 antes de tocar la base de datos o el pool de hash.
+#
+# Detrás del proxy de fly.io la conexión siempre viene del proxy: la IP real del
+# cliente está en la cabecera CLIENT_IP_HEADER (Fly-Client-IP, que el proxy
+# reemplaza en cada request). Sin proxy delante, dejarla vacía para usar la conexión.
+
+import threading
+import time
+from collections import deque
+
+from config import settings
+
+
+def client_ip(request) -> str:
+    """IP del cliente para el límite por IP ("" si no se conoce)."""
+    if settings.CLIENT_IP_HEADER:
+        forwarded = request.headers.get(settings.CLIENT_IP_HEADER, "").strip()
+        if forwarded: return forwarded
+    return request.client.host if request.client else ""
+
+
+class LoginThrottle:
+    def __init__(self, max_per_account: int, max_per_ip: int, window: float):
+        self.limits = {"account": max_per_account, "ip": max_per_ip}
+        self.window = window
+        self._failures = {}  # (tipo, valor) -> deque de instantes
+        self._lock = threading.Lock()
+        self.blocked = 0
+
+    def _recent(self, key, now: float) -> deque:
+        failures = self._failures.get(key)
+        if failures is None: return deque()
+        while failures and failures[0] <= now - self.window: failures.popleft()
+        if not failures: del self._failures[key]
+        return failures
+
+    def _keys(self, account: str, ip: str):
+        # Sin dirección del cliente no se cuenta por IP: una clave compartida ("")
+        # bloquearía el login de todos a la vez.
+        keys = [("account", account.strip().lower())]
+        if ip: keys.append(("ip", ip))
+        return keys
+
+    def retry_after(self, account: str, ip: str) -> int:
+        """Segundos que el cliente debe esperar; 0 si puede intentar."""
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for key in self._keys(account, ip):
+                failures = self._recent(key, now)
+                if len(failures) >= self.limits[key[0]]:
+                    wait = max(wait, failures[0] + self.window - now)
+            if wait: self.blocked += 1
+        return int(wait) + 1 if wait else 0
+
+    def record_failure(self, account: str, ip: str):
+        now = time.monotonic()
+        with self._lock:
+            for key in self._keys(account, ip):
+                self._failures.setdefault(key, deque()).append(now)
+            # Limpieza ocasional para que las claves viejas no crezcan sin límite.
+            if len(self._failures) > 10000:
+                for key in list(self._failures): self._recent(key, now)
+
+    def reset_account(self, account: str):
+        with self._lock:
+            self._failures.pop(("account", account.strip().lower()), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"tracked_keys": len(self._failures), "blocked": self.blocked}
+
+
+throttle = LoginThrottle(
+    max_per_account=settings.LOGIN_MAX_FAILURES_PER_ACCOUNT,
+    max_per_ip=settings.LOGIN_MAX_FAILURES_PER_IP,
+    window=settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+)
@@ -0,0 +1,96 @@
+# backend/logo_pipeline.py
+# PROCESAMIENTO DE LOGOS SUBIDOS
+#
+# Antes el archivo subido se guardaba tal cual en logos/ y ReportLab decodificaba y
+# escalaba la imagen original (a veces fotos de 5 MB) en cada PDF. Ahora, al subirlo:
+#   - el tipo real se detecta por el contenido (no por la extensión ni el Content-Type),
+#   - se reduce al tamaño con el que se dibuja en el PDF (151x76 pt) a LOGO_RENDER_DPI,
+#   - se guarda una única variante optimizada: JPEG si no tiene transparencia (ReportLab
+#     lo incrusta sin volver a decodificarlo) o PNG optimizado si la tiene,
+#   - el nombre incluye el hash del contenido, así que nunca se sobrescribe y puede
+#     servirse con caché de larga duración (GET /logos/{filename} en main).
+# Los archivos se guardan en el almacenamiento configurado (storage) bajo logos/.
+# Pillow se importa dentro de process(): solo lo cargan los procesos que reciben logos.
+
+import hashlib
+import io
+from dataclasses import dataclass
+
+import storage
+from config import settings
+
+LOGO_DIR = "logos"  # prefijo de las claves; con STORAGE_LOCAL_DIR="." es la carpeta de siempre
+LOGO_WIDTH_PT, LOGO_HEIGHT_PT = 151, 76
+ALLOWED_FORMATS = {"JPEG", "PNG"}
+# Protección contra "bombas" de descompresión: ninguna foto razonable pasa de ~50 MP.
+MAX_SOURCE_PIXELS = 50_000_000
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class InvalidLogo(ValueError):
+    """El archivo no es una imagen JPG o PNG válida."""
+
+
+@dataclass(frozen=True)
+class ProcessedLogo:
+    content: bytes
+    extension: str
+    width: int
+    height: int
+
+
+def target_size(dpi: int = None):
+    """Tamaño máximo en píxeles del logo para que se vea nítido al imprimir."""
+    dpi = dpi or settings.LOGO_RENDER_DPI
+    return round(LOGO_WIDTH_PT * dpi / 72), round(LOGO_HEIGHT_PT * dpi / 72)
+
+def _has_alpha(image) -> bool:
+    if image.mode in ("RGBA", "LA"): return image.getchannel("A").getextrema()[0] < 255
+    return image.mode == "P" and "transparency" in image.info
+
+def process(data: bytes) -> ProcessedLogo:
+    """Valida y optimiza un logo. Lanza InvalidLogo si no es un JPG/PNG legible."""
+    from PIL import Image, ImageOps
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            if probe.format not in ALLOWED_FORMATS: raise InvalidLogo("Tipo de archivo no permitido. Solo se aceptan JPG o PNG.")
+            if probe.width * probe.height > MAX_SOURCE_PIXELS: raise InvalidLogo("La imagen es demasiado grande.")
+            probe.verify()
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except InvalidLogo:
+        raise
+    except Exception:
+        raise InvalidLogo("El archivo no es una imagen válida.")
+
+    image = ImageOps.exif_transpose(image)  # las fotos de teléfono traen la rotación en EXIF
+    image.thumbnail(target_size(), Image.LANCZOS)  # solo reduce, nunca amplía
+    output = io.BytesIO()
+    if _has_alpha(image):
+        image.convert("RGBA").save(output, format="PNG", optimize=True)
+        extension = ".png"
+    else:
+        image.convert("RGB").save(output, format="JPEG", quality=settings.LOGO_JPEG_QUALITY, optimize=True)
+        extension = ".jpg"
+    return ProcessedLogo(content=output.getvalue(), extension=extension, width=image.width, height=image.height)
+
+def filename_for(user_id: int, logo: ProcessedLogo) -> str:
+    digest = hashlib.sha256(logo.content).hexdigest()[:16]
+    return f"user_{user_id}_{digest}{logo.extension}"
+
+def key_for(filename: str) -> str:
+    return f"{LOGO_DIR}/{filename}"
+
+def save(user_id: int, logo: ProcessedLogo) -> str:
+    """Sube la variante optimizada (si no existe ya) y devuelve su nombre."""
+    filename = filename_for(user_id, logo)
+    backend = storage.get_backend()
+    if not backend.exists(key_for(filename)):
+        content_type = "image/png" if logo.extension == ".png" else "image/jpeg"
+        backend.save(key_for(filename), logo.content, content_type=content_type)
+    return filename
+
+def remove(filename: str):
+    if not filename: return
+    try: storage.get_backend().delete(key_for(filename))
+    except Exception: pass  # un archivo huérfano no debe impedir el cambio de logo
@@ -1,200 +1,455 @@
 # backend/main.py
 # CORREGIDO: Se ha solucionado un error de sintaxis en la función get_db.
 
-import requests, os, re, shutil
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, File, UploadFile, Request, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from sqlalchemy import func # ¡ASEGÚRATE DE QUE ESTA LÍNEA ESTÉ PRESENTE!
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
 from jose import JWTError, jwt
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response, StreamingResponse, JSONResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
+from concurrent.futures.process import BrokenProcessPool
 
-import crud, models, schemas, security, pdf_generator
-from database import SessionLocal, engine
+import hmac
+import logging
+import mimetypes
+import crud, crud_async, models, schemas, security, pdf_cache, pdf_engine, pdf_export, migrations, auth_cache, password_hashing, login_throttle, document_lookup, roles, logo_pipeline, storage, search, catalog, metrics
+from database import AsyncSessionLocal, AsyncReadSessionLocal, engine
+import database
 from config import settings
 
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
+# Importar este módulo no toca la base de datos ni carga ReportLab, Pillow, httpx o
+# passlib: las migraciones y los roles se aplican al arrancar (lifespan) y las
+# librerías pesadas se importan la primera vez que se usan.
+logger = logging.getLogger(__name__)
+router = APIRouter()
+origins = ["http://localhost:5173", "http://127.0.0.1:5173", "https://cotizacion-react-bice.vercel.app"]
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-app.mount("/logos", StaticFiles(directory="logos"), name="logos")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # --- Arranque ---
+    database.require_configured()
+    # Con RUN_MIGRATIONS_ON_STARTUP=false las migraciones se corren antes del despliegue
+    # (python migrations.py) y cada instancia nueva solo carga los roles.
+    if settings.RUN_MIGRATIONS_ON_STARTUP: await run_in_threadpool(migrations.run_migrations, engine)
+    await run_in_threadpool(roles.sync_roles, engine)
+    await run_in_threadpool(roles.registry.load, engine)
+    yield
+    # --- Apagado ---
+    pdf_engine.engine.shutdown()
+    password_hashing.hasher.shutdown()
+    await document_lookup.service.aclose()
+    await database.async_engine.dispose()
+    if database.async_replica_engine is not database.async_engine: await database.async_replica_engine.dispose()
+    database.remove_memory_database()
 
-origins = ["http://localhost:5173", "http://127.0.0.1:5173", "https://cotizacion-react-bice.vercel.app"]
-app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+def create_app() -> FastAPI:
+    """Aplicación lista para servir: `uvicorn main:app` o `uvicorn --factory main:create_app`."""
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router)
+    app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["*"], allow_headers=["*"], expose_headers=["X-Next-Cursor"])
+    if settings.METRICS_ENABLED:
+        for instrumented_engine in (engine, database.replica_engine, database.async_engine.sync_engine, database.async_replica_engine.sync_engine):
+            metrics.instrument_engine(instrumented_engine)
+        # Agregado después de CORS para quedar por fuera: mide también los requests que CORS responde solo.
+        app.add_middleware(metrics.MetricsMiddleware)
+        if not settings.METRICS_TOKEN: logger.warning("METRICS_ENABLED sin METRICS_TOKEN: /metrics es público; defina METRICS_TOKEN fuera de desarrollo.")
+    return app
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+async def get_db():
+    # Sesión asíncrona: mientras se espera a la base de datos el event loop sigue
+    # atendiendo otros requests, sin ocupar un hilo del threadpool.
+    async with AsyncSessionLocal() as db:
+        yield db
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_read_db():
+    # Sesión para endpoints de solo lectura: usa la réplica si DATABASE_REPLICA_URL está
+    # configurada. Lo recién escrito puede tardar un instante en aparecer allí.
+    async with AsyncReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def load_principal(payload: dict) -> Optional[auth_cache.Principal]:
+    # Solo se llega aquí cuando el token no está en caché: se abre una sesión propia
+    # para que los requests servidos desde la caché no tomen conexión del pool.
+    async with AsyncSessionLocal() as db:
+        user_id = payload.get("uid")
+        user = await crud_async.get_user_by_id(db, user_id=user_id) if user_id is not None else await crud_async.get_user_by_email(db, email=payload.get("sub"))
+        if user is None or user.email != payload.get("sub"): return None
+        return auth_cache.Principal(id=user.id, email=user.email, is_active=user.is_active, is_admin=user.is_admin, role=user.role)
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> auth_cache.Principal:
+    """Identidad del usuario autenticado sin consultar la base de datos en el caso común."""
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None: raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-    except JWTError: raise credentials_exception
-    user = crud.get_user_by_email(db, email=token_data.email)
-    if user is None: raise credentials_exception
-    user.is_admin = (user.email == settings.ADMIN_EMAIL)
+    principal = auth_cache.cache.get(token)
+    if principal is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            if payload.get("sub") is None: raise credentials_exception
+        except JWTError: raise credentials_exception
+        principal = await load_principal(payload)
+        if principal is None: raise credentials_exception
+        auth_cache.cache.put(token, principal, token_exp=payload.get("exp"))
+    if not principal.is_active: raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Su cuenta ha sido desactivada.", headers={"WWW-Authenticate": "Bearer"})
+    return principal
+
+async def get_current_user(principal: auth_cache.Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
+    # Para los endpoints que necesitan el registro completo (perfil, logo, datos del PDF).
+    user = await crud_async.get_user_by_id(db, user_id=principal.id)
+    if user is None:
+        auth_cache.cache.invalidate_user(principal.id)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
     return user
 
-def get_current_admin_user(current_user: models.User = Depends(get_current_user)):
-    if not current_user.is_admin: raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
-    return current_user
+def require_permission(permission: str):
+    # Los permisos del rol están en memoria (roles.registry): la verificación no consulta la base de datos.
+    async def dependency(principal: auth_cache.Principal = Depends(get_current_principal)):
+        if not principal.can(permission): raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+        return principal
+    return dependency
+
+get_current_admin_user = require_permission(roles.ADMIN_ACCESS)
+get_user_manager = require_permission(roles.ADMIN_MANAGE_USERS)
 
 # --- Endpoints de Autenticación y Usuario ---
-@app.post("/token", response_model=schemas.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.authenticate_user(db, email=form_data.username, password=form_data.password)
-    if not user: raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email o contraseña incorrectos.", headers={"WWW-Authenticate": "Bearer"})
+def hash_queue_full() -> HTTPException:
+    # También cuando un worker de hash murió: el pool se recrea en la próxima llamada.
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="El servidor está ocupado. Intente nuevamente en unos segundos.", headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)})
+
+@router.post("/token", response_model=schemas.Token)
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    client_ip = login_throttle.client_ip(request)
+    retry_after = login_throttle.throttle.retry_after(form_data.username, client_ip)
+    if retry_after: raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Demasiados intentos fallidos. Intente nuevamente más tarde.", headers={"Retry-After": str(retry_after)})
+    user = await crud_async.get_user_by_email(db, form_data.username)
+    try:
+        valid, new_hash = await password_hashing.hasher.verify_and_update(form_data.password, user.hashed_password) if user else (False, None)
+    except (password_hashing.HashQueueFull, BrokenProcessPool): raise hash_queue_full()
+    if not valid:
+        login_throttle.throttle.record_failure(form_data.username, client_ip)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email o contraseña incorrectos.", headers={"WWW-Authenticate": "Bearer"})
+    login_throttle.throttle.reset_account(form_data.username)
+    # El costo de bcrypt cambió desde que se guardó este hash: se reemplaza de forma transparente.
+    if new_hash: await crud_async.update_password_hash(db, user.id, new_hash)
     if not user.is_active:
         reason = user.deactivation_reason or "Contacte al administrador."
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Su cuenta ha sido desactivada. Motivo: {reason}")
-    access_token = security.create_access_token(data={"sub": user.email})
+    access_token = security.create_access_token(data={"sub": user.email, "uid": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+@router.post("/users/", response_model=schemas.User)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await crud_async.get_user_by_email(db, user.email)
     if db_user: raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    try: hashed_password = await password_hashing.hasher.hash(user.password)
+    except (password_hashing.HashQueueFull, BrokenProcessPool): raise hash_queue_full()
+    return await crud_async.create_user(db, user, hashed_password)
 
-@app.get("/users/me/", response_model=schemas.User)
-def read_users_me(current_user: models.User = Depends(get_current_user)): return current_user
+@router.get("/users/me/", response_model=schemas.User)
+async def read_users_me(current_user: models.User = Depends(get_current_user)): return current_user
 
 # --- Endpoints de Cotizaciones y Perfil ---
-@app.post("/consultar-documento")
-def consultar_documento(consulta: schemas.DocumentoConsulta, current_user: models.User = Depends(get_current_user)):
-    token = settings.API_TOKEN
-    if not token: raise HTTPException(status_code=500, detail="API token not configured")
-    headers = {'Authorization': f'Bearer {token}'}
-    tipo, numero = consulta.tipo_documento, consulta.numero_documento
-    url = f"https://api.apis.net.pe/v2/reniec/dni?numero={numero}" if tipo == "DNI" else f"https://api.apis.net.pe/v2/sunat/ruc?numero={numero}"
-    try:
-        response = requests.get(url, headers=headers); response.raise_for_status(); data = response.json()
-        if tipo == "DNI": return {"nombre": f"{data.get('nombres', '')} {data.get('apellidoPaterno', '')} {data.get('apellidoMaterno', '')}".strip(), "direccion": ""}
-        else: return {"nombre": data.get('razonSocial', ''), "direccion": data.get('direccion', '')}
-    except requests.exceptions.RequestException: raise HTTPException(status_code=503, detail="Error al consultar la API externa")
-
-@app.post("/cotizaciones/", response_model=schemas.Cotizacion)
-def create_new_cotizacion(cotizacion: schemas.CotizacionCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.create_cotizacion(db=db, cotizacion=cotizacion, user_id=current_user.id)
-
-@app.get("/cotizaciones/", response_model=List[schemas.CotizacionInList])
-def read_cotizaciones(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.get_cotizaciones_by_owner(db=db, owner_id=current_user.id)
-
-@app.get("/cotizaciones/{cotizacion_id}", response_model=schemas.Cotizacion)
-def read_single_cotizacion(cotizacion_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    db_cotizacion = crud.get_cotizacion_by_id(db, cotizacion_id=cotizacion_id, owner_id=current_user.id)
+@router.post("/consultar-documento")
+async def consultar_documento(consulta: schemas.DocumentoConsulta, current_user: auth_cache.Principal = Depends(get_current_principal)):
+    if not settings.API_TOKEN: raise HTTPException(status_code=500, detail="API token not configured")
+    try: return await document_lookup.service.lookup(consulta.tipo_documento, consulta.numero_documento)
+    except ValueError as e: raise HTTPException(status_code=400, detail=str(e))
+    except document_lookup.DocumentNotFound: raise HTTPException(status_code=404, detail="No se encontraron datos para el documento.")
+    except document_lookup.DocumentLookupError: raise HTTPException(status_code=503, detail="Error al consultar la API externa")
+
+@router.post("/cotizaciones/", response_model=schemas.Cotizacion)
+async def create_new_cotizacion(cotizacion: schemas.CotizacionCreate, db: AsyncSession = Depends(get_db), current_user: auth_cache.Principal = Depends(get_current_principal)):
+    try: return await crud_async.create_cotizacion(db=db, cotizacion=cotizacion, user_id=current_user.id)
+    except catalog.UnknownItems as e: raise HTTPException(status_code=400, detail=str(e))
+
+def get_cotizacion_list_query(
+    cursor: Optional[int] = Query(None, description="id de la última cotización recibida (cabecera X-Next-Cursor)"),
+    limit: int = Query(settings.COTIZACIONES_PAGE_SIZE, ge=1, le=settings.COTIZACIONES_MAX_PAGE_SIZE),
+    fecha_desde: Optional[date] = None, fecha_hasta: Optional[date] = None,
+    cliente: Optional[str] = None, moneda: Optional[str] = None,
+    monto_min: Optional[Decimal] = None, monto_max: Optional[Decimal] = None,
+    fields: Optional[str] = Query(None, description="Columnas separadas por comas, p. ej. id,numero_cotizacion,monto_total"),
+) -> schemas.CotizacionListQuery:
+    field_list = None
+    if fields:
+        field_list = [f.strip() for f in fields.split(",") if f.strip()]
+        invalid = [f for f in field_list if f not in crud.COTIZACION_LIST_FIELDS]
+        if invalid: raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(invalid)}")
+    return schemas.CotizacionListQuery(
+        cursor=cursor, limit=limit, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta, cliente=cliente,
+        moneda=moneda, monto_min=monto_min, monto_max=monto_max, fields=field_list,
+    )
+
+async def list_cotizaciones(db: AsyncSession, owner_id: int, params: schemas.CotizacionListQuery, response: Response):
+    """Página de cotizaciones; el cursor de la siguiente va en la cabecera X-Next-Cursor."""
+    rows, next_cursor = await crud_async.get_cotizaciones_by_owner(db, owner_id=owner_id, params=params)
+    headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+    if params.fields:
+        # Respuesta parcial: solo las columnas pedidas, sin pasar por el response_model.
+        return JSONResponse(jsonable_encoder([dict(row._mapping) for row in rows]), headers=headers)
+    response.headers.update(headers)
+    return rows
+
+@router.get("/cotizaciones/", response_model=List[schemas.CotizacionInList])
+async def read_cotizaciones(response: Response, params: schemas.CotizacionListQuery = Depends(get_cotizacion_list_query), db: AsyncSession = Depends(get_read_db), current_user: auth_cache.Principal = Depends(get_current_principal)):
+    return await list_cotizaciones(db, current_user.id, params, response)
+
+# Antes de /cotizaciones/{cotizacion_id}: si no, "search" se tomaría como un id.
+@router.get("/cotizaciones/search", response_model=List[schemas.CotizacionSearchResult])
+async def search_cotizaciones(
+    q: str = Query(..., min_length=2, max_length=100, description="Cliente, número de documento, número de cotización o descripción de un producto"),
+    limit: int = Query(settings.SEARCH_PAGE_SIZE, ge=1, le=settings.SEARCH_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db), current_user: auth_cache.Principal = Depends(get_current_principal),
+):
+    if not search.normalize(q): raise HTTPException(status_code=400, detail="Ingrese letras o números para buscar")
+    return await crud_async.search_cotizaciones(db, owner_id=current_user.id, params=schemas.CotizacionSearchQuery(q=q.strip(), limit=limit))
+
+@router.get("/cotizaciones/{cotizacion_id}", response_model=schemas.Cotizacion)
+async def read_single_cotizacion(cotizacion_id: int, db: AsyncSession = Depends(get_db), current_user: auth_cache.Principal = Depends(get_current_principal)):
+    db_cotizacion = await crud_async.get_cotizacion_by_id(db, cotizacion_id=cotizacion_id, owner_id=current_user.id)
     if db_cotizacion is None: raise HTTPException(status_code=404, detail="Cotización no encontrada")
     return db_cotizacion
 
-@app.put("/cotizaciones/{cotizacion_id}", response_model=schemas.Cotizacion)
-def update_single_cotizacion(cotizacion_id: int, cotizacion: schemas.CotizacionCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    updated_cotizacion = crud.update_cotizacion(db, cotizacion_id=cotizacion_id, cotizacion_data=cotizacion, owner_id=current_user.id)
+@router.put("/cotizaciones/{cotizacion_id}", response_model=schemas.Cotizacion)
+async def update_single_cotizacion(cotizacion_id: int, cotizacion: schemas.CotizacionCreate, db: AsyncSession = Depends(get_db), current_user: auth_cache.Principal = Depends(get_current_principal)):
+    try: updated_cotizacion = await crud_async.update_cotizacion(db, cotizacion_id=cotizacion_id, cotizacion_data=cotizacion, owner_id=current_user.id)
+    except catalog.UnknownItems as e: raise HTTPException(status_code=400, detail=str(e))
     if updated_cotizacion is None: raise HTTPException(status_code=404, detail="Cotización no encontrada")
     return updated_cotizacion
 
-@app.delete("/cotizaciones/{cotizacion_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_single_cotizacion(cotizacion_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    if not crud.delete_cotizacion(db, cotizacion_id=cotizacion_id, owner_id=current_user.id): raise HTTPException(status_code=404, detail="Cotización no encontrada")
+@router.delete("/cotizaciones/{cotizacion_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_single_cotizacion(cotizacion_id: int, db: AsyncSession = Depends(get_db), current_user: auth_cache.Principal = Depends(get_current_principal)):
+    if not await crud_async.delete_cotizacion(db, cotizacion_id=cotizacion_id, owner_id=current_user.id): raise HTTPException(status_code=404, detail="Cotización no encontrada")
     return {"ok": True}
 
-@app.put("/profile/", response_model=schemas.User)
-def update_profile(profile_data: schemas.ProfileUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    for key, value in profile_data.model_dump(exclude_unset=True).items(): setattr(current_user, key, value)
-    db.add(current_user); db.commit(); db.refresh(current_user)
-    return current_user
-
-@app.post("/profile/logo/", response_model=schemas.User)
-def upload_logo(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    if file.content_type not in ["image/jpeg", "image/png"]: raise HTTPException(status_code=400, detail="Tipo de archivo no permitido. Solo se aceptan JPG o PNG.")
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    if file_extension not in [".jpg", ".jpeg", ".png"]: raise HTTPException(status_code=400, detail="Extensión de archivo no permitida.")
-    os.makedirs("logos", exist_ok=True)
-    filename = f"user_{current_user.id}_logo{file_extension}"
-    file_path = os.path.join("logos", filename)
-    with open(file_path, "wb") as buffer: shutil.copyfileobj(file.file, buffer)
-    current_user.logo_filename = filename
-    db.commit(); db.refresh(current_user)
-    return current_user
-
-def sanitize_filename(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', "", name.replace(' ', '_'))
-
-@app.get("/cotizaciones/{cotizacion_id}/pdf")
-def get_cotizacion_pdf(cotizacion_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    cotizacion = db.query(models.Cotizacion).filter(models.Cotizacion.id == cotizacion_id, models.Cotizacion.owner_id == current_user.id).first()
+@router.put("/profile/", response_model=schemas.User)
+async def update_profile(profile_data: schemas.ProfileUpdate, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    return await crud_async.update_profile(db, current_user, profile_data)
+
+@router.post("/profile/logo/", response_model=schemas.User)
+async def upload_logo(file: UploadFile = File(...), db: AsyncSession = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    data = await file.read(settings.LOGO_MAX_UPLOAD_BYTES + 1)
+    if len(data) > settings.LOGO_MAX_UPLOAD_BYTES: raise HTTPException(status_code=413, detail="El logo supera el tamaño máximo permitido.")
+    # El tipo se valida por el contenido y se guarda solo la variante reducida para el PDF.
+    try: logo = await run_in_threadpool(logo_pipeline.process, data)
+    except logo_pipeline.InvalidLogo as e: raise HTTPException(status_code=400, detail=str(e))
+    previous = current_user.logo_filename
+    filename = await run_in_threadpool(logo_pipeline.save, current_user.id, logo)
+    user = await crud_async.update_logo(db, current_user, filename)
+    if previous and previous != filename: await run_in_threadpool(logo_pipeline.remove, previous)
+    return user
+
+# --- Catálogo de productos ---
+CATALOG_DUPLICATE = "Ya existe un producto con esa descripción en el catálogo"
+CATALOG_NOT_FOUND = "Producto no encontrado en el catálogo"
+
+@router.get("/catalogo/", response_model=List[schemas.CatalogoItem])
+async def read_catalogo(
+    response: Response,
+    cursor: Optional[int] = Query(None, description="id del último producto recibido (cabecera X-Next-Cursor)"),
+    limit: int = Query(settings.COTIZACIONES_PAGE_SIZE, ge=1, le=settings.COTIZACIONES_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db), current_user: auth_cache.Principal = Depends(get_current_principal),
+):
+    items, next_cursor = await crud_async.get_catalogo_items(db, owner_id=current_user.id, cursor=cursor, limit=limit)
+    if next_cursor is not None: response.headers["X-Next-Cursor"] = str(next_cursor)
+    return items
+
+# Sesión principal (no la réplica): el índice se arma justo después de una edición del
+# catálogo, y una vez armado responde sin consultar la base de datos.
+@router.get("/catalogo/autocomplete", response_model=List[schemas.CatalogoItem])
+async def autocomplete_catalogo(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(settings.CATALOG_AUTOCOMPLETE_LIMIT, ge=1, le=settings.CATALOG_AUTOCOMPLETE_MAX_LIMIT),
+    db: AsyncSession = Depends(get_db), current_user: auth_cache.Principal = Depends(get_current_principal),
+):
+    return await crud_async.autocomplete_catalogo(db, owner_id=current_user.id, prefix=prefix, limit=limit)
+
+@router.post("/catalogo/", response_model=schemas.CatalogoItem)
+async def create_catalogo_item(item: schemas.CatalogoItemCreate, db: AsyncSession = Depends(get_db), current_user: auth_cache.Principal = Depends(get_current_principal)):
+    try: return await crud_async.create_catalogo_item(db, owner_id=current_user.id, item=item)
+    except catalog.DuplicateItem: raise HTTPException(status_code=409, detail=CATALOG_DUPLICATE)
+
+@router.put("/catalogo/{item_id}", response_model=schemas.CatalogoItem)
+async def update_catalogo_item(item_id: int, item: schemas.CatalogoItemUpdate, db: AsyncSession = Depends(get_db), current_user: auth_cache.Principal = Depends(get_current_principal)):
+    try: db_item = await crud_async.update_catalogo_item(db, owner_id=current_user.id, item_id=item_id, item_data=item)
+    except catalog.DuplicateItem: raise HTTPException(status_code=409, detail=CATALOG_DUPLICATE)
+    if db_item is None: raise HTTPException(status_code=404, detail=CATALOG_NOT_FOUND)
+    return db_item
+
+@router.delete("/catalogo/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_catalogo_item(item_id: int, db: AsyncSession = Depends(get_db), current_user: auth_cache.Principal = Depends(get_current_principal)):
+    if not await crud_async.delete_catalogo_item(db, owner_id=current_user.id, item_id=item_id): raise HTTPException(status_code=404, detail=CATALOG_NOT_FOUND)
+
+# --- Archivos (logos y URLs firmadas del almacenamiento local) ---
+async def stream_stored_file(key: str, headers: dict) -> StreamingResponse:
+    """Envía un archivo del almacenamiento en bloques, sin cargarlo entero en memoria."""
+    try: chunks = await run_in_threadpool(storage.get_backend().open, key)
+    except (storage.StorageNotFound, ValueError): raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+@router.get("/logos/{filename}")
+async def get_logo(filename: str):
+    backend = storage.get_backend()
+    key = logo_pipeline.key_for(filename)
+    if backend.redirects:
+        # S3/MinIO: el navegador descarga directo del bucket con una URL firmada temporal.
+        try: url = await run_in_threadpool(backend.url, key)
+        except ValueError: raise HTTPException(status_code=404, detail="Archivo no encontrado")
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers={"Cache-Control": f"public, max-age={settings.STORAGE_URL_TTL_SECONDS // 2}"})
+    # El nombre incluye el hash del contenido: se puede cachear por un año.
+    return await stream_stored_file(key, {"Cache-Control": logo_pipeline.IMMUTABLE_CACHE_CONTROL})
+
+@router.get("/files/{key:path}")
+async def get_signed_file(key: str, expires: int, signature: str):
+    backend = storage.get_backend()
+    try: valid = not backend.redirects and backend.verify(key, expires, signature)
+    except ValueError: valid = False
+    if not valid: raise HTTPException(status_code=403, detail="Enlace inválido o vencido")
+    return await stream_stored_file(key, {"Cache-Control": "private, max-age=0"})
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match: return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+async def load_pdf_snapshots(db: AsyncSession, cotizacion_id: int, owner_id: Optional[int] = None):
+    """Carga la cotización y su dueño y devuelve instantáneas para el motor de PDFs."""
+    cotizacion = await crud_async.get_cotizacion_with_owner(db, cotizacion_id, owner_id=owner_id)
     if not cotizacion: raise HTTPException(status_code=404, detail="Cotización no encontrada")
-    pdf_buffer = pdf_generator.create_pdf_buffer(cotizacion, current_user)
-    filename = f"Cotizacion_{cotizacion.numero_cotizacion}_{sanitize_filename(cotizacion.nombre_cliente)}.pdf"
-    headers = {"Content-Disposition": f"inline; filename=\"{filename}\""}
-    return StreamingResponse(pdf_buffer, media_type="application/pdf", headers=headers)
+    owner = cotizacion.owner
+    if not owner: raise HTTPException(status_code=404, detail="No se encontró el dueño de la cotización")
+    return pdf_engine.snapshot_cotizacion(cotizacion), pdf_engine.snapshot_user(owner)
+
+async def render_pdf(render):
+    """Espera un render del motor (bytes o archivo), traduciendo la saturación (o un worker caído) a 503."""
+    try:
+        return await render
+    except (pdf_engine.RenderQueueFull, BrokenProcessPool):
+        # BrokenProcessPool: un worker murió (p. ej. sin memoria); el motor recrea el pool en la próxima llamada.
+        raise HTTPException(status_code=503, detail="El generador de PDFs está ocupado. Intente nuevamente en unos segundos.", headers={"Retry-After": str(settings.PDF_RENDER_RETRY_AFTER_SECONDS)})
+    except pdf_engine.RenderTimeout:
+        raise HTTPException(status_code=504, detail="La generación del PDF tardó demasiado.")
+
+async def build_pdf_response(request: Request, cotizacion: pdf_engine.CotizacionSnapshot, owner: pdf_engine.UserSnapshot) -> Response:
+    """Sirve el PDF desde el caché (o lo genera) y responde 304 si el cliente ya lo tiene. Los PDF largos se transmiten desde un archivo temporal."""
+    key = pdf_cache.fingerprint(cotizacion, owner)
+    etag = f'"{key}"'
+    filename = pdf_export.pdf_filename(cotizacion)
+    headers = {"Content-Disposition": f"inline; filename=\"{filename}\"", "ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if pdf_engine.should_stream(cotizacion):
+        # Cotización larga: el PDF queda en un archivo temporal y se envía en bloques.
+        rendered = await render_pdf(pdf_engine.engine.render_to_file(cotizacion, owner))
+        headers["Content-Length"] = str(rendered.size)
+        return StreamingResponse(rendered.chunks(), media_type="application/pdf", headers=headers, background=BackgroundTask(rendered.discard))
+    pdf_bytes = await render_pdf(pdf_engine.render_cached(cotizacion, owner, key))
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
+@router.get("/cotizaciones/{cotizacion_id}/pdf")
+async def get_cotizacion_pdf(cotizacion_id: int, request: Request, db: AsyncSession = Depends(get_read_db), current_user: auth_cache.Principal = Depends(get_current_principal)):
+    cotizacion, owner = await load_pdf_snapshots(db, cotizacion_id, current_user.id)
+    return await build_pdf_response(request, cotizacion, owner)
+
+async def load_export_snapshots(db: AsyncSession, owner_id: int, export: schemas.CotizacionExportRequest):
+    owner = await crud_async.get_user_by_id(db, user_id=owner_id)
+    if not owner: raise HTTPException(status_code=404, detail="User not found")
+    cotizaciones = await crud_async.get_cotizaciones_for_export(db, owner_id=owner.id, export=export, limit=settings.PDF_EXPORT_MAX_COTIZACIONES)
+    if not cotizaciones: raise HTTPException(status_code=404, detail="No se encontraron cotizaciones para exportar")
+    return [pdf_engine.snapshot_cotizacion(c) for c in cotizaciones], pdf_engine.snapshot_user(owner)
+
+def build_export_response(cotizaciones, owner: pdf_engine.UserSnapshot) -> StreamingResponse:
+    headers = {"Content-Disposition": f"attachment; filename=\"Cotizaciones_{pdf_export.sanitize_filename(owner.business_name or str(owner.id))}.zip\""}
+    return StreamingResponse(pdf_export.stream_zip(cotizaciones, owner), media_type="application/zip", headers=headers)
+
+@router.post("/cotizaciones/export")
+async def export_cotizaciones(export: schemas.CotizacionExportRequest, db: AsyncSession = Depends(get_read_db), current_user: auth_cache.Principal = Depends(get_current_principal)):
+    cotizaciones, owner = await load_export_snapshots(db, current_user.id, export)
+    return build_export_response(cotizaciones, owner)
+
+# --- Métricas (Prometheus) ---
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    if not settings.METRICS_ENABLED: raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN and not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {settings.METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # --- Endpoints de Administrador ---
-@app.get("/admin/stats/", response_model=schemas.AdminDashboardStats)
-def get_admin_stats(db: Session = Depends(get_db), admin_user: models.User = Depends(get_current_admin_user)):
-    return crud.get_admin_dashboard_stats(db)
-
-@app.get("/admin/users/", response_model=List[schemas.AdminUserView])
-def get_users_for_admin(db: Session = Depends(get_db), admin_user: models.User = Depends(get_current_admin_user)):
-    users = crud.get_all_users(db)
-    for user in users: user.is_admin = (user.email == settings.ADMIN_EMAIL)
+@router.get("/admin/stats/", response_model=schemas.AdminDashboardStats)
+async def get_admin_stats(db: AsyncSession = Depends(get_read_db), admin_user: auth_cache.Principal = Depends(get_current_admin_user)):
+    return await crud_async.get_admin_dashboard_stats(db)
+
+@router.get("/admin/stats/trends/", response_model=List[schemas.CotizacionTrendPoint])
+async def get_admin_stats_trends(days: int = Query(30, ge=1, le=366), owner_id: Optional[int] = None, db: AsyncSession = Depends(get_read_db), admin_user: auth_cache.Principal = Depends(get_current_admin_user)):
+    desde = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    return await crud_async.get_cotizacion_trends(db, desde=desde, owner_id=owner_id)
+
+@router.get("/admin/runtime-stats/")
+async def get_runtime_stats(admin_user: auth_cache.Principal = Depends(get_current_admin_user)):
+    return {"pdf_cache": pdf_cache.cache.stats(), "pdf_engine": pdf_engine.engine.stats(), "auth_cache": auth_cache.cache.stats(), "password_hashing": password_hashing.hasher.stats(), "login_throttle": login_throttle.throttle.stats(), "document_lookup": document_lookup.service.stats(), "search_index": search.index_cache.stats(), "catalog_index": catalog.index_cache.stats(), "db_pool": database.pool_stats()}
+
+def get_admin_user_list_query(
+    search: Optional[str] = None,
+    sort: str = Query("id", pattern="^(id|creation_date|cotizaciones_count)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="Valor de la cabecera X-Next-Cursor de la página anterior"),
+    limit: int = Query(settings.COTIZACIONES_PAGE_SIZE, ge=1, le=settings.COTIZACIONES_MAX_PAGE_SIZE),
+) -> schemas.AdminUserListQuery:
+    return schemas.AdminUserListQuery(search=search, sort=sort, order=order, cursor=cursor, limit=limit)
+
+@router.get("/admin/users/", response_model=List[schemas.AdminUserView])
+async def get_users_for_admin(response: Response, params: schemas.AdminUserListQuery = Depends(get_admin_user_list_query), db: AsyncSession = Depends(get_read_db), admin_user: auth_cache.Principal = Depends(get_current_admin_user)):
+    try: users, next_cursor = await crud_async.get_users_for_admin(db, params=params)
+    except ValueError as e: raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor: response.headers["X-Next-Cursor"] = next_cursor
     return users
 
-@app.get("/admin/users/{user_id}", response_model=schemas.AdminUserDetailView)
-def get_user_details_for_admin(user_id: int, db: Session = Depends(get_db), admin_user: models.User = Depends(get_current_admin_user)):
-    user = crud.get_user_by_id_for_admin(db, user_id=user_id)
+@router.get("/admin/users/{user_id}", response_model=schemas.AdminUserDetailView)
+async def get_user_details_for_admin(user_id: int, db: AsyncSession = Depends(get_read_db), admin_user: auth_cache.Principal = Depends(get_current_admin_user)):
+    user = await crud_async.get_user_by_id_for_admin(db, user_id=user_id)
     if not user: raise HTTPException(status_code=404, detail="User not found")
-    user.is_admin = (user.email == settings.ADMIN_EMAIL)
     return user
 
-@app.get("/admin/users/{user_id}/cotizaciones", response_model=List[schemas.CotizacionInList])
-def get_user_cotizaciones_for_admin(user_id: int, db: Session = Depends(get_db), admin_user: models.User = Depends(get_current_admin_user)):
-    return crud.get_cotizaciones_by_owner(db, owner_id=user_id)
+@router.get("/admin/users/{user_id}/cotizaciones", response_model=List[schemas.CotizacionInList])
+async def get_user_cotizaciones_for_admin(user_id: int, response: Response, params: schemas.CotizacionListQuery = Depends(get_cotizacion_list_query), db: AsyncSession = Depends(get_read_db), admin_user: auth_cache.Principal = Depends(get_current_admin_user)):
+    return await list_cotizaciones(db, user_id, params, response)
+
+@router.post("/admin/users/{user_id}/cotizaciones/export")
+async def export_user_cotizaciones_for_admin(user_id: int, export: schemas.CotizacionExportRequest, db: AsyncSession = Depends(get_read_db), admin_user: auth_cache.Principal = Depends(get_current_admin_user)):
+    cotizaciones, owner = await load_export_snapshots(db, user_id, export)
+    return build_export_response(cotizaciones, owner)
 
 # ===================================================================
 # ESTA ES LA FUNCIÓN CORREGIDA
 # ===================================================================
-@app.put("/admin/users/{user_id}/status", response_model=schemas.AdminUserView)
-def update_user_status_for_admin(user_id: int, status_update: schemas.UserStatusUpdate, db: Session = Depends(get_db), admin_user: models.User = Depends(get_current_admin_user)):
-    user = crud.update_user_status(db, user_id=user_id, is_active=status_update.is_active, deactivation_reason=status_update.deactivation_reason)
+@router.put("/admin/users/{user_id}/status", response_model=schemas.AdminUserView)
+async def update_user_status_for_admin(user_id: int, status_update: schemas.UserStatusUpdate, db: AsyncSession = Depends(get_db), admin_user: auth_cache.Principal = Depends(get_user_manager)):
+    user = await crud_async.update_user_status(db, user_id=user_id, is_active=status_update.is_active, deactivation_reason=status_update.deactivation_reason)
     if not user: 
         raise HTTPException(status_code=404, detail="User not found")
-
-    # Se calcula y añade el conteo de cotizaciones que faltaba
-    cotizaciones_count = db.query(func.count(models.Cotizacion.id)).filter(models.Cotizacion.owner_id == user_id).scalar()
-    user.cotizaciones_count = cotizaciones_count
-    
-    user.is_admin = (user.email == settings.ADMIN_EMAIL)
     return user
 # ===================================================================
 
-@app.delete("/admin/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user_for_admin(user_id: int, db: Session = Depends(get_db), admin_user: models.User = Depends(get_current_admin_user)):
-    user_to_delete = db.query(models.User).filter(models.User.id == user_id).first()
+@router.delete("/admin/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_user_for_admin(user_id: int, db: AsyncSession = Depends(get_db), admin_user: auth_cache.Principal = Depends(get_user_manager)):
+    user_to_delete = await crud_async.get_user_by_id_for_admin(db, user_id=user_id)
     if not user_to_delete: raise HTTPException(status_code=404, detail="User not found")
     if user_to_delete.email == settings.ADMIN_EMAIL: raise HTTPException(status_code=400, detail="Cannot delete the main admin account")
-    if not crud.delete_user(db, user_id=user_id): raise HTTPException(status_code=404, detail="User not found during deletion")
+    if not await crud_async.delete_user(db, user_id=user_id): raise HTTPException(status_code=404, detail="User not found during deletion")
     return
 
-@app.get("/admin/cotizaciones/{cotizacion_id}/pdf")
-def get_admin_cotizacion_pdf(cotizacion_id: int, db: Session = Depends(get_db), admin_user: models.User = Depends(get_current_admin_user)):
-    cotizacion = db.query(models.Cotizacion).filter(models.Cotizacion.id == cotizacion_id).first()
-    if not cotizacion: raise HTTPException(status_code=404, detail="Cotización no encontrada")
-    quote_owner = cotizacion.owner
-    if not quote_owner: raise HTTPException(status_code=404, detail="No se encontró el dueño de la cotización")
-    pdf_buffer = pdf_generator.create_pdf_buffer(cotizacion, quote_owner)
-    filename = f"Cotizacion_{cotizacion.numero_cotizacion}_{sanitize_filename(cotizacion.nombre_cliente)}.pdf"
-    headers = {"Content-Disposition": f"inline; filename=\"{filename}\""}
-    return StreamingResponse(pdf_buffer, media_type="application/pdf", headers=headers)
+@router.get("/admin/cotizaciones/{cotizacion_id}/pdf")
+async def get_admin_cotizacion_pdf(cotizacion_id: int, request: Request, db: AsyncSession = Depends(get_read_db), admin_user: auth_cache.Principal = Depends(get_current_admin_user)):
+    cotizacion, quote_owner = await load_pdf_snapshots(db, cotizacion_id)
+    return await build_pdf_response(request, cotizacion, quote_owner)
+
+
+app = create_app()
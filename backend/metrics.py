@@ -0,0 +1,218 @@
+# backend/metrics.py
+# MÉTRICAS DE LA API: LATENCIA POR RUTA, CONSULTAS SQL, PDFs Y CONSULTAS EXTERNAS
+#
+# Sin dependencias nuevas: histogramas y contadores en memoria (por proceso) que
+# /metrics expone en el formato de texto de Prometheus.
+#   - MetricsMiddleware mide cada request por plantilla de ruta ("/cotizaciones/{cotizacion_id}",
+#     nunca el id concreto, para no multiplicar las series) y cuenta sus sentencias SQL.
+#   - instrument_engine() engancha before/after_cursor_execute de SQLAlchemy: duración
+#     por tipo de sentencia y registro (logging) de las consultas lentas con el SQL
+#     normalizado (parámetros y listas IN reemplazados por ?).
+#   - pdf_engine y document_lookup registran el tiempo de render y de la API externa.
+#
+# Con METRICS_SERVER_TIMING=true cada respuesta lleva la cabecera Server-Timing
+# (app, db, pdf, lookup), visible en la pestaña Network del navegador.
+#
+# Todo esto se activa con METRICS_ENABLED=true. Fuera de desarrollo se debe definir
+# también METRICS_TOKEN: sin él /metrics responde a cualquiera.
+
+import logging
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import event
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+SLOW_SQL_MAX_CHARS = 2000
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra: pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == math.inf: return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock: values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values)
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}  # etiquetas -> [conteo por bucket..., +Inf, suma]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        position = bisect_left(self.buckets, value)  # primer límite >= valor ("le")
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None: series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[position] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock: snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requests atendidos por ruta y código de estado.", ("method", "route", "status"))
+HTTP_DURATION = Histogram("http_request_duration_seconds", "Duración de los requests por ruta.", ("method", "route"))
+HTTP_DB_QUERIES = Histogram("http_request_db_queries", "Sentencias SQL por request.", ("method", "route"), COUNT_BUCKETS)
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "Duración de las sentencias SQL por tipo.", ("operation",), QUERY_BUCKETS)
+DB_SLOW_QUERIES = Counter("db_slow_queries_total", "Sentencias SQL más lentas que METRICS_SLOW_QUERY_MS.", ("operation",))
+PDF_RENDER_DURATION = Histogram("pdf_render_duration_seconds", "Render de PDFs en el motor (incluye la espera por un worker libre).", ("mode",))
+DOCUMENT_LOOKUP_DURATION = Histogram("document_lookup_duration_seconds", "Consultas de DNI/RUC según de dónde salió el resultado.", ("source",))
+DOCUMENT_API_DURATION = Histogram("document_api_request_duration_seconds", "Llamadas a la API externa de documentos por código de respuesta.", ("status",))
+
+REGISTRY = (HTTP_REQUESTS, HTTP_DURATION, HTTP_DB_QUERIES, DB_QUERY_DURATION, DB_SLOW_QUERIES, PDF_RENDER_DURATION, DOCUMENT_LOOKUP_DURATION, DOCUMENT_API_DURATION)
+
+def render() -> str:
+    """Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# --- Tiempos del request en curso (para Server-Timing y el conteo de consultas) ---
+class RequestTimings:
+    __slots__ = ("scope", "start", "db_queries", "durations")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.start = time.perf_counter()
+        self.db_queries = 0
+        self.durations: Dict[str, float] = {}  # "db", "pdf", "lookup" -> segundos acumulados
+
+    @property
+    def route(self) -> str:
+        # El router deja la ruta encontrada en el scope; sin ruta (404) se agrupa todo junto.
+        return getattr(self.scope.get("route"), "path", None) or "unmatched"
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        entries = [f"app;dur={(time.perf_counter() - self.start) * 1000:.1f}"]
+        for name, seconds in self.durations.items():
+            entry = f"{name};dur={seconds * 1000:.1f}"
+            if name == "db": entry += f';desc="{self.db_queries} consultas"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def record(name: str, seconds: float):
+    """Suma `seconds` al tramo `name` del request en curso (si lo hay)."""
+    timings = _current.get()
+    if timings is not None: timings.add(name, seconds)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: duración, código de estado y sentencias SQL de cada request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        timings = RequestTimings(scope)
+        token = _current.set(timings)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.METRICS_SERVER_TIMING:
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timings.server_timing().encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route, method = timings.route, scope["method"]
+            HTTP_REQUESTS.inc((method, route, str(status_code)))
+            HTTP_DURATION.observe((method, route), time.perf_counter() - timings.start)
+            HTTP_DB_QUERIES.observe((method, route), timings.db_queries)
+
+
+# --- SQLAlchemy ---
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|\$\d+|\?|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|__\[POSTCOMPILE_\w+\]")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(?:\(\?\.\.\.\)\s*,\s*)+\(\?\.\.\.\)")
+
+def normalize_sql(statement: str) -> str:
+    """SQL sin valores: parámetros, literales y listas IN/VALUES se reemplazan por ? (agrupa consultas iguales)."""
+    sql = " ".join(statement.split())
+    sql = _PLACEHOLDERS.sub("?", sql)
+    sql = _ROWS.sub("(?...)", _LISTS.sub("(?...)", sql))
+    return sql[:SLOW_SQL_MAX_CHARS]
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip()[:6].upper()
+    return word if word in SQL_OPERATIONS else "OTHER"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    operation = _operation(statement)
+    DB_QUERY_DURATION.observe((operation,), elapsed)
+    timings = _current.get()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.add("db", elapsed)
+    if settings.METRICS_SLOW_QUERY_MS and elapsed * 1000 >= settings.METRICS_SLOW_QUERY_MS:
+        DB_SLOW_QUERIES.inc((operation,))
+        logger.warning("Consulta lenta (%.0f ms, %s): %s", elapsed * 1000, timings.route if timings else "-", normalize_sql(statement))
+
+_instrumented = set()
+
+def instrument_engine(engine):
+    """Mide las sentencias de un motor síncrono (para los asíncronos: async_engine.sync_engine)."""
+    if id(engine) in _instrumented: return
+    _instrumented.add(id(engine))
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
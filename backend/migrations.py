@@ -0,0 +1,164 @@
+# backend/migrations.py
+# MIGRACIONES VERSIONADAS DEL ESQUEMA
+#
+# El esquema se crea y se modifica solo desde aquí: cada cambio se registra en orden
+# y se aplica una sola vez (las versiones aplicadas se guardan en schema_migrations).
+# La versión 0 crea las tablas de los modelos que todavía no existan en una base nueva;
+# a partir de ahí toda tabla o columna nueva necesita su propia migración. Todas las
+# sentencias son idempotentes para que una base recién creada con los modelos actuales
+# también pueda recorrerlas sin errores.
+#
+# La aplicación las aplica al arrancar (RUN_MIGRATIONS_ON_STARTUP). Para aplicarlas
+# antes de un despliegue (desde backend/):  python migrations.py
+
+import logging
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import func
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def _0000_initial_schema(conn):
+    # Antes la aplicación corría create_all en cada import de main.py; ahora solo aquí,
+    # una vez. En bases existentes no hace nada (las tablas ya están).
+    import models
+    models.Base.metadata.create_all(bind=conn)
+
+
+def _0001_numero_unique_per_owner(conn):
+    # El número de cotización pasa a ser único por usuario (necesario para la
+    # numeración por usuario); la secuencia sigue garantizando unicidad global.
+    conn.execute(text("DROP INDEX IF EXISTS ix_cotizaciones_numero_cotizacion"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cotizaciones_numero_cotizacion ON cotizaciones (numero_cotizacion)"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_cotizaciones_owner_numero ON cotizaciones (owner_id, numero_cotizacion)"))
+
+
+def _0002_cotizaciones_listing_indexes(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cotizaciones_owner_id_id ON cotizaciones (owner_id, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cotizaciones_owner_id_fecha_creacion ON cotizaciones (owner_id, fecha_creacion)"))
+
+
+def _0003_backfill_cotizacion_daily_rollups(conn):
+    # La tabla la crea la versión 0; aquí se llena con las cotizaciones ya existentes.
+    conn.execute(text("DELETE FROM cotizacion_daily_rollups"))
+    conn.execute(text(
+        "INSERT INTO cotizacion_daily_rollups (dia, owner_id, moneda, cotizaciones_count, monto_total) "
+        "SELECT date(fecha_creacion), owner_id, COALESCE(moneda, ''), COUNT(id), COALESCE(SUM(monto_total), 0) "
+        "FROM cotizaciones WHERE owner_id IS NOT NULL AND fecha_creacion IS NOT NULL GROUP BY 1, 2, 3"
+    ))
+
+
+def _0004_users_cotizaciones_count(conn):
+    if "cotizaciones_count" not in {c["name"] for c in inspect(conn).get_columns("users")}:
+        conn.execute(text("ALTER TABLE users ADD COLUMN cotizaciones_count INTEGER NOT NULL DEFAULT 0"))
+    conn.execute(text("UPDATE users SET cotizaciones_count = (SELECT COUNT(*) FROM cotizaciones WHERE cotizaciones.owner_id = users.id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_creation_date_id ON users (creation_date, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_cotizaciones_count_id ON users (cotizaciones_count, id)"))
+
+
+def _0005_users_role(conn):
+    # is_admin existía pero nunca se mantuvo; role pasa a ser el dato persistido.
+    # La cuenta ADMIN_EMAIL se promueve en cada arranque (roles.sync_roles).
+    if "role" not in {c["name"] for c in inspect(conn).get_columns("users")}:
+        conn.execute(text("ALTER TABLE users ADD COLUMN role VARCHAR NOT NULL DEFAULT 'user'"))
+    conn.execute(text("UPDATE users SET role = 'admin' WHERE is_admin"))
+    conn.execute(text("UPDATE users SET is_admin = (role = 'admin')"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_role ON users (role)"))
+
+
+def _0006_exact_amounts(conn):
+    # Importes en Numeric (Postgres convierte las columnas float; SQLite no tiene tipos
+    # estrictos y SQLAlchemy ya devuelve Decimal). El IGV de las cotizaciones existentes
+    # se calcula a partir de los totales guardados, sin cambiar esos totales.
+    import pricing
+    columns = {table: {c["name"] for c in inspect(conn).get_columns(table)} for table in ("productos", "cotizaciones")}
+    if "igv" not in columns["productos"]:
+        conn.execute(text("ALTER TABLE productos ADD COLUMN igv NUMERIC(14, 2)"))
+    for column in ("monto_igv", "monto_gravado"):
+        if column not in columns["cotizaciones"]:
+            conn.execute(text(f"ALTER TABLE cotizaciones ADD COLUMN {column} NUMERIC(14, 2)"))
+    if conn.dialect.name == "postgresql":
+        for table, column, scale in (("cotizaciones", "monto_total", 2), ("productos", "precio_unitario", 4), ("productos", "total", 2)):
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE NUMERIC(14, {scale}) USING ROUND({column}::numeric, {scale})"))
+        conn.execute(text("ALTER TABLE cotizacion_daily_rollups ALTER COLUMN monto_total TYPE NUMERIC(16, 2) USING ROUND(monto_total::numeric, 2)"))
+    engine = pricing.engine
+    share, decimals = engine.included_share, engine.decimals
+    conn.execute(text(f"UPDATE productos SET igv = ROUND(total * {share}, {decimals}) WHERE igv IS NULL"))
+    if engine.igv_rounding == "line":
+        conn.execute(text("UPDATE cotizaciones SET monto_igv = (SELECT COALESCE(SUM(igv), 0) FROM productos WHERE productos.cotizacion_id = cotizaciones.id) WHERE monto_igv IS NULL"))
+    else:
+        conn.execute(text(f"UPDATE cotizaciones SET monto_igv = ROUND(monto_total * {share}, {decimals}) WHERE monto_igv IS NULL"))
+    conn.execute(text("UPDATE cotizaciones SET monto_gravado = monto_total - monto_igv WHERE monto_gravado IS NULL"))
+
+
+def _0007_search_indexes(conn):
+    # El B-tree sobre productos.descripcion no sirve para buscar texto contenido (ver
+    # search.py). En Postgres se reemplaza por índices GIN de trigramas y de tsvector;
+    # las expresiones *_tsv deben coincidir con search.ts_vector. Las líneas se buscan
+    # por cotización, así que productos.cotizacion_id también necesita su índice.
+    from config import settings
+    conn.execute(text("DROP INDEX IF EXISTS ix_productos_descripcion"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_productos_cotizacion_id ON productos (cotizacion_id)"))
+    if conn.dialect.name != "postgresql": return
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    for table, column in (("cotizaciones", "nombre_cliente"), ("cotizaciones", "nro_documento"), ("productos", "descripcion")):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)"))
+    for table, column in (("cotizaciones", "nombre_cliente"), ("productos", "descripcion")):
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_tsv ON {table} "
+            f"USING gin (to_tsvector('{settings.SEARCH_TS_CONFIG}'::regconfig, coalesce({column}, '')))"
+        ))
+
+
+def _0008_productos_catalogo_item(conn):
+    # La tabla catalogo_items la crea la versión 0; los catálogos de los usuarios
+    # existentes se arman aparte, por lotes, con `python catalog.py`.
+    if "catalogo_item_id" not in {c["name"] for c in inspect(conn).get_columns("productos")}:
+        conn.execute(text("ALTER TABLE productos ADD COLUMN catalogo_item_id INTEGER REFERENCES catalogo_items (id) ON DELETE SET NULL"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_productos_catalogo_item_id ON productos (catalogo_item_id)"))
+
+
+MIGRATIONS = [
+    (0, "esquema inicial (tablas de los modelos)", _0000_initial_schema),
+    (1, "numero_cotizacion único por usuario", _0001_numero_unique_per_owner),
+    (2, "índices compuestos para el listado de cotizaciones", _0002_cotizaciones_listing_indexes),
+    (3, "resumen diario de cotizaciones", _0003_backfill_cotizacion_daily_rollups),
+    (4, "contador de cotizaciones por usuario", _0004_users_cotizaciones_count),
+    (5, "rol persistido por usuario", _0005_users_role),
+    (6, "importes exactos e IGV calculado en el servidor", _0006_exact_amounts),
+    (7, "índices de búsqueda por texto", _0007_search_indexes),
+    (8, "referencia de las líneas al catálogo de productos", _0008_productos_catalogo_item),
+]
+
+
+def run_migrations(engine):
+    """Aplica en orden las migraciones pendientes, cada una en su propia transacción."""
+    _metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    for version, name, migrate in MIGRATIONS:
+        if version in applied: continue
+        try:
+            with engine.begin() as conn:
+                migrate(conn)
+                conn.execute(schema_migrations.insert().values(version=version, name=name))
+        except IntegrityError:
+            continue  # otro worker la aplicó al mismo tiempo
+        logger.info("Migración %04d aplicada: %s", version, name)
+
+
+if __name__ == "__main__":
+    from database import engine, require_configured
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    require_configured()
+    run_migrations(engine)
@@ -1,18 +1,25 @@
 # backend/models.py
 # MODIFICADO PARA AÑADIR FECHA DE CREACIÓN AL USUARIO
 
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, JSON, Text
+from sqlalchemy import Column, Integer, String, Boolean, Numeric, Date, DateTime, ForeignKey, JSON, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Índices para el listado paginado del administrador (orden + id como desempate)
+        Index("ix_users_creation_date_id", "creation_date", "id"),
+        Index("ix_users_cotizaciones_count_id", "cotizaciones_count", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
-    is_admin = Column(Boolean, default=False)
+    # Rol persistido (ver roles.py); is_admin se mantiene en sincronía con role == "admin".
+    role = Column(String, nullable=False, default="user", server_default="user", index=True)
+    is_admin = Column(Boolean, nullable=False, default=False, server_default="0")
     deactivation_reason = Column(Text, nullable=True)
 
     # --- NUEVO CAMPO ---
@@ -30,18 +37,30 @@ class User(Base):
     pdf_note_2 = Column(String, default="LOS PRECIOS NO INCLUYEN ENVIOS")
     bank_accounts = Column(JSON, nullable=True)
 
+    # Contador desnormalizado; lo mantienen crud.create_cotizacion y crud.delete_cotizacion.
+    cotizaciones_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     cotizaciones = relationship("Cotizacion", back_populates="owner", cascade="all, delete-orphan")
 
 class Cotizacion(Base):
     __tablename__ = "cotizaciones"
+    __table_args__ = (
+        Index("uq_cotizaciones_owner_numero", "owner_id", "numero_cotizacion", unique=True),
+        # Índices para el listado paginado por usuario (keyset sobre id y filtros por fecha)
+        Index("ix_cotizaciones_owner_id_id", "owner_id", "id"),
+        Index("ix_cotizaciones_owner_id_fecha_creacion", "owner_id", "fecha_creacion"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    numero_cotizacion = Column(String, unique=True, index=True)
+    numero_cotizacion = Column(String, index=True)
     nombre_cliente = Column(String)
     direccion_cliente = Column(String)
     tipo_documento = Column(String)
     nro_documento = Column(String)
     moneda = Column(String)
-    monto_total = Column(Float)
+    # Importes calculados por pricing.py (Numeric: exactos, sin errores de float)
+    monto_total = Column(Numeric(14, 2))
+    monto_igv = Column(Numeric(14, 2))
+    monto_gravado = Column(Numeric(14, 2))
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="cotizaciones")
@@ -50,9 +69,64 @@ class Cotizacion(Base):
 class Producto(Base):
     __tablename__ = "productos"
     id = Column(Integer, primary_key=True, index=True)
-    descripcion = Column(String, index=True)
+    # Búsqueda por texto: índices GIN de trigramas y tsvector (migración 0007, ver search.py)
+    descripcion = Column(String)
     unidades = Column(Integer)
-    precio_unitario = Column(Float)
-    total = Column(Float)
-    cotizacion_id = Column(Integer, ForeignKey("cotizaciones.id"))
+    precio_unitario = Column(Numeric(14, 4))
+    total = Column(Numeric(14, 2))
+    igv = Column(Numeric(14, 2))
+    cotizacion_id = Column(Integer, ForeignKey("cotizaciones.id"), index=True)
     cotizacion = relationship("Cotizacion", back_populates="productos")
+    # Producto del catálogo del que se tomó la línea (la línea guarda su propia copia
+    # de descripción y precio: editar el catálogo no cambia cotizaciones ya hechas).
+    catalogo_item_id = Column(Integer, ForeignKey("catalogo_items.id", ondelete="SET NULL"), nullable=True, index=True)
+
+# --- Catálogo de productos por usuario (ver catalog.py) ---
+class CatalogoItem(Base):
+    __tablename__ = "catalogo_items"
+    __table_args__ = (
+        Index("uq_catalogo_items_owner_clave", "owner_id", "clave", unique=True),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    descripcion = Column(String, nullable=False)
+    clave = Column(String, nullable=False)  # descripción normalizada (catalog.clave): evita duplicados
+    precio_unitario = Column(Numeric(14, 4), nullable=False, default=0)
+    uso_count = Column(Integer, nullable=False, default=0, server_default="0")  # líneas que lo usaron
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# --- Secuencias de numeración (ver numbering.py) ---
+class CotizacionSequence(Base):
+    __tablename__ = "cotizacion_sequences"
+    scope = Column(String, primary_key=True)
+    next_value = Column(Integer, nullable=False, default=1)
+
+# --- Caché persistente de consultas RENIEC/SUNAT (ver document_lookup.py) ---
+class DocumentoConsultaCache(Base):
+    __tablename__ = "documento_consultas"
+    tipo_documento = Column(String, primary_key=True)
+    numero_documento = Column(String, primary_key=True)
+    encontrado = Column(Boolean, nullable=False, default=True)
+    nombre = Column(String)
+    direccion = Column(String)
+    consultado_en = Column(DateTime(timezone=True), nullable=False)
+
+# --- Resumen diario de cotizaciones (ver rollups.py) ---
+class CotizacionDailyRollup(Base):
+    __tablename__ = "cotizacion_daily_rollups"
+    dia = Column(Date, primary_key=True)
+    owner_id = Column(Integer, primary_key=True)
+    moneda = Column(String, primary_key=True)
+    cotizaciones_count = Column(Integer, nullable=False, default=0)
+    monto_total = Column(Numeric(16, 2), nullable=False, default=0)
+
+# --- Roles y permisos (ver roles.py) ---
+class Role(Base):
+    __tablename__ = "roles"
+    name = Column(String, primary_key=True)
+    description = Column(String, nullable=True)
+
+class RolePermission(Base):
+    __tablename__ = "role_permissions"
+    role = Column(String, ForeignKey("roles.name", ondelete="CASCADE"), primary_key=True)
+    permission = Column(String, primary_key=True)
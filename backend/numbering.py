@@ -0,0 +1,129 @@
+# backend/numbering.py
+# NUMERACIÓN ATÓMICA DE COTIZACIONES
+#
+# Antes el número se calculaba leyendo la última cotización y sumando uno, lo que
+# generaba duplicados cuando dos vendedores guardaban a la vez. Ahora cada alcance
+# (global o por usuario) tiene una fila en `cotizacion_sequences` que se incrementa
+# con un único UPDATE ... RETURNING: la base de datos bloquea la fila durante ese
+# instante y nunca entrega el mismo valor dos veces.
+#
+# Con COTIZACION_NUMBER_BLOCK_SIZE > 1 cada proceso reserva un bloque de números y
+# los reparte desde memoria, de modo que la fila compartida solo se toca una vez
+# por bloque. El costo es que un reinicio deja huecos en la numeración.
+#
+# next_number_async() hace lo mismo sobre el motor asíncrono, para los endpoints
+# async: la reserva no bloquea el event loop ni ocupa un hilo.
+
+import asyncio
+import threading
+
+from sqlalchemy import Integer, cast, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import settings
+import database, models
+
+_INSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class NumberAllocator:
+    def __init__(self, block_size: int = 1, per_owner: bool = False):
+        self.block_size = max(1, block_size)
+        self.per_owner = per_owner
+        self._blocks = {}  # alcance -> [siguiente, fin)
+        self._lock = threading.Lock()
+        self._async_locks = {}  # alcance -> asyncio.Lock
+
+    def scope_for(self, owner_id: int) -> str:
+        return f"owner:{owner_id}" if self.per_owner else "global"
+
+    def _seed_query(self, owner_id: int):
+        # Primera vez que se usa el alcance: se continúa desde el mayor número existente.
+        query = select(func.max(cast(models.Cotizacion.numero_cotizacion, Integer)))
+        if self.per_owner: query = query.where(models.Cotizacion.owner_id == owner_id)
+        return query
+
+    def _seed_value(self, conn, owner_id: int) -> int:
+        return (conn.execute(self._seed_query(owner_id)).scalar() or 0) + 1
+
+    @staticmethod
+    def _reserve_statement(scope: str, count: int):
+        sequences = models.CotizacionSequence.__table__
+        return update(sequences).where(sequences.c.scope == scope)\
+            .values(next_value=sequences.c.next_value + count)\
+            .returning(sequences.c.next_value)
+
+    @staticmethod
+    def _seed_statement(dialect_name: str, scope: str, seed: int):
+        # ON CONFLICT DO NOTHING: si otro proceso creó la fila al mismo tiempo no hay
+        # IntegrityError ni reintento; el siguiente UPDATE usa la fila existente.
+        sequences = models.CotizacionSequence.__table__
+        return _INSERT_DIALECTS[dialect_name](sequences).values(scope=scope, next_value=seed).on_conflict_do_nothing(index_elements=[sequences.c.scope])
+
+    def _reserve(self, scope: str, owner_id: int, count: int) -> int:
+        """Reserva `count` números consecutivos y devuelve el primero."""
+        stmt = self._reserve_statement(scope, count)
+        for _ in range(2):
+            with database.engine.begin() as conn:
+                reserved_until = conn.execute(stmt).scalar()
+            if reserved_until is not None: return reserved_until - count
+            with database.engine.begin() as conn:
+                conn.execute(self._seed_statement(conn.dialect.name, scope, self._seed_value(conn, owner_id)))
+        raise RuntimeError(f"No se pudo reservar un número de cotización para '{scope}'")
+
+    async def _reserve_async(self, scope: str, owner_id: int, count: int) -> int:
+        """Igual que _reserve, sobre el motor asíncrono."""
+        stmt = self._reserve_statement(scope, count)
+        for _ in range(2):
+            async with database.async_engine.begin() as conn:
+                reserved_until = (await conn.execute(stmt)).scalar()
+            if reserved_until is not None: return reserved_until - count
+            async with database.async_engine.begin() as conn:
+                seed = ((await conn.execute(self._seed_query(owner_id))).scalar() or 0) + 1
+                await conn.execute(self._seed_statement(conn.dialect.name, scope, seed))
+        raise RuntimeError(f"No se pudo reservar un número de cotización para '{scope}'")
+
+    def _take(self, scope: str):
+        block = self._blocks.get(scope)
+        if block is None or block[0] >= block[1]: return None
+        value = block[0]
+        block[0] += 1
+        return value
+
+    def _install(self, scope: str, start: int) -> int:
+        # Con self._lock tomado. Si otro hilo o corrutina repuso el bloque mientras se
+        # reservaba, se usa ese y el recién reservado queda como hueco en la numeración.
+        value = self._take(scope)
+        if value is None:
+            self._blocks[scope] = [start + 1, start + self.block_size]
+            value = start
+        return value
+
+    async def next_number_async(self, owner_id: int) -> str:
+        scope = self.scope_for(owner_id)
+        # Un asyncio.Lock por alcance: mientras una corrutina reserva el bloque, las demás
+        # esperan sin bloquear el event loop y luego toman números del bloque nuevo.
+        async with self._async_locks.setdefault(scope, asyncio.Lock()):
+            with self._lock:
+                value = self._take(scope)
+            if value is None:
+                start = await self._reserve_async(scope, owner_id, self.block_size)
+                with self._lock: value = self._install(scope, start)
+        return f"{value:04d}"
+
+    def next_number(self, owner_id: int) -> str:
+        scope = self.scope_for(owner_id)
+        # self._lock solo protege los bloques en memoria; la reserva en la base va fuera
+        # para no frenar otros alcances ni el event loop (next_number_async usa el mismo lock).
+        with self._lock:
+            value = self._take(scope)
+        if value is None:
+            start = self._reserve(scope, owner_id, self.block_size)
+            with self._lock: value = self._install(scope, start)
+        return f"{value:04d}"
+
+
+allocator = NumberAllocator(
+    block_size=settings.COTIZACION_NUMBER_BLOCK_SIZE,
+    per_owner=settings.COTIZACION_NUMBER_SCOPE == "owner",
+)
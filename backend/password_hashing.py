@@ -0,0 +1,90 @@
+# backend/password_hashing.py
+# HASH DE CONTRASEÑAS FUERA DE LOS WORKERS DE REQUESTS
+#
+# bcrypt consume entre 100 y 300 ms de CPU por llamada. Ejecutarlo en los handlers
+# síncronos ocupaba los hilos del threadpool compartido, así que una ráfaga de logins
+# dejaba sin hilos al resto de endpoints. Aquí el trabajo va a un pool de procesos
+# propio (escala con los núcleos) con una cola acotada, igual que el motor de PDFs.
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from config import settings
+
+
+class HashQueueFull(Exception):
+    """Hay demasiadas operaciones de hash en cola; el cliente debe reintentar más tarde."""
+
+
+# --- Funciones que corren dentro de los workers ---
+def hash_password(password: str) -> str:
+    import security
+    return security.get_pwd_context().hash(password)
+
+def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    # Devuelve (válida, hash_nuevo). hash_nuevo solo viene cuando el hash guardado
+    # usa un costo distinto de BCRYPT_ROUNDS y hay que reemplazarlo.
+    import security
+    return security.get_pwd_context().verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """Pool de procesos con cola acotada. Con workers=0 usa el threadpool por defecto."""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0: return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HashQueueFull()
+        self._pending += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+            self.completed += 1
+            return result
+        except BrokenProcessPool:
+            self._executor = None
+            raise
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(verify_and_update, password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,181 @@
+# backend/pdf_cache.py
+# CACHÉ DIRECCIONADO POR CONTENIDO PARA LOS PDF DE COTIZACIONES
+#
+# La clave de cada PDF es un hash (huella) de todo lo que influye en su contenido:
+# la cotización, sus productos y los datos de marca del dueño. Si cualquiera de esos
+# datos cambia, la huella cambia y el PDF viejo simplemente deja de pedirse.
+# Aun así, las entradas obsoletas se eliminan explícitamente desde crud/main
+# para no ocupar memoria ni almacenamiento.
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import storage
+from config import settings
+
+# Se incrementa cuando cambia el diseño en pdf_generator para no servir PDFs antiguos.
+LAYOUT_VERSION = "2"
+
+OWNER_FIELDS = (
+    "email", "business_name", "business_address", "business_ruc", "business_phone",
+    "logo_filename", "primary_color", "pdf_note_1", "pdf_note_1_color", "pdf_note_2",
+    "bank_accounts",
+)
+COTIZACION_FIELDS = (
+    "id", "numero_cotizacion", "nombre_cliente", "direccion_cliente", "tipo_documento",
+    "nro_documento", "moneda", "monto_total", "monto_igv", "monto_gravado", "fecha_creacion",
+)
+
+
+def fingerprint(cotizacion, user) -> str:
+    """Calcula la huella SHA-256 de los datos que determinan el PDF de una cotización."""
+    payload = {
+        "layout": LAYOUT_VERSION,
+        "cotizacion": {field: getattr(cotizacion, field) for field in COTIZACION_FIELDS},
+        "productos": [
+            [prod.id, prod.descripcion, prod.unidades, prod.precio_unitario, prod.total, prod.igv]
+            for prod in cotizacion.productos
+        ],
+        # logo_filename incluye el hash del contenido del logo: no hace falta leer el archivo.
+        "owner": {field: getattr(user, field) for field in OWNER_FIELDS},
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    """
+    LRU en memoria acotado por número de entradas y por bytes, con un segundo nivel
+    opcional en el almacenamiento de archivos (local o S3, compartido entre réplicas).
+    Es seguro para usarse desde varios hilos del threadpool.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, storage_prefix: str = ""):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.storage_prefix = storage_prefix.strip("/")
+        self._entries = OrderedDict()  # clave -> (cotizacion_id, owner_id, bytes)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.storage_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Escrituras y borrados del segundo nivel en segundo plano y en orden: con S3 son
+        # llamadas de red y se invocan desde el event loop. Perder una es inofensivo,
+        # porque una huella vieja nunca vuelve a pedirse.
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-cache-store") if self.storage_prefix else None
+
+    @property
+    def persistent(self) -> bool:
+        return bool(self.storage_prefix)
+
+    # --- Nivel en almacenamiento ---
+    # Claves <prefijo>/<owner_id>/<cotizacion_id>/<huella>.pdf para poder invalidar
+    # también los archivos escritos por otros procesos o réplicas.
+    def _storage_key(self, owner_id: int, cotizacion_id: Optional[int] = None, key: Optional[str] = None) -> str:
+        parts = [self.storage_prefix, str(owner_id)]
+        if cotizacion_id is not None: parts.append(str(cotizacion_id))
+        if key is not None: parts.append(f"{key}.pdf")
+        return "/".join(parts)
+
+    def _background(self, fn, *args):
+        def run():
+            try: fn(*args)
+            except Exception: pass
+        self._writer.submit(run)
+
+    def _remove_from_storage(self, owner_id: int, cotizacion_id: Optional[int] = None):
+        if not self.persistent: return
+        self._background(storage.get_backend().delete_prefix, self._storage_key(owner_id, cotizacion_id))
+
+    # --- Nivel en memoria ---
+    def _store(self, key: str, cotizacion_id: int, owner_id: int, data: bytes):
+        if len(data) > self.max_bytes: return
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key)[2])
+        self._entries[key] = (cotizacion_id, owner_id, data)
+        self._size += len(data)
+        while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def get_memory(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None: return None
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            return entry[2]
+
+    def get_stored(self, key: str, cotizacion_id: int, owner_id: int, remember: bool = True) -> Optional[bytes]:
+        """Busca en el segundo nivel (bloqueante: desde async usar el threadpool)."""
+        data = None
+        if self.persistent:
+            try: data = storage.get_backend().read(self._storage_key(owner_id, cotizacion_id, key))
+            except Exception: data = None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.storage_hits += 1
+            if remember: self._store(key, cotizacion_id, owner_id, data)
+        return data
+
+    def get(self, key: str, cotizacion_id: int, owner_id: int) -> Optional[bytes]:
+        data = self.get_memory(key)
+        return data if data is not None else self.get_stored(key, cotizacion_id, owner_id)
+
+    def put(self, key: str, data: bytes, cotizacion_id: int, owner_id: int, remember: bool = True):
+        # remember=False: solo el segundo nivel (p. ej. exportaciones masivas, que no deben
+        # desplazar del LRU a los PDFs que se abren seguido).
+        if remember:
+            with self._lock:
+                self._store(key, cotizacion_id, owner_id, data)
+        if self.persistent:
+            self._background(storage.get_backend().save, self._storage_key(owner_id, cotizacion_id, key), data, "application/pdf")
+
+    def invalidate_cotizacion(self, cotizacion_id: int, owner_id: int):
+        """Elimina todas las versiones en caché del PDF de una cotización."""
+        with self._lock:
+            stale = [k for k, (cid, _, _) in self._entries.items() if cid == cotizacion_id]
+            for key in stale:
+                self._size -= len(self._entries.pop(key)[2])
+            self.invalidations += len(stale)
+        self._remove_from_storage(owner_id, cotizacion_id)
+
+    def invalidate_owner(self, owner_id: int):
+        """Elimina todos los PDFs de un usuario (p. ej. al cambiar su perfil o logo)."""
+        with self._lock:
+            stale = [k for k, (_, oid, _) in self._entries.items() if oid == owner_id]
+            for key in stale:
+                self._size -= len(self._entries.pop(key)[2])
+            self.invalidations += len(stale)
+        self._remove_from_storage(owner_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.storage_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "memory_hits": self.memory_hits,
+                "storage_hits": self.storage_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": round((self.memory_hits + self.storage_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+cache = PdfCache(
+    max_entries=settings.PDF_CACHE_MAX_ENTRIES,
+    max_bytes=settings.PDF_CACHE_MAX_BYTES,
+    storage_prefix=settings.PDF_CACHE_DIR,
+)
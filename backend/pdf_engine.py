@@ -0,0 +1,255 @@
+# backend/pdf_engine.py
+# MOTOR DE RENDERIZADO DE PDFs EN UN POOL DE PROCESOS
+#
+# ReportLab es CPU puro y retiene el GIL durante todo el armado del documento.
+# Aquí el armado se envía a un ProcessPoolExecutor para que el event loop y el
+# threadpool de FastAPI sigan atendiendo al resto de endpoints. Los workers reciben
+# instantáneas (snapshots) simples y serializables, nunca objetos del ORM.
+#
+# Las cotizaciones con muchas líneas (PDF_STREAM_MIN_LINES) se generan en modo
+# streaming: el worker escribe el PDF en un archivo temporal y devuelve solo su ruta
+# y tamaño; la respuesta lo envía en bloques con Content-Length. Así el proceso de la
+# API nunca tiene el documento completo en memoria (ni el pickle de vuelta del worker,
+# ni la copia del BytesIO, ni el cuerpo de la respuesta).
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Iterator, Optional, Tuple
+
+from config import settings
+import metrics, pdf_cache
+
+
+# --- Instantáneas serializables (mismos atributos que los modelos) ---
+@dataclass(frozen=True)
+class ProductoSnapshot:
+    id: int
+    descripcion: str
+    unidades: int
+    precio_unitario: Decimal
+    total: Decimal
+    igv: Decimal
+
+@dataclass(frozen=True)
+class CotizacionSnapshot:
+    id: int
+    owner_id: int
+    numero_cotizacion: str
+    nombre_cliente: str
+    direccion_cliente: str
+    tipo_documento: str
+    nro_documento: str
+    moneda: str
+    monto_total: Decimal
+    monto_igv: Decimal
+    monto_gravado: Decimal
+    fecha_creacion: datetime
+    productos: Tuple[ProductoSnapshot, ...]
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    id: int
+    email: str
+    business_name: Optional[str]
+    business_address: Optional[str]
+    business_ruc: Optional[str]
+    business_phone: Optional[str]
+    logo_filename: Optional[str]
+    primary_color: Optional[str]
+    pdf_note_1: Optional[str]
+    pdf_note_1_color: Optional[str]
+    pdf_note_2: Optional[str]
+    bank_accounts: Any
+
+
+def snapshot_cotizacion(cotizacion) -> CotizacionSnapshot:
+    return CotizacionSnapshot(
+        id=cotizacion.id, owner_id=cotizacion.owner_id,
+        numero_cotizacion=cotizacion.numero_cotizacion, nombre_cliente=cotizacion.nombre_cliente,
+        direccion_cliente=cotizacion.direccion_cliente, tipo_documento=cotizacion.tipo_documento,
+        nro_documento=cotizacion.nro_documento, moneda=cotizacion.moneda,
+        monto_total=cotizacion.monto_total, monto_igv=cotizacion.monto_igv,
+        monto_gravado=cotizacion.monto_gravado, fecha_creacion=cotizacion.fecha_creacion,
+        productos=tuple(
+            ProductoSnapshot(id=p.id, descripcion=p.descripcion, unidades=p.unidades,
+                             precio_unitario=p.precio_unitario, total=p.total, igv=p.igv)
+            for p in cotizacion.productos
+        ),
+    )
+
+def snapshot_user(user) -> UserSnapshot:
+    return UserSnapshot(
+        id=user.id, email=user.email, business_name=user.business_name,
+        business_address=user.business_address, business_ruc=user.business_ruc,
+        business_phone=user.business_phone, logo_filename=user.logo_filename,
+        primary_color=user.primary_color, pdf_note_1=user.pdf_note_1,
+        pdf_note_1_color=user.pdf_note_1_color, pdf_note_2=user.pdf_note_2,
+        bank_accounts=user.bank_accounts,
+    )
+
+
+class RenderQueueFull(Exception):
+    """Hay demasiados PDFs en cola; el cliente debe reintentar más tarde."""
+
+class RenderTimeout(Exception):
+    """El PDF no se generó dentro del tiempo máximo permitido."""
+
+
+def render_pdf_bytes(cotizacion: CotizacionSnapshot, user: UserSnapshot) -> bytes:
+    # Se ejecuta dentro del worker; el import queda aquí para que ReportLab solo
+    # se cargue en los procesos que realmente generan PDFs.
+    import pdf_generator
+    return pdf_generator.create_pdf_buffer(cotizacion, user).getvalue()
+
+def render_pdf_file(cotizacion: CotizacionSnapshot, user: UserSnapshot, directory: str) -> Tuple[str, int]:
+    """Genera el PDF en un archivo temporal (dentro del worker) y devuelve su ruta y tamaño."""
+    import pdf_generator
+    fd, path = tempfile.mkstemp(prefix="cotizacion_", suffix=".pdf", dir=directory or None)
+    try:
+        with os.fdopen(fd, "wb") as output: pdf_generator.write_pdf(cotizacion, user, output)
+        return path, os.path.getsize(path)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+@dataclass
+class RenderedFile:
+    """PDF ya generado en disco; se lee en bloques y se borra al terminar la respuesta."""
+    path: str
+    size: int
+
+    def chunks(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk: break
+                yield chunk
+
+    def discard(self):
+        try: os.remove(self.path)
+        except OSError: pass
+
+def _discard_abandoned(future):
+    # El render terminó después del timeout: nadie va a enviar ese archivo.
+    if not future.cancelled() and future.exception() is None:
+        RenderedFile(*future.result()).discard()
+
+def should_stream(cotizacion: CotizacionSnapshot) -> bool:
+    return settings.PDF_STREAM_MIN_LINES > 0 and len(cotizacion.productos) >= settings.PDF_STREAM_MIN_LINES
+
+
+class PdfRenderEngine:
+    """
+    Envía los renders a un pool de procesos con una cola acotada. Con workers=0 el
+    render se hace en el threadpool por defecto (útil en desarrollo).
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.rendered = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0: return None
+        if self._executor is None:
+            # "spawn" evita heredar locks de los hilos del servidor al hacer fork.
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _release(self, _future=None):
+        self._pending -= 1
+
+    async def _run(self, fn, *args, on_abandoned=None):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise RenderQueueFull()
+        self._pending += 1
+        future = None
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_executor(), fn, *args)
+            # Un render en marcha no se puede cancelar (ni en un proceso ni en un hilo):
+            # al vencer el plazo se deja terminar en segundo plano y se espera protegido.
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+            self.rendered += 1
+            elapsed = time.perf_counter() - start
+            metrics.PDF_RENDER_DURATION.observe((fn.__name__.removeprefix("render_pdf_"),), elapsed)  # "bytes" o "file"
+            metrics.record("pdf", elapsed)
+            return result
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise RenderTimeout()
+        except BrokenProcessPool:
+            # Un worker murió (p. ej. sin memoria); se recrea el pool en la próxima llamada.
+            self._executor = None
+            raise
+        finally:
+            if future is not None and not future.done():
+                # Timeout o request cancelado: el worker sigue ocupado, así que el cupo de la
+                # cola se libera recién cuando termina; si el resultado necesita limpieza (un
+                # archivo temporal), on_abandoned lo descarta.
+                future.add_done_callback(self._release)
+                if on_abandoned is not None: future.add_done_callback(on_abandoned)
+            else:
+                self._release()
+
+    async def render(self, cotizacion: CotizacionSnapshot, user: UserSnapshot) -> bytes:
+        return await self._run(render_pdf_bytes, cotizacion, user)
+
+    async def render_to_file(self, cotizacion: CotizacionSnapshot, user: UserSnapshot) -> RenderedFile:
+        path, size = await self._run(render_pdf_file, cotizacion, user, settings.PDF_STREAM_TMP_DIR, on_abandoned=_discard_abandoned)
+        return RenderedFile(path=path, size=size)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "rendered": self.rendered,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+async def render_cached(cotizacion: CotizacionSnapshot, user: UserSnapshot, key: Optional[str] = None, remember: bool = True) -> bytes:
+    """
+    Devuelve el PDF desde el caché o lo genera en el motor y lo guarda. Con
+    remember=False (exportaciones) usa el caché pero no agrega nada al nivel en memoria.
+    """
+    key = key or pdf_cache.fingerprint(cotizacion, user)
+    pdf_bytes = pdf_cache.cache.get_memory(key)
+    if pdf_bytes is None:
+        # El segundo nivel puede estar en S3: la lectura no debe bloquear el event loop.
+        lookup = pdf_cache.cache.get_stored
+        pdf_bytes = await asyncio.to_thread(lookup, key, cotizacion.id, user.id, remember) if pdf_cache.cache.persistent else lookup(key, cotizacion.id, user.id, remember)
+    if pdf_bytes is not None: return pdf_bytes
+    pdf_bytes = await engine.render(cotizacion, user)
+    pdf_cache.cache.put(key, pdf_bytes, cotizacion.id, user.id, remember=remember)
+    return pdf_bytes
+
+
+engine = PdfRenderEngine(
+    workers=settings.PDF_RENDER_WORKERS,
+    max_pending=settings.PDF_RENDER_MAX_PENDING,
+    timeout=settings.PDF_RENDER_TIMEOUT_SECONDS,
+)
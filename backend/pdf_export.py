@@ -0,0 +1,105 @@
+# backend/pdf_export.py
+# EXPORTACIÓN MASIVA DE COTIZACIONES COMO UN ZIP TRANSMITIDO POR PARTES
+#
+# Los PDFs se generan en paralelo (con un límite) y cada uno se escribe en el ZIP
+# apenas está listo. El ZIP se escribe sobre un destino no "seekable", así que
+# zipfile usa descriptores de datos y nunca necesita tener el archivo completo
+# en memoria: cada fragmento se envía al cliente y se descarta.
+#
+# A mitad de la transmisión ya no se puede cambiar el código de respuesta: si un PDF
+# no se puede generar, el ZIP lleva en su lugar un .txt con el motivo y el resto de
+# la exportación continúa. Los PDFs exportados no se guardan en el caché en memoria.
+
+import asyncio
+import logging
+import re
+import time
+import zipfile
+from typing import AsyncIterator, List
+
+from config import settings
+import pdf_engine
+
+logger = logging.getLogger(__name__)
+QUEUE_POLL_SECONDS = (0.05, 1.0)  # espera inicial y máxima entre intentos con la cola llena
+
+
+def sanitize_filename(name: str) -> str:
+    return re.sub(r'[\\/*?:"<>|]', "", name.replace(' ', '_'))
+
+def pdf_filename(cotizacion) -> str:
+    return f"Cotizacion_{cotizacion.numero_cotizacion}_{sanitize_filename(cotizacion.nombre_cliente)}.pdf"
+
+
+class _ChunkSink:
+    """Destino de escritura para zipfile que acumula bytes hasta que se vacían."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _render_with_backoff(cotizacion: pdf_engine.CotizacionSnapshot, owner: pdf_engine.UserSnapshot) -> bytes:
+    # Con la cola del motor llena se espera turno, como máximo PDF_EXPORT_QUEUE_WAIT_SECONDS.
+    deadline = time.monotonic() + settings.PDF_EXPORT_QUEUE_WAIT_SECONDS
+    delay, max_delay = QUEUE_POLL_SECONDS
+    while True:
+        try:
+            return await pdf_engine.render_cached(cotizacion, owner, remember=False)
+        except pdf_engine.RenderQueueFull:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: raise
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+
+def error_entry(cotizacion, error: Exception):
+    """(nombre, contenido) del .txt que reemplaza a un PDF que no se pudo generar."""
+    if isinstance(error, pdf_engine.RenderTimeout): reason = "la generación tardó demasiado"
+    elif isinstance(error, pdf_engine.RenderQueueFull): reason = "el generador de PDFs estuvo ocupado durante toda la espera"
+    else: reason = "error interno al generar el PDF"
+    text = f"No se pudo generar el PDF de la cotización {cotizacion.numero_cotizacion} ({reason}).\nDescárguela individualmente o vuelva a exportarla.\n"
+    return f"ERROR_{pdf_filename(cotizacion)[:-4]}.txt", text.encode("utf-8")
+
+
+async def stream_zip(cotizaciones: List[pdf_engine.CotizacionSnapshot], owner: pdf_engine.UserSnapshot) -> AsyncIterator[bytes]:
+    """Genera los fragmentos de un ZIP con el PDF de cada cotización."""
+    sink = _ChunkSink()
+    pending = {}  # tarea -> cotización
+    queue = iter(cotizaciones)
+    concurrency = max(1, settings.PDF_EXPORT_CONCURRENCY)
+    try:
+        # Los PDFs ya vienen comprimidos; volver a comprimirlos solo gasta CPU.
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+            while True:
+                while len(pending) < concurrency:
+                    cotizacion = next(queue, None)
+                    if cotizacion is None: break
+                    pending[asyncio.ensure_future(_render_with_backoff(cotizacion, owner))] = cotizacion
+                if not pending: break
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    cotizacion = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        archive.writestr(pdf_filename(cotizacion), task.result())
+                    else:
+                        logger.warning("Exportación: no se pudo generar la cotización %s: %r", cotizacion.id, error)
+                        archive.writestr(*error_entry(cotizacion, error))
+                chunk = sink.drain()
+                if chunk: yield chunk
+        chunk = sink.drain()
+        if chunk: yield chunk
+    finally:
+        # Si el cliente se desconecta, no dejamos trabajo huérfano.
+        for task in pending: task.cancel()
@@ -1,67 +1,256 @@
 import io
-import os
+import threading
+from collections import OrderedDict
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, Image, Spacer, Paragraph
+from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, Image, Spacer, Paragraph, Flowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.utils import ImageReader
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
-import models
+from typing import TYPE_CHECKING
+import storage
+from logo_pipeline import LOGO_WIDTH_PT, LOGO_HEIGHT_PT, key_for as logo_key
 
-def create_pdf_buffer(cotizacion: models.Cotizacion, user: models.User):
-    buffer = io.BytesIO()
-    margen_izq = 20
-    margen_der = 20
-    ancho_total = letter[0] - margen_izq - margen_der
-    
-    doc = SimpleDocTemplate(buffer, pagesize=letter,
-                            leftMargin=margen_izq, rightMargin=margen_der,
-                            topMargin=20, bottomMargin=20)
-    
-    styles = getSampleStyleSheet()
-    
-    # --- NUEVO ESTILO PARA EL TEXTO DE LA CABECERA ---
-    # Creamos un estilo centrado para los párrafos de la cabecera
-    header_text_style = ParagraphStyle(name='HeaderText', parent=styles['Normal'], alignment=TA_CENTER)
-    header_bold_style = ParagraphStyle(name='HeaderBold', parent=header_text_style, fontName='Helvetica-Bold')
+if TYPE_CHECKING:
+    # Solo para las anotaciones: importar models crea los motores de la base de datos, y
+    # los workers de PDFs (que reciben instantáneas de pdf_engine) no deben cargarlos.
+    import models
 
+MARGEN_IZQ = 20
+MARGEN_DER = 20
+ANCHO_TOTAL = letter[0] - MARGEN_IZQ - MARGEN_DER
+LOGO_WIDTH, LOGO_HEIGHT = LOGO_WIDTH_PT, LOGO_HEIGHT_PT
+TEMPLATE_CACHE_SIZE = 128
+PRODUCT_TABLE_CHUNK = 50
+PRODUCT_COL_WIDTHS = [ANCHO_TOTAL * 0.40, ANCHO_TOTAL * 0.15, ANCHO_TOTAL * 0.15, ANCHO_TOTAL * 0.15, ANCHO_TOTAL * 0.15]
 
-    color_principal = colors.HexColor(user.primary_color or '#004aad')
-    simbolo = "S/" if cotizacion.moneda == "SOLES" else "$"
+# La hoja de estilos base no depende del usuario: se construye una sola vez por proceso.
+STYLES = getSampleStyleSheet()
+
+BRANDING_FIELDS = (
+    "email", "business_name", "business_address", "business_ruc", "business_phone",
+    "logo_filename", "primary_color", "pdf_note_1", "pdf_note_1_color", "pdf_note_2",
+)
+
+
+class _LogoImage(Image):
+    """Image que reutiliza un ImageReader ya decodificado en lugar de leer el archivo otra vez."""
+
+    def __init__(self, reader: ImageReader, width: float, height: float):
+        self._img = reader
+        super().__init__(io.BytesIO(), width=width, height=height)
+
+
+class _ProductRows(Flowable):
+    """
+    Tablas de productos generadas a medida que el documento avanza, de a
+    PRODUCT_TABLE_CHUNK filas (seguidas se ven como una sola tabla). Antes todas las
+    líneas iban en una única Table: cada salto de página copiaba las filas restantes
+    (cuadrático con miles de líneas) y todos los Paragraph vivían hasta el final.
+    Ahora en memoria solo están las filas de la página en curso.
+    """
+
+    def __init__(self, make_table, total_rows: int, start: int = 0):
+        super().__init__()
+        self.make_table = make_table
+        self.total_rows = total_rows
+        self.start = start
 
-    logo = ""
-    if user.logo_filename:
-        logo_path = f"logos/{user.logo_filename}"
-        if os.path.exists(logo_path):
+    def wrap(self, available_width, available_height):
+        # Nunca "cabe" entero: así el documento llama a split() y recibe la siguiente tabla.
+        return available_width, available_height + 1
+
+    def split(self, available_width, available_height):
+        end = self.start + PRODUCT_TABLE_CHUNK
+        rest = [_ProductRows(self.make_table, self.total_rows, end)] if end < self.total_rows else []
+        table = self.make_table(self.start)
+        if table.wrap(available_width, available_height)[1] <= available_height: return [table] + rest
+        # La tabla no entra en lo que queda de la página: se parte ahí mismo (o, si no
+        # entra ni una fila, [] hace que el documento pase a la página siguiente).
+        parts = table.split(available_width, available_height)
+        return parts + rest if parts else []
+
+    def draw(self):
+        pass
+
+
+class PdfTemplate:
+    """
+    Todo lo que en el PDF depende solo del perfil del usuario: estilos, colores,
+    logo decodificado, textos de la cabecera y el bloque de cuentas bancarias.
+    Se construye una vez y se reutiliza en cada render de sus cotizaciones.
+    """
+
+    def __init__(self, user: "models.User"):
+        self.color_principal = colors.HexColor(user.primary_color or '#004aad')
+
+        # --- NUEVO ESTILO PARA EL TEXTO DE LA CABECERA ---
+        # Creamos un estilo centrado para los párrafos de la cabecera
+        self.header_text_style = ParagraphStyle(name='HeaderText', parent=STYLES['Normal'], alignment=TA_CENTER)
+        self.header_bold_style = ParagraphStyle(name='HeaderBold', parent=self.header_text_style, fontName='Helvetica-Bold')
+        note_1_color = colors.HexColor(user.pdf_note_1_color or "#FF0000")
+        self.style_red_bold = ParagraphStyle(name='RedBold', parent=STYLES['Normal'], textColor=note_1_color, fontName='Helvetica-Bold')
+
+        self.logo_reader = None
+        if user.logo_filename:
+            # Pasa por la caché de bytes de storage: con S3 no se descarga en cada plantilla.
             try:
-                logo = Image(logo_path, width=151, height=76)
+                self.logo_reader = ImageReader(io.BytesIO(storage.read_cached(logo_key(user.logo_filename))))
+                self.logo_reader.getSize()
             except Exception:
-                logo = ""
+                self.logo_reader = None
+
+        self.business_name_text = user.business_name or "Nombre del Negocio"
+        self.business_address_text = user.business_address or "Dirección no especificada"
+        self.contact_info_text = f"{user.email}<br/>{user.business_phone or ''}"
+        self.ruc_text = f"RUC {user.business_ruc or 'NO ESPECIFICADO'}"
+        self.note_1_text = user.pdf_note_1 or ""
+        self.note_2_text = user.pdf_note_2 or ""
+        self.bank_info_text = build_bank_info_text(user)
+
+        color_principal = self.color_principal
+        self.style_principal = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('SPAN', (0, 0), (0, -1)),
+            # Ya no necesitamos especificar la fuente aquí porque el Paragraph se encarga
+            ('FONTNAME', (2, 1), (2, 1), 'Helvetica-Bold'), ('FONTNAME', (2, 2), (2, 2), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11), ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0), ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+        ])
+        self.style_cliente = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'), ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'), ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('LINEABOVE', (0, 0), (-1, 0), 1.5, color_principal), ('LINEBELOW', (0, -1), (-1, -1), 1.5, color_principal),
+            ('LEFTPADDING', (0, 0), (-1, -1), 3), ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+            ('TOPPADDING', (0, 0), (-1, -1), 5), ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ])
+        self.style_productos = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'), ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('BACKGROUND', (0, 0), (-1, 0), color_principal), ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('TOPPADDING', (0, 0), (-1, -1), 5), ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ])
+        # Tablas de continuación (sin fila de encabezado) y cierre con la línea inferior.
+        self.style_productos_body = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'), ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 5), ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ])
+        self.style_productos_end = TableStyle([('LINEBELOW', (0, -1), (-1, -1), 1.5, color_principal)])
+        self.style_total = TableStyle([
+            ('ALIGN', (0, 0), (0, -1), 'RIGHT'), ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'), ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10), ('FONTNAME', (0, 2), (1, 2), 'Helvetica-Bold'),
+            ('TOPPADDING', (0, 0), (-1, -1), 5), ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ])
+        self.style_monto = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'), ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('LINEABOVE', (0, 0), (-1, 0), 1.5, color_principal), ('LINEBELOW', (0, -1), (-1, -1), 1.5, color_principal),
+            ('TOPPADDING', (0, 0), (-1, -1), 5), ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ])
+
+    def logo(self):
+        # Cada documento necesita su propio flowable, pero todos comparten la imagen decodificada.
+        if self.logo_reader is None: return ""
+        return _LogoImage(self.logo_reader, width=LOGO_WIDTH, height=LOGO_HEIGHT)
+
+
+def build_bank_info_text(user: "models.User") -> str:
+    bank_info_text = "<b>Datos para la Transferencia</b><br/>"
+    if user.business_name:
+        bank_info_text += f"Beneficiario: {user.business_name.upper()}<br/><br/>"
+
+    if user.bank_accounts and isinstance(user.bank_accounts, list):
+        for account in user.bank_accounts:
+            banco = account.get('banco', '')
+            tipo_cuenta = account.get('tipo_cuenta') or 'Cta Ahorro'
+            moneda = account.get('moneda') or 'Soles'
+            cuenta = account.get('cuenta', '')
+            cci = account.get('cci', '')
+
+            if banco:
+                bank_info_text += f"<b>{banco}</b><br/>"
+                
+                if 'nación' in banco.lower():
+                    label_cuenta = f"Cuenta Detracción en {moneda}"
+                else:
+                    label_cuenta = f"{tipo_cuenta} en {moneda}"
+
+                if cuenta and cci:
+                    bank_info_text += f"{label_cuenta}: {cuenta} CCI: {cci}<br/>"
+                elif cuenta:
+                    bank_info_text += f"{label_cuenta}: {cuenta}<br/>"
+                
+                bank_info_text += "<br/>"
+    return bank_info_text
+
+
+# --- Caché de plantillas por usuario ---
+# La clave incluye todos los datos de marca (el nombre del logo lleva el hash de su
+# contenido, así que basta con él), de modo que un perfil modificado produce otra
+# firma y la plantilla vieja se reemplaza sola. Esto funciona también dentro de los
+# workers del pool de procesos, que no reciben avisos de main.
+_templates = OrderedDict()
+_templates_lock = threading.Lock()
+
+def _template_signature(user: "models.User"):
+    accounts = repr(user.bank_accounts)
+    return tuple(getattr(user, field) for field in BRANDING_FIELDS) + (accounts,)
+
+def get_template(user: "models.User") -> PdfTemplate:
+    signature = _template_signature(user)
+    with _templates_lock:
+        cached = _templates.get(user.id)
+        if cached and cached[0] == signature:
+            _templates.move_to_end(user.id)
+            return cached[1]
+    template = PdfTemplate(user)
+    with _templates_lock:
+        _templates[user.id] = (signature, template)
+        _templates.move_to_end(user.id)
+        while len(_templates) > TEMPLATE_CACHE_SIZE: _templates.popitem(last=False)
+    return template
+
+def create_pdf_buffer(cotizacion: "models.Cotizacion", user: "models.User", template: PdfTemplate = None):
+    buffer = io.BytesIO()
+    write_pdf(cotizacion, user, buffer, template)
+    buffer.seek(0)
+    return buffer
+
+def write_pdf(cotizacion: "models.Cotizacion", user: "models.User", output, template: PdfTemplate = None):
+    """Genera el PDF sobre `output` (un archivo abierto en modo binario o un BytesIO)."""
+    template = template or get_template(user)
+    margen_izq = MARGEN_IZQ
+    ancho_total = ANCHO_TOTAL
+    
+    doc = SimpleDocTemplate(output, pagesize=letter,
+                            leftMargin=MARGEN_IZQ, rightMargin=MARGEN_DER,
+                            topMargin=20, bottomMargin=20)
     
+    styles = STYLES
+    color_principal = template.color_principal
+    simbolo = "S/" if cotizacion.moneda == "SOLES" else "$"
+
     # --- CORRECCIÓN: ENVOLVEMOS TEXTOS LARGOS EN PÁRRAFOS ---
     # Esto permite que los textos largos se dividan en varias líneas automáticamente.
-    business_name_p = Paragraph(user.business_name or "Nombre del Negocio", header_bold_style)
-    business_address_p = Paragraph(user.business_address or "Dirección no especificada", header_text_style)
-    contact_info_p = Paragraph(f"{user.email}<br/>{user.business_phone or ''}", header_text_style)
+    business_name_p = Paragraph(template.business_name_text, template.header_bold_style)
+    business_address_p = Paragraph(template.business_address_text, template.header_text_style)
+    contact_info_p = Paragraph(template.contact_info_text, template.header_text_style)
 
     data_principal = [
-        [logo, business_name_p, f"RUC {user.business_ruc or 'NO ESPECIFICADO'}"],
+        [template.logo(), business_name_p, template.ruc_text],
         ["", business_address_p, "COTIZACIÓN"],
         ["", contact_info_p, f"N° {cotizacion.numero_cotizacion}"]
     ]
     # --- FIN DE LA CORRECCIÓN ---
 
     tabla_principal = Table(data_principal, colWidths=[ancho_total * 0.30, ancho_total * 0.50, ancho_total * 0.20])
-    tabla_principal.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('SPAN', (0, 0), (0, -1)),
-        # Ya no necesitamos especificar la fuente aquí porque el Paragraph se encarga
-        ('FONTNAME', (2, 1), (2, 1), 'Helvetica-Bold'), ('FONTNAME', (2, 2), (2, 2), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 11), ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0), ('TOPPADDING', (0, 0), (-1, -1), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-    ]))
+    tabla_principal.setStyle(template.style_principal)
 
     fecha_emision = cotizacion.fecha_creacion.strftime("%d/%m/%Y")
     fecha_vencimiento = (cotizacion.fecha_creacion + relativedelta(months=1)).strftime("%d/%m/%Y")
@@ -75,89 +264,37 @@ def create_pdf_buffer(cotizacion: models.Cotizacion, user: models.User):
     ]
     
     tabla_cliente = Table(data_cliente, colWidths=[ancho_total * 0.10, ancho_total * 0.60, ancho_total * 0.15, ancho_total * 0.15])
-    tabla_cliente.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'), ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'), ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('LINEABOVE', (0, 0), (-1, 0), 1.5, color_principal), ('LINEBELOW', (0, -1), (-1, -1), 1.5, color_principal),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3), ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 5), ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-    ]))
-
-    data_productos = [["Descripción", "Cantidad", "P.Unit", "IGV", "Precio"]]
-    for prod in cotizacion.productos:
-        igv_producto = prod.total * (18 / 118)
-        data_productos.append([
-            Paragraph(prod.descripcion, styles['Normal']), prod.unidades,
-            f"{simbolo} {prod.precio_unitario:.2f}", f"{simbolo} {igv_producto:.2f}", f"{simbolo} {prod.total:.2f}"
-        ])
-    
-    tabla_productos = Table(data_productos, colWidths=[ancho_total * 0.40, ancho_total * 0.15, ancho_total * 0.15, ancho_total * 0.15, ancho_total * 0.15])
-    tabla_productos.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'), ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('BACKGROUND', (0, 0), (-1, 0), color_principal), ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'), ('LINEBELOW', (0, -1), (-1, -1), 1.5, color_principal),
-        ('TOPPADDING', (0, 0), (-1, -1), 5), ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-    ]))
-
-    total_igv = cotizacion.monto_total * (18 / 118)
-    total_gravado = cotizacion.monto_total - total_igv
+    tabla_cliente.setStyle(template.style_cliente)
+
+    # Los importes (IGV incluido) vienen calculados por pricing.py; aquí solo se formatean.
+    def tabla_productos(start: int) -> Table:
+        data_productos = [["Descripción", "Cantidad", "P.Unit", "IGV", "Precio"]] if start == 0 else []
+        for prod in cotizacion.productos[start:start + PRODUCT_TABLE_CHUNK]:
+            data_productos.append([
+                Paragraph(prod.descripcion, styles['Normal']), prod.unidades,
+                f"{simbolo} {prod.precio_unitario:.2f}", f"{simbolo} {prod.igv:.2f}", f"{simbolo} {prod.total:.2f}"
+            ])
+        tabla = Table(data_productos, colWidths=PRODUCT_COL_WIDTHS)
+        tabla.setStyle(template.style_productos if start == 0 else template.style_productos_body)
+        if start + PRODUCT_TABLE_CHUNK >= len(cotizacion.productos): tabla.setStyle(template.style_productos_end)
+        return tabla
+
     data_total = [
-        ["Total Gravado", f"{simbolo} {total_gravado:.2f}"],
-        ["Total IGV ", f"{simbolo} {total_igv:.2f}"],
+        ["Total Gravado", f"{simbolo} {cotizacion.monto_gravado:.2f}"],
+        ["Total IGV ", f"{simbolo} {cotizacion.monto_igv:.2f}"],
         ["Importe Total", f"{simbolo} {cotizacion.monto_total:.2f}"]
     ]
     
     tabla_total = Table(data_total, colWidths=[ancho_total * 0.85, ancho_total * 0.15])
-    tabla_total.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'), ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'), ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10), ('FONTNAME', (0, 2), (1, 2), 'Helvetica-Bold'),
-        ('TOPPADDING', (0, 0), (-1, -1), 5), ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-    ]))
+    tabla_total.setStyle(template.style_total)
 
     data_monto = [[f"IMPORTE TOTAL A PAGAR {simbolo} {cotizacion.monto_total:.2f}"]]
     tabla_monto = Table(data_monto, colWidths=[ancho_total])
-    tabla_monto.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'), ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('LINEABOVE', (0, 0), (-1, 0), 1.5, color_principal), ('LINEBELOW', (0, -1), (-1, -1), 1.5, color_principal),
-        ('TOPPADDING', (0, 0), (-1, -1), 5), ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-    ]))
-
-    note_1_color = colors.HexColor(user.pdf_note_1_color or "#FF0000")
-    style_red_bold = ParagraphStyle(name='RedBold', parent=styles['Normal'], textColor=note_1_color, fontName='Helvetica-Bold')
-    terminos_1 = Paragraph(user.pdf_note_1 or "", style_red_bold)
-    terminos_2 = Paragraph(user.pdf_note_2 or "", styles['Normal'])
-    
-    bank_info_text = "<b>Datos para la Transferencia</b><br/>"
-    if user.business_name:
-        bank_info_text += f"Beneficiario: {user.business_name.upper()}<br/><br/>"
+    tabla_monto.setStyle(template.style_monto)
 
-    if user.bank_accounts and isinstance(user.bank_accounts, list):
-        for account in user.bank_accounts:
-            banco = account.get('banco', '')
-            tipo_cuenta = account.get('tipo_cuenta') or 'Cta Ahorro'
-            moneda = account.get('moneda') or 'Soles'
-            cuenta = account.get('cuenta', '')
-            cci = account.get('cci', '')
-
-            if banco:
-                bank_info_text += f"<b>{banco}</b><br/>"
-                
-                if 'nación' in banco.lower():
-                    label_cuenta = f"Cuenta Detracción en {moneda}"
-                else:
-                    label_cuenta = f"{tipo_cuenta} en {moneda}"
-
-                if cuenta and cci:
-                    bank_info_text += f"{label_cuenta}: {cuenta} CCI: {cci}<br/>"
-                elif cuenta:
-                    bank_info_text += f"{label_cuenta}: {cuenta}<br/>"
-                
-                bank_info_text += "<br/>"
-
-    banco_info = Paragraph(bank_info_text, styles['Normal'])
+    terminos_1 = Paragraph(template.note_1_text, template.style_red_bold)
+    terminos_2 = Paragraph(template.note_2_text, styles['Normal'])
+    banco_info = Paragraph(template.bank_info_text, styles['Normal'])
 
     def agregar_rectangulo_personalizado(canvas, doc):
         canvas.saveState()
@@ -172,11 +309,8 @@ def create_pdf_buffer(cotizacion: models.Cotizacion, user: models.User):
     
     elementos = [
         tabla_principal, Spacer(1, 20), tabla_cliente, Spacer(1, 20),
-        tabla_productos, tabla_total, tabla_monto, Spacer(1, 20),
+        _ProductRows(tabla_productos, len(cotizacion.productos)), tabla_total, tabla_monto, Spacer(1, 20),
         terminos_1, terminos_2, Spacer(1, 12), banco_info
     ]
     
     doc.build(elementos, onFirstPage=agregar_rectangulo_personalizado, onLaterPages=agregar_rectangulo_personalizado)
-    
-    buffer.seek(0)
-    return buffer
@@ -0,0 +1,93 @@
+# backend/pricing.py
+# MOTOR DE PRECIOS: TOTALES E IGV EN DECIMAL EXACTO
+#
+# Antes el total de cada línea y el monto_total los enviaba el cliente (sin validar) y
+# el PDF calculaba el IGV en float como total * 18/118, línea por línea y otra vez sobre
+# el total. Ahora el servidor recalcula todo en una sola pasada sobre las líneas, con
+# Decimal y reglas de redondeo configurables, y el resultado se guarda en columnas
+# Numeric: la API y el PDF muestran los mismos importes sin volver a calcularlos.
+#
+# Reglas (ver config):
+#   - PRICING_PRICES_INCLUDE_IGV: los precios unitarios ya incluyen el IGV (como hasta
+#     ahora) o se les suma encima.
+#   - PRICING_IGV_ROUNDING: "total" redondea el IGV una vez sobre el importe total (lo
+#     que hacía el PDF) y "line" suma el IGV ya redondeado de cada línea.
+#   - PRICING_ROUNDING: modo de redondeo ("half_up" o "half_even").
+
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_EVEN, ROUND_HALF_UP
+from typing import Iterable, NamedTuple, Tuple
+
+from config import settings
+
+ROUNDING_MODES = {"half_up": ROUND_HALF_UP, "half_even": ROUND_HALF_EVEN}
+PRICE_DECIMALS = 4  # precio unitario: hasta 4 decimales (Numeric(14, 4))
+
+
+class LineTotals(NamedTuple):  # NamedTuple: se crea una por línea y es más liviana que un dataclass
+    precio_unitario: Decimal
+    total: Decimal
+    igv: Decimal
+
+@dataclass(frozen=True)
+class QuoteTotals:
+    lines: Tuple[LineTotals, ...]
+    monto_total: Decimal
+    monto_igv: Decimal
+    monto_gravado: Decimal
+
+
+class PricingEngine:
+    def __init__(self, igv_rate: str, prices_include_igv: bool = True, decimals: int = 2, rounding: str = "half_up", igv_rounding: str = "total"):
+        if rounding not in ROUNDING_MODES: raise ValueError(f"Modo de redondeo no válido: {rounding}")
+        if igv_rounding not in ("line", "total"): raise ValueError(f"Redondeo de IGV no válido: {igv_rounding}")
+        self.igv_rate = Decimal(igv_rate)
+        self.prices_include_igv = prices_include_igv
+        self.rounding = ROUNDING_MODES[rounding]
+        self.igv_rounding = igv_rounding
+        self.decimals = decimals
+        self.quantum = Decimal(1).scaleb(-decimals)
+        self.price_quantum = Decimal(1).scaleb(-PRICE_DECIMALS)
+        # Fracción del importe que es IGV cuando el precio ya lo incluye (18/118).
+        self.included_share = self.igv_rate / (1 + self.igv_rate)
+
+    def _round(self, value: Decimal) -> Decimal:
+        return value.quantize(self.quantum, rounding=self.rounding)
+
+    def compute(self, lines: Iterable[Tuple[int, Decimal]]) -> QuoteTotals:
+        """
+        Calcula los totales de una cotización a partir de (unidades, precio_unitario)
+        de cada línea, en una sola pasada y sin pasar por float.
+        """
+        quantize, quantum, price_quantum, rounding = Decimal.quantize, self.quantum, self.price_quantum, self.rounding
+        share, rate, include = self.included_share, self.igv_rate, self.prices_include_igv
+        result, sum_total, sum_igv, sum_base = [], Decimal(0), Decimal(0), Decimal(0)
+        for unidades, precio in lines:
+            precio = quantize(Decimal(precio), price_quantum, rounding=rounding)
+            importe = quantize(precio * unidades, quantum, rounding=rounding)
+            if include:
+                igv = quantize(importe * share, quantum, rounding=rounding)
+                total, base = importe, importe - igv
+            else:
+                igv = quantize(importe * rate, quantum, rounding=rounding)
+                total, base = importe + igv, importe
+            result.append(LineTotals(precio, total, igv))
+            sum_total += total; sum_igv += igv; sum_base += base
+        if self.igv_rounding == "total":
+            # Un solo redondeo sobre el total: la suma de los IGV por línea puede diferir
+            # en algún céntimo, así que el total manda y el IGV se vuelve a calcular.
+            if include:
+                sum_igv = self._round(sum_total * share)
+            else:
+                sum_igv = self._round(sum_base * rate)
+                sum_total = sum_base + sum_igv
+        return QuoteTotals(lines=tuple(result), monto_total=sum_total, monto_igv=sum_igv, monto_gravado=sum_total - sum_igv)
+
+
+engine = PricingEngine(
+    igv_rate=settings.PRICING_IGV_RATE,
+    prices_include_igv=settings.PRICING_PRICES_INCLUDE_IGV,
+    decimals=settings.PRICING_DECIMALS,
+    rounding=settings.PRICING_ROUNDING,
+    igv_rounding=settings.PRICING_IGV_ROUNDING,
+)
@@ -0,0 +1,90 @@
+# backend/roles.py
+# ROLES Y PERMISOS PERSISTIDOS
+#
+# Antes el rol de administrador se recalculaba en cada request comparando el email
+# con ADMIN_EMAIL y se escribía sobre objetos del ORM. Ahora cada usuario tiene un
+# rol guardado en la base de datos (users.role, con users.is_admin en sincronía) y
+# los permisos de cada rol viven en role_permissions. Los permisos se cargan una vez
+# en memoria, así que autorizar un request es buscar en un frozenset.
+#
+# Al arrancar, sync_roles() crea los roles por defecto que falten y asegura que la
+# cuenta ADMIN_EMAIL tenga el rol "admin". No quita roles asignados en la base de
+# datos a otras cuentas.
+
+import threading
+from typing import Dict, FrozenSet
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+import models
+
+# --- Permisos ---
+ADMIN_ACCESS = "admin:access"              # panel, estadísticas, listados y PDFs ajenos
+ADMIN_MANAGE_USERS = "admin:users:manage"  # activar, desactivar y eliminar cuentas
+
+ADMIN_ROLE = "admin"
+DEFAULT_ROLE = "user"
+
+DEFAULT_ROLES = {
+    ADMIN_ROLE: ("Administrador", {ADMIN_ACCESS, ADMIN_MANAGE_USERS}),
+    DEFAULT_ROLE: ("Usuario", set()),
+}
+
+
+class RoleRegistry:
+    """Permisos por rol, cargados desde la base de datos y consultados en memoria."""
+
+    def __init__(self):
+        self._permissions: Dict[str, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, engine):
+        with Session(engine) as db:
+            permissions = {name: set() for name in db.scalars(select(models.Role.name))}
+            for role, permission in db.execute(select(models.RolePermission.role, models.RolePermission.permission)):
+                permissions.setdefault(role, set()).add(permission)
+        with self._lock:
+            self._permissions = {role: frozenset(perms) for role, perms in permissions.items()}
+
+    def permissions_for(self, role: str) -> FrozenSet[str]:
+        return self._permissions.get(role, frozenset())
+
+    def has(self, role: str, permission: str) -> bool:
+        return permission in self._permissions.get(role, ())
+
+    def roles(self) -> Dict[str, FrozenSet[str]]:
+        return dict(self._permissions)
+
+
+def role_for_email(email: str) -> str:
+    """Rol inicial de una cuenta nueva (la cuenta ADMIN_EMAIL nace como administrador)."""
+    return ADMIN_ROLE if settings.ADMIN_EMAIL and email == settings.ADMIN_EMAIL else DEFAULT_ROLE
+
+def _sync(db: Session):
+    existing_roles = set(db.scalars(select(models.Role.name)))
+    existing_permissions = set(db.execute(select(models.RolePermission.role, models.RolePermission.permission)).tuples())
+    for name, (description, permissions) in DEFAULT_ROLES.items():
+        if name not in existing_roles: db.add(models.Role(name=name, description=description))
+        for permission in permissions:
+            if (name, permission) not in existing_permissions:
+                db.add(models.RolePermission(role=name, permission=permission))
+    db.flush()
+    if settings.ADMIN_EMAIL:
+        db.execute(update(models.User).where(models.User.email == settings.ADMIN_EMAIL).values(role=ADMIN_ROLE, is_admin=True))
+
+def sync_roles(engine):
+    """Crea los roles y permisos por defecto que falten y promueve a ADMIN_EMAIL."""
+    for _ in range(2):
+        with Session(engine) as db:
+            try:
+                _sync(db)
+                db.commit()
+                return
+            except IntegrityError:
+                db.rollback()  # otro worker insertó los mismos roles al arrancar; se reintenta
+
+
+registry = RoleRegistry()
@@ -0,0 +1,43 @@
+# backend/rollups.py
+# RESUMEN DIARIO DE COTIZACIONES (POR DÍA, MONEDA Y USUARIO)
+#
+# El panel de administración necesitaba contar y sumar sobre toda la tabla de
+# cotizaciones en cada carga. En su lugar, cada alta, edición o baja ajusta una fila
+# de `cotizacion_daily_rollups` dentro de la misma transacción, y las estadísticas
+# y tendencias se leen de esa tabla, que crece por días y no por cotizaciones.
+
+from datetime import date, datetime, timezone
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def day_of(fecha: datetime) -> date:
+    """Día (UTC) en el que se contabiliza una cotización."""
+    if fecha.tzinfo is not None: fecha = fecha.astimezone(timezone.utc)
+    return fecha.date()
+
+def upsert_statement(dialect_name: str, fecha: datetime, owner_id: int, moneda: str, count: int, monto: float):
+    table = models.CotizacionDailyRollup.__table__
+    values = {"dia": day_of(fecha), "owner_id": owner_id, "moneda": moneda or "", "cotizaciones_count": count, "monto_total": monto or 0}
+    stmt = _UPSERT_DIALECTS[dialect_name](table).values(**values)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.dia, table.c.owner_id, table.c.moneda],
+        set_={"cotizaciones_count": table.c.cotizaciones_count + stmt.excluded.cotizaciones_count,
+              "monto_total": table.c.monto_total + stmt.excluded.monto_total},
+    )
+
+def record(db: Session, fecha: datetime, owner_id: int, moneda: str, count: int, monto: float):
+    """Suma `count` cotizaciones y `monto` al resumen del día; no hace commit."""
+    db.execute(upsert_statement(db.get_bind().dialect.name, fecha, owner_id, moneda, count, monto))
+
+def cotizacion_change(cotizacion: models.Cotizacion, sign: int = 1):
+    """Argumentos de record() para sumar (sign=1) o restar (sign=-1) una cotización."""
+    return cotizacion.fecha_creacion, cotizacion.owner_id, cotizacion.moneda, sign, sign * (cotizacion.monto_total or 0)
+
+def record_cotizacion(db: Session, cotizacion: models.Cotizacion, sign: int = 1):
+    record(db, *cotizacion_change(cotizacion, sign))
@@ -1,49 +1,108 @@
 # backend/schemas.py
 # MODIFICADO PARA AÑADIR NUEVOS ESQUEMAS Y CAMPOS PARA EL ADMIN
 
-from pydantic import BaseModel, ConfigDict, Field, EmailStr
-from typing import List, Optional
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, PlainSerializer, StringConstraints, model_validator
+from typing import Annotated, List, Literal, Optional
+from datetime import date, datetime
+from decimal import Decimal
 
-# --- Esquemas de Producto (sin cambios) ---
+# Importes exactos en Python (Decimal) que en el JSON siguen siendo números, como antes.
+Money = Annotated[Decimal, PlainSerializer(float, return_type=float, when_used="json")]
+
+# --- Esquemas de Producto ---
 class ProductoBase(BaseModel):
     descripcion: str = Field(..., min_length=1)
     unidades: int = Field(..., gt=0)
-    precio_unitario: float = Field(..., ge=0)
-    total: float
-class ProductoCreate(ProductoBase): pass
+    precio_unitario: Money = Field(..., ge=0)
+    catalogo_item_id: Optional[int] = None  # producto del catálogo del que se tomó la línea
+class ProductoCreate(ProductoBase):
+    # Al editar, el id permite actualizar solo las líneas que cambiaron.
+    id: Optional[int] = None
+    total: Optional[Money] = None  # se acepta por compatibilidad; lo recalcula pricing.py
 class Producto(ProductoBase):
     id: int
     cotizacion_id: int
+    total: Money
+    igv: Money
     model_config = ConfigDict(from_attributes=True)
 
-# --- Esquemas de Cotización (sin cambios) ---
+# --- Esquemas de Cotización ---
 class CotizacionBase(BaseModel):
     nombre_cliente: str = Field(..., min_length=1)
     direccion_cliente: str
     tipo_documento: str
     nro_documento: str = Field(..., min_length=1)
     moneda: str
-    monto_total: float
 
 class CotizacionInList(CotizacionBase):
     id: int
     owner_id: int
     numero_cotizacion: str
     fecha_creacion: datetime
+    monto_total: Money
+    monto_igv: Money
+    monto_gravado: Money
     model_config = ConfigDict(from_attributes=True)
 
 class CotizacionCreate(CotizacionBase):
     productos: List[ProductoCreate] = Field(..., min_length=1)
+    monto_total: Optional[Money] = None  # se acepta por compatibilidad; lo recalcula pricing.py
 
-class Cotizacion(CotizacionBase):
-    id: int
-    owner_id: int
-    numero_cotizacion: str
-    fecha_creacion: datetime
+class Cotizacion(CotizacionInList):
     productos: List[Producto] = []
+
+# --- Filtros y paginación del listado de cotizaciones ---
+class CotizacionFilters(BaseModel):
+    fecha_desde: Optional[date] = None
+    fecha_hasta: Optional[date] = None
+    cliente: Optional[str] = None  # busca en nombre del cliente o número de documento
+    moneda: Optional[str] = None
+    monto_min: Optional[Decimal] = None
+    monto_max: Optional[Decimal] = None
+
+class CotizacionListQuery(CotizacionFilters):
+    cursor: Optional[int] = None  # id de la última cotización de la página anterior
+    limit: int
+    fields: Optional[List[str]] = None
+
+# --- Búsqueda de cotizaciones (ver search.py) ---
+class CotizacionSearchQuery(BaseModel):
+    q: str
+    limit: int
+
+class CotizacionSearchResult(CotizacionInList):
+    score: float  # relevancia: mayor es mejor (la escala depende del motor de base de datos)
+
+# --- Catálogo de productos (ver catalog.py) ---
+CatalogoDescripcion = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=500)]
+
+class CatalogoItemCreate(BaseModel):
+    descripcion: CatalogoDescripcion
+    precio_unitario: Money = Field(Decimal(0), ge=0)
+
+class CatalogoItemUpdate(BaseModel):
+    descripcion: Optional[CatalogoDescripcion] = None
+    precio_unitario: Optional[Money] = Field(None, ge=0)
+
+class CatalogoItem(BaseModel):
+    id: int
+    descripcion: str
+    precio_unitario: Money
+    uso_count: int
     model_config = ConfigDict(from_attributes=True)
 
+# --- Esquema de Exportación Masiva ---
+class CotizacionExportRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    fecha_desde: Optional[date] = None
+    fecha_hasta: Optional[date] = None
+
+    @model_validator(mode="after")
+    def check_criteria(self):
+        if not self.ids and not self.fecha_desde and not self.fecha_hasta:
+            raise ValueError("Indique una lista de ids o un rango de fechas")
+        return self
+
 # --- Esquema de Cuenta Bancaria (sin cambios) ---
 class BankAccount(BaseModel):
     banco: str
@@ -86,7 +145,8 @@ class User(UserBase):
     pdf_note_1_color: Optional[str] = None
     pdf_note_2: Optional[str] = None
     bank_accounts: Optional[List[BankAccount]] = None
-    cotizaciones: List[CotizacionInList] = []
+    # Sin la lista de cotizaciones: /users/me/ y /profile/ no deben cargar el historial
+    # completo del usuario (se consulta paginado en /cotizaciones/).
     model_config = ConfigDict(from_attributes=True)
 
 # --- Esquemas de Admin ---
@@ -97,6 +157,13 @@ class AdminDashboardStats(BaseModel):
     total_cotizaciones: int
     new_users_last_30_days: int
 
+class CotizacionTrendPoint(BaseModel):
+    dia: date
+    moneda: str
+    cotizaciones_count: int
+    monto_total: Money
+    model_config = ConfigDict(from_attributes=True)
+
 # --- ESQUEMA MODIFICADO PARA LA VISTA DE USUARIOS ---
 class AdminUserView(BaseModel):
     id: int
@@ -108,6 +175,13 @@ class AdminUserView(BaseModel):
     deactivation_reason: Optional[str] = None
     model_config = ConfigDict(from_attributes=True)
 
+class AdminUserListQuery(BaseModel):
+    search: Optional[str] = None  # busca en email o nombre del negocio
+    sort: Literal["id", "creation_date", "cotizaciones_count"] = "id"
+    order: Literal["asc", "desc"] = "asc"
+    cursor: Optional[str] = None  # valor opaco de la cabecera X-Next-Cursor
+    limit: int
+
 class UserStatusUpdate(BaseModel):
     is_active: bool
     deactivation_reason: Optional[str] = None
@@ -0,0 +1,208 @@
+# backend/search.py
+# BÚSQUEDA DE COTIZACIONES POR CLIENTE, DOCUMENTO, NÚMERO O DESCRIPCIÓN DE PRODUCTO
+#
+# El índice B-tree de productos.descripcion no sirve para buscar texto contenido, y el
+# frontend terminaba bajando todo el listado para filtrarlo en el navegador. Aquí la
+# búsqueda se resuelve en el servidor, siempre dentro de las cotizaciones del usuario
+# y ordenada por relevancia:
+#   - Postgres: índices GIN de pg_trgm (texto contenido y errores de tipeo, operador
+#     <% de word_similarity e ILIKE) y de tsvector (palabras con raíz común: "tornillos"
+#     encuentra "tornillo"), creados en la migración 0007. La relevancia suma la
+#     similitud de trigramas y ts_rank; una cotización vale lo que su mejor coincidencia.
+#   - SQLite (desarrollo y pruebas): un índice de trigramas en memoria por usuario, que
+#     se arma con una consulta la primera vez y se descarta en cada alta, edición o
+#     baja de sus cotizaciones (o al vencer SEARCH_INDEX_TTL_SECONDS).
+#
+# Nota: cambiar SEARCH_TS_CONFIG obliga a recrear los índices *_tsv, que se crean con
+# la configuración vigente al aplicar la migración.
+
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import func, literal, literal_column, or_, select, union_all
+
+from config import settings
+import models
+
+if not re.fullmatch(r"[a-z_]+", settings.SEARCH_TS_CONFIG):
+    raise ValueError(f"SEARCH_TS_CONFIG no válida: {settings.SEARCH_TS_CONFIG}")
+
+SEARCH_FIELDS = ("id", "owner_id", "numero_cotizacion", "fecha_creacion", "nombre_cliente", "direccion_cliente",
+                 "tipo_documento", "nro_documento", "moneda", "monto_total", "monto_igv", "monto_gravado")
+
+
+# --- Postgres: pg_trgm + tsvector ---
+def ts_vector(column):
+    # Literales (no parámetros) para que la expresión coincida con la de los índices *_tsv.
+    return func.to_tsvector(literal_column(f"'{settings.SEARCH_TS_CONFIG}'::regconfig"), func.coalesce(column, literal_column("''")))
+
+def _like_pattern(term: str) -> str:
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def postgres_statement(owner_id: int, term: str, limit: int):
+    """Cotizaciones del usuario que coinciden con `term`, con su puntaje, de mayor a menor."""
+    C, P = models.Cotizacion, models.Producto
+    query = func.websearch_to_tsquery(literal_column(f"'{settings.SEARCH_TS_CONFIG}'::regconfig"), term)
+    value, pattern = literal(term), _like_pattern(term)
+    header = select(
+        C.id.label("cotizacion_id"),
+        (func.greatest(*(func.word_similarity(value, column) for column in (C.nombre_cliente, C.nro_documento, C.numero_cotizacion)))
+         + func.ts_rank(ts_vector(C.nombre_cliente), query)).label("score"),
+    ).where(C.owner_id == owner_id, or_(
+        ts_vector(C.nombre_cliente).op("@@")(query), value.op("<%")(C.nombre_cliente),
+        C.nombre_cliente.ilike(pattern), C.nro_documento.ilike(pattern), C.numero_cotizacion.ilike(pattern),
+    ))
+    lines = select(
+        P.cotizacion_id,
+        (func.word_similarity(value, P.descripcion) + func.ts_rank(ts_vector(P.descripcion), query)).label("score"),
+    ).join(C, C.id == P.cotizacion_id).where(C.owner_id == owner_id, or_(
+        ts_vector(P.descripcion).op("@@")(query), value.op("<%")(P.descripcion), P.descripcion.ilike(pattern),
+    ))
+    matches = union_all(header, lines).subquery()
+    ranked = select(matches.c.cotizacion_id, func.max(matches.c.score).label("score")).group_by(matches.c.cotizacion_id).subquery()
+    return (
+        select(*(getattr(C, f) for f in SEARCH_FIELDS), ranked.c.score)
+        .join(ranked, ranked.c.cotizacion_id == C.id)
+        .order_by(ranked.c.score.desc(), C.id.desc()).limit(limit)
+    )
+
+
+# --- SQLite: índice de trigramas en memoria ---
+_COMBINING = re.compile(r"[\u0300-\u036f]")
+_SEPARATORS = re.compile(r"[\W_]+")
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin tildes y solo letras y dígitos separados por un espacio."""
+    text = _COMBINING.sub("", unicodedata.normalize("NFKD", text or "").lower())
+    return _SEPARATORS.sub(" ", text).strip()
+
+def trigrams(text: str) -> set:
+    # Como pg_trgm: cada palabra con dos espacios delante y uno detrás.
+    return {padded[i:i + 3] for padded in [f"  {word} " for word in text.split()] for i in range(len(padded) - 2)}
+
+
+class OwnerIndex:
+    """Trigramas de los textos (cliente, documento, número y descripciones) de un usuario."""
+
+    def __init__(self, texts: Sequence[Tuple[int, str]]):
+        self.cotizacion_ids: List[int] = []
+        self.texts: List[str] = []
+        self.postings: Dict[str, List[int]] = {}
+        seen = {}  # las mismas descripciones se repiten mucho: se normalizan una vez
+        for cotizacion_id, raw in texts:
+            if raw not in seen:
+                text = normalize(raw)
+                seen[raw] = (text, trigrams(text))
+            text, text_trigrams = seen[raw]
+            if not text: continue
+            position = len(self.texts)
+            self.cotizacion_ids.append(cotizacion_id)
+            self.texts.append(text)
+            for trigram in text_trigrams: self.postings.setdefault(trigram, []).append(position)
+
+    def search(self, term: str, limit: int, min_similarity: float = settings.SEARCH_MIN_SIMILARITY) -> List[Tuple[float, int]]:
+        """(puntaje, cotizacion_id) de las mejores coincidencias, de mayor a menor."""
+        term = normalize(term)
+        query = trigrams(term)
+        if not query: return []
+        counts = Counter()
+        for trigram in query: counts.update(self.postings.get(trigram, ()))
+        best = {}
+        for position, shared in counts.items():
+            # Fracción de los trigramas buscados presentes en el texto (aprox. word_similarity);
+            # el texto contenido tal cual cuenta como coincidencia completa.
+            score = 1.0 if term in self.texts[position] else shared / len(query)
+            if score < min_similarity: continue
+            cotizacion_id = self.cotizacion_ids[position]
+            if score > best.get(cotizacion_id, 0.0): best[cotizacion_id] = score
+        return heapq.nlargest(limit, ((score, cid) for cid, score in best.items()))
+
+    def __len__(self):
+        return len(self.texts)
+
+
+def owner_texts_statements(owner_id: int):
+    """Consultas con los textos que indexa OwnerIndex (cabeceras y líneas del usuario)."""
+    C, P = models.Cotizacion, models.Producto
+    return (
+        select(C.id, C.nombre_cliente, C.nro_documento, C.numero_cotizacion).where(C.owner_id == owner_id),
+        select(P.cotizacion_id, P.descripcion).join(C, C.id == P.cotizacion_id).where(C.owner_id == owner_id),
+    )
+
+def owner_texts(header_rows, line_rows) -> List[Tuple[int, str]]:
+    texts = []
+    for cotizacion_id, *fields in header_rows:
+        texts.extend((cotizacion_id, text) for text in fields)
+    texts.extend(line_rows)
+    return texts
+
+
+class OwnerIndexCache:
+    """
+    Índices en memoria por usuario (LRU con TTL), para la búsqueda y para el
+    autocompletado del catálogo. La invalidación es local a cada proceso.
+    """
+
+    def __init__(self, max_owners: int, ttl: float):
+        self.max_owners = max_owners
+        self.ttl = ttl
+        self._entries = OrderedDict()  # owner_id -> (índice, vence_en)
+        self._generations = {}  # owner_id -> número de invalidaciones
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.invalidations = 0
+
+    def get(self, owner_id: int):
+        with self._lock:
+            entry = self._entries.get(owner_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(owner_id)
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(owner_id, None)
+            return None
+
+    def generation(self, owner_id: int) -> int:
+        with self._lock:
+            return self._generations.get(owner_id, 0)
+
+    def put(self, owner_id: int, index, generation: int):
+        """Guarda el índice salvo que el usuario haya cambiado algo mientras se armaba."""
+        with self._lock:
+            if self._generations.get(owner_id, 0) != generation: return
+            self._entries[owner_id] = (index, time.monotonic() + self.ttl)
+            self._entries.move_to_end(owner_id)
+            self.builds += 1
+            while len(self._entries) > self.max_owners: self._entries.popitem(last=False)
+
+    def invalidate_owner(self, owner_id: int):
+        with self._lock:
+            self._generations[owner_id] = self._generations.get(owner_id, 0) + 1
+            if self._entries.pop(owner_id, None) is not None: self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "owners": len(self._entries),
+                "entries": sum(len(index) for index, _ in self._entries.values()),
+                "hits": self.hits, "builds": self.builds, "invalidations": self.invalidations,
+            }
+
+
+def select_by_ids(ids: Sequence[int]):
+    C = models.Cotizacion
+    return select(*(getattr(C, f) for f in SEARCH_FIELDS)).where(C.id.in_(ids))
+
+def ranked_rows(rows, scored: List[Tuple[float, int]]) -> List[dict]:
+    """Filas de select_by_ids en el orden de `scored`, con su puntaje."""
+    by_id = {row.id: row for row in rows}
+    return [{**by_id[cid]._mapping, "score": score} for score, cid in scored if cid in by_id]
+
+
+index_cache = OwnerIndexCache(max_owners=settings.SEARCH_INDEX_MAX_OWNERS, ttl=settings.SEARCH_INDEX_TTL_SECONDS)
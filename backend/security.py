@@ -2,9 +2,9 @@
 # MODIFICADO PARA USAR EL ARCHIVO DE CONFIGURACIÓN CENTRALIZADO
 
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from config import settings # Importamos la configuración centralizada
 
 # Usamos las variables de configuración desde el objeto de settings
@@ -12,14 +12,24 @@ SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    # Si BCRYPT_ROUNDS cambia, los hashes con otro costo se consideran desactualizados y
+    # se recalculan la próxima vez que el usuario inicia sesión. passlib (y bcrypt) se
+    # importan recién aquí: normalmente solo dentro de los workers de password_hashing.
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def verify_password(plain_password, hashed_password):
     """Verifica una contraseña en texto plano contra su hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Crea un nuevo token de acceso."""
+    """Crea un nuevo token de acceso.
+
+    Además de `sub` (email) conviene incluir `uid` (id del usuario) para que la
+    verificación del token resuelva al usuario por clave primaria.
+    """
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -0,0 +1,251 @@
+# backend/storage.py
+# ALMACENAMIENTO DE ARCHIVOS (LOGOS Y PDFs CACHEADOS)
+#
+# Los logos vivían en el disco local (logos/), lo que impedía correr más de una
+# réplica del backend y se perdían en cada redeploy. Ahora todo archivo se guarda
+# con una clave ("logos/user_1_ab12.jpg") en un backend intercambiable:
+#   - LocalStorage: directorio local (STORAGE_LOCAL_DIR), útil en desarrollo y como
+#     doble de pruebas; sus URLs firmadas las sirve /files/{key}.
+#   - S3Storage: cualquier servicio compatible con S3 (AWS, MinIO, R2...). boto3 solo
+#     se importa si se usa este backend.
+# Ambos leen y escriben en bloques (sin cargar archivos grandes en memoria) y generan
+# URLs temporales firmadas. Los logos, que se leen en cada PDF, pasan además por una
+# pequeña caché de bytes en memoria (read_cached); como sus nombres incluyen el hash
+# del contenido, una clave nunca cambia de contenido y la caché no necesita invalidarse.
+
+import hashlib
+import hmac
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+from urllib.parse import quote, urlencode
+
+from config import settings
+
+CHUNK_SIZE = 64 * 1024
+Data = Union[bytes, BinaryIO, Iterable[bytes]]
+
+
+class StorageNotFound(Exception):
+    """No existe un archivo con esa clave."""
+
+
+def _validate_key(key: str) -> str:
+    parts = key.replace("\\", "/").split("/")
+    if not key or key.startswith("/") or any(part in ("", ".", "..") for part in parts):
+        raise ValueError(f"Clave de almacenamiento no válida: {key!r}")
+    return "/".join(parts)
+
+def _chunks(data: Data) -> Iterator[bytes]:
+    if isinstance(data, (bytes, bytearray)):
+        yield bytes(data)
+    elif hasattr(data, "read"):
+        while True:
+            chunk = data.read(CHUNK_SIZE)
+            if not chunk: break
+            yield chunk
+    else:
+        yield from data
+
+
+class LocalStorage:
+    redirects = False  # los archivos se sirven desde la propia API
+
+    def __init__(self, root: str, secret: str, url_path: str = "/files"):
+        self.root = root
+        self.secret = secret.encode()
+        self.url_path = url_path
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *_validate_key(key).split("/"))
+
+    def save(self, key: str, data: Data, content_type: Optional[str] = None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            for chunk in _chunks(data): f.write(chunk)
+        os.replace(tmp_path, path)  # atómico: nunca se lee un archivo a medio escribir
+
+    def open(self, key: str) -> Iterator[bytes]:
+        """Abre el archivo (lanza StorageNotFound de inmediato) y lo devuelve en bloques."""
+        try: f = open(self._path(key), "rb")
+        except FileNotFoundError: raise StorageNotFound(key)
+        def iterate():
+            with f:
+                yield from _chunks(f)
+        return iterate()
+
+    def read(self, key: str) -> bytes:
+        return b"".join(self.open(key))
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def delete(self, key: str):
+        try: os.remove(self._path(key))
+        except FileNotFoundError: pass
+
+    def delete_prefix(self, prefix: str):
+        shutil.rmtree(self._path(prefix), ignore_errors=True)
+
+    def _signature(self, key: str, expires: int) -> str:
+        return hmac.new(self.secret, f"{key}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+    def url(self, key: str, expires_in: int = None) -> str:
+        key = _validate_key(key)
+        expires = int(time.time()) + (expires_in or settings.STORAGE_URL_TTL_SECONDS)
+        return f"{self.url_path}/{quote(key)}?{urlencode({'expires': expires, 'signature': self._signature(key, expires)})}"
+
+    def verify(self, key: str, expires: int, signature: str) -> bool:
+        """Comprueba una URL generada por url(): firma válida y no vencida."""
+        if expires < time.time(): return False
+        return hmac.compare_digest(self._signature(_validate_key(key), expires), signature)
+
+
+class S3Storage:
+    redirects = True  # el cliente descarga directamente del bucket con una URL firmada
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = "", region: str = "", access_key: str = "", secret_key: str = ""):
+        import boto3  # dependencia opcional: solo con STORAGE_BACKEND=s3
+        from botocore.config import Config
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client(
+            "s3", endpoint_url=endpoint_url or None, region_name=region or None,
+            aws_access_key_id=access_key or None, aws_secret_access_key=secret_key or None,
+            config=Config(signature_version="s3v4", max_pool_connections=settings.STORAGE_MAX_CONNECTIONS),
+        )
+        self._not_found = self.client.exceptions.NoSuchKey
+
+    def _key(self, key: str) -> str:
+        key = _validate_key(key)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def save(self, key: str, data: Data, content_type: Optional[str] = None):
+        extra = {"ContentType": content_type} if content_type else None
+        if isinstance(data, (bytes, bytearray)):
+            self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=bytes(data), **(extra or {}))
+        elif hasattr(data, "read"):
+            # upload_fileobj sube en partes (multipart) sin leer todo el archivo en memoria.
+            self.client.upload_fileobj(data, self.bucket, self._key(key), ExtraArgs=extra)
+        else:
+            self.client.upload_fileobj(_IterableReader(data), self.bucket, self._key(key), ExtraArgs=extra)
+
+    def open(self, key: str) -> Iterator[bytes]:
+        try: body = self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        except self._not_found: raise StorageNotFound(key)
+        def iterate():
+            try: yield from body.iter_chunks(CHUNK_SIZE)
+            finally: body.close()
+        return iterate()
+
+    def read(self, key: str) -> bytes:
+        return b"".join(self.open(key))
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except self.client.exceptions.ClientError:
+            return False
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def delete_prefix(self, prefix: str):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix) + "/"):
+            objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if objects: self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+
+    def url(self, key: str, expires_in: int = None) -> str:
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self._key(key)},
+            ExpiresIn=expires_in or settings.STORAGE_URL_TTL_SECONDS,
+        )
+
+
+class _IterableReader:
+    """Adapta un iterable de bloques a la interfaz read() que espera upload_fileobj."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None: break
+            self._buffer += chunk
+        if size < 0: size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+# --- Caché de bytes en memoria (logos leídos por el generador de PDFs) ---
+class ByteCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes: return
+        with self._lock:
+            if key in self._entries: self._size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+def build_storage():
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET, prefix=settings.S3_PREFIX, endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION, access_key=settings.S3_ACCESS_KEY_ID, secret_key=settings.S3_SECRET_ACCESS_KEY,
+        )
+    return LocalStorage(root=settings.STORAGE_LOCAL_DIR, secret=settings.SECRET_KEY)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+bytes_cache = ByteCache(max_bytes=settings.STORAGE_BYTE_CACHE_MAX_BYTES)
+
+def get_backend():
+    # Perezoso: los workers del pool de PDFs crean su propio cliente al leer el primer logo.
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None: _backend = build_storage()
+    return _backend
+
+def read_cached(key: str) -> bytes:
+    """Lee un archivo inmutable (p. ej. un logo) pasando por la caché de bytes del proceso."""
+    data = bytes_cache.get(key)
+    if data is None:
+        data = get_backend().read(key)
+        bytes_cache.put(key, data)
+    return data
@@ -19,6 +19,11 @@ const CotizacionesList = ({ refreshTrigger }) => {
     const { token } = useContext(AuthContext);
     const [editingCotizacionId, setEditingCotizacionId] = useState(null);
     const [deletingCotizacionId, setDeletingCotizacionId] = useState(null);
+    // Cursor de la siguiente página (cabecera X-Next-Cursor); null si no hay más.
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+    // Resultados de la búsqueda en el servidor (null mientras no se busca).
+    const [searchResults, setSearchResults] = useState(null);
 
     const fetchCotizaciones = async () => {
         if (!token) return;
@@ -32,14 +37,49 @@ const CotizacionesList = ({ refreshTrigger }) => {
             if (!response.ok) throw new Error('No se pudieron cargar las cotizaciones.');
             const data = await response.json();
             setCotizaciones(data);
+            setNextCursor(response.headers.get('X-Next-Cursor'));
         } catch (err) { setError(err.message); }
         finally { setLoading(false); }
     };
 
+    const fetchMoreCotizaciones = async () => {
+        if (!token || !nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const response = await fetch(`${API_URL}/cotizaciones/?cursor=${nextCursor}`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (!response.ok) throw new Error('No se pudieron cargar más cotizaciones.');
+            const data = await response.json();
+            setCotizaciones(prev => [...prev, ...data]);
+            setNextCursor(response.headers.get('X-Next-Cursor'));
+        } catch (err) { setError(err.message); }
+        finally { setLoadingMore(false); }
+    };
+
     useEffect(() => {
         fetchCotizaciones();
     }, [token, refreshTrigger]);
 
+    // Busca por cliente, documento, N° o producto en todas las cotizaciones (no solo las cargadas).
+    const searchCotizaciones = async () => {
+        const query = searchTerm.trim();
+        if (!token || query.length < 2) { setSearchResults(null); return; }
+        try {
+            const response = await fetch(`${API_URL}/cotizaciones/search?${new URLSearchParams({ q: query }).toString()}`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (!response.ok) throw new Error('No se pudo realizar la búsqueda.');
+            setSearchResults(await response.json());
+        } catch (err) { setError(err.message); }
+    };
+
+    useEffect(() => {
+        // Se espera a que el usuario deje de escribir antes de consultar.
+        const timeout = setTimeout(searchCotizaciones, 300);
+        return () => clearTimeout(timeout);
+    }, [token, searchTerm, refreshTrigger]);
+
     const handleDownloadPdf = async (cot) => {
         try {
             // Usamos la API_URL importada
@@ -75,6 +115,7 @@ const CotizacionesList = ({ refreshTrigger }) => {
             });
             if (!response.ok) throw new Error('Error al eliminar la cotización.');
             fetchCotizaciones();
+            searchCotizaciones();
         } catch (err) {
             setError(err.message);
         } finally {
@@ -85,6 +126,7 @@ const CotizacionesList = ({ refreshTrigger }) => {
     const handleEditSuccess = () => {
         setEditingCotizacionId(null);
         fetchCotizaciones();
+        searchCotizaciones();
     };
 
     const getCurrencySymbol = (moneda) => {
@@ -106,10 +148,7 @@ const CotizacionesList = ({ refreshTrigger }) => {
         }
     };
 
-    const filteredCotizaciones = cotizaciones.filter(cot =>
-        cot.nombre_cliente.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        cot.numero_cotizacion.includes(searchTerm)
-    );
+    const filteredCotizaciones = searchResults ?? cotizaciones;
 
     if (loading) {
         return <LoadingSpinner message="Cargando cotizaciones..." />;
@@ -127,7 +166,7 @@ const CotizacionesList = ({ refreshTrigger }) => {
                     <div className="relative">
                         <input 
                             type="text"
-                            placeholder="Buscar por cliente o N°..."
+                            placeholder="Buscar por cliente, N° o producto..."
                             value={searchTerm}
                             onChange={(e) => setSearchTerm(e.target.value)}
                             className="pl-10 pr-4 py-2 border border-gray-300 dark:border-gray-600 rounded-full shadow-sm focus:outline-none focus:ring-2 focus:ring-blue-500 dark:bg-gray-700 text-gray-800 dark:text-gray-200"
@@ -192,6 +231,17 @@ const CotizacionesList = ({ refreshTrigger }) => {
                         </table>
                     </div>
                 )}
+                {nextCursor && !searchResults && (
+                    <div className="text-center mt-6">
+                        <button
+                            onClick={fetchMoreCotizaciones}
+                            disabled={loadingMore}
+                            className="px-6 py-2 rounded-full border border-gray-300 dark:border-gray-600 text-gray-700 dark:text-gray-200 hover:bg-gray-100 dark:hover:bg-gray-700 disabled:opacity-50 transition-colors duration-200"
+                        >
+                            {loadingMore ? 'Cargando...' : 'Cargar más'}
+                        </button>
+                    </div>
+                )}
             </div>
             {editingCotizacionId && (
                 <EditModal 
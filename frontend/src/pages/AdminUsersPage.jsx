@@ -165,14 +165,28 @@ const AdminUsersPage = () => {
     const [viewingUserId, setViewingUserId] = useState(null);
     const [deactivatingUser, setDeactivatingUser] = useState(null);
     const [searchTerm, setSearchTerm] = useState('');
+    const [sort, setSort] = useState('creation_date:desc');
+    // Cursor de la siguiente página (cabecera X-Next-Cursor); null si no hay más.
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    // La búsqueda, el orden y la paginación se resuelven en el servidor.
+    const buildUsersUrl = (cursor = null) => {
+        const [sortField, order] = sort.split(':');
+        const params = new URLSearchParams({ sort: sortField, order });
+        if (searchTerm.trim()) params.set('search', searchTerm.trim());
+        if (cursor) params.set('cursor', cursor);
+        return `${API_URL}/admin/users/?${params.toString()}`;
+    };
 
     const fetchUsers = async () => {
         setLoading(true);
         try {
-            const response = await fetch(`${API_URL}/admin/users/`, { headers: { 'Authorization': `Bearer ${token}` } });
+            const response = await fetch(buildUsersUrl(), { headers: { 'Authorization': `Bearer ${token}` } });
             if (!response.ok) throw new Error('No se pudo cargar la lista de usuarios.');
             const data = await response.json();
             setUsers(data);
+            setNextCursor(response.headers.get('X-Next-Cursor'));
         } catch (err) {
             addToast(err.message, 'error');
         } finally {
@@ -180,7 +194,27 @@ const AdminUsersPage = () => {
         }
     };
 
-    useEffect(() => { fetchUsers(); }, [token]);
+    const fetchMoreUsers = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const response = await fetch(buildUsersUrl(nextCursor), { headers: { 'Authorization': `Bearer ${token}` } });
+            if (!response.ok) throw new Error('No se pudieron cargar más usuarios.');
+            const data = await response.json();
+            setUsers(prev => [...prev, ...data]);
+            setNextCursor(response.headers.get('X-Next-Cursor'));
+        } catch (err) {
+            addToast(err.message, 'error');
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    useEffect(() => {
+        // Se espera a que el usuario deje de escribir antes de consultar.
+        const timeout = setTimeout(fetchUsers, 300);
+        return () => clearTimeout(timeout);
+    }, [token, searchTerm, sort]);
 
     const handleToggleActive = async (user) => {
         try {
@@ -234,23 +268,31 @@ const AdminUsersPage = () => {
 
     const formatDate = (dateString) => new Date(dateString).toLocaleDateString('es-ES');
     
-    const filteredUsers = users.filter(user =>
-        user.email.toLowerCase().includes(searchTerm.toLowerCase())
-    );
-
     return (
         <div className="animate-fade-in">
             <div className="flex flex-col sm:flex-row sm:justify-between sm:items-center mb-6 gap-4">
                 <h2 className="text-2xl font-bold text-gray-800 dark:text-gray-200">Gestionar Usuarios</h2>
-                <div className="relative w-full sm:w-auto">
-                    <input
-                        type="text"
-                        placeholder="Buscar por email..."
-                        value={searchTerm}
-                        onChange={(e) => setSearchTerm(e.target.value)}
-                        className="w-full pl-10 pr-4 py-2 border border-gray-300 dark:border-gray-600 rounded-full shadow-sm focus:outline-none focus:ring-2 focus:ring-purple-500 dark:bg-gray-700 text-gray-800 dark:text-gray-200"
-                    />
-                    <svg className="w-5 h-5 text-gray-400 absolute left-3 top-1/2 -translate-y-1/2" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke="currentColor"><path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M21 21l-6-6m2-5a7 7 0 11-14 0 7 7 0 0114 0z" /></svg>
+                <div className="flex flex-col sm:flex-row gap-3 w-full sm:w-auto">
+                    <select
+                        value={sort}
+                        onChange={(e) => setSort(e.target.value)}
+                        className="px-4 py-2 border border-gray-300 dark:border-gray-600 rounded-full shadow-sm focus:outline-none focus:ring-2 focus:ring-purple-500 dark:bg-gray-700 text-gray-800 dark:text-gray-200"
+                    >
+                        <option value="creation_date:desc">Más recientes</option>
+                        <option value="creation_date:asc">Más antiguos</option>
+                        <option value="cotizaciones_count:desc">Más cotizaciones</option>
+                        <option value="cotizaciones_count:asc">Menos cotizaciones</option>
+                    </select>
+                    <div className="relative w-full sm:w-auto">
+                        <input
+                            type="text"
+                            placeholder="Buscar por email o negocio..."
+                            value={searchTerm}
+                            onChange={(e) => setSearchTerm(e.target.value)}
+                            className="w-full pl-10 pr-4 py-2 border border-gray-300 dark:border-gray-600 rounded-full shadow-sm focus:outline-none focus:ring-2 focus:ring-purple-500 dark:bg-gray-700 text-gray-800 dark:text-gray-200"
+                        />
+                        <svg className="w-5 h-5 text-gray-400 absolute left-3 top-1/2 -translate-y-1/2" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke="currentColor"><path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M21 21l-6-6m2-5a7 7 0 11-14 0 7 7 0 0114 0z" /></svg>
+                    </div>
                 </div>
             </div>
 
@@ -268,7 +310,7 @@ const AdminUsersPage = () => {
                                 </tr>
                             </thead>
                             <tbody className="divide-y divide-gray-200 dark:divide-gray-700">
-                                {filteredUsers.map((user, index) => (
+                                {users.map((user, index) => (
                                     <tr key={user.id} className="hover:bg-gray-50 dark:hover:bg-gray-700/30 transition-colors staggered-fade-in-up" style={{ '--stagger-delay': `${index * 50}ms` }}>
                                         <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900 dark:text-gray-100">
                                             <div className="flex flex-col">
@@ -305,6 +347,17 @@ const AdminUsersPage = () => {
                     </div>
                 )}
             </div>
+            {!loading && nextCursor && (
+                <div className="text-center mt-6">
+                    <button
+                        onClick={fetchMoreUsers}
+                        disabled={loadingMore}
+                        className="px-6 py-2 rounded-full border border-gray-300 dark:border-gray-600 text-gray-700 dark:text-gray-200 hover:bg-gray-100 dark:hover:bg-gray-700 disabled:opacity-50 transition-colors duration-200"
+                    >
+                        {loadingMore ? 'Cargando...' : 'Cargar más'}
+                    </button>
+                </div>
+            )}
             <ConfirmModal isOpen={!!deletingUser} onClose={() => setDeletingUser(null)} onConfirm={confirmDelete} title="Eliminar Usuario" message={`¿Estás seguro de que quieres eliminar la cuenta de ${deletingUser?.email}? Esta acción no se puede deshacer.`} />
             <DeactivationModal isOpen={!!deactivatingUser} onClose={() => setDeactivatingUser(null)} onConfirm={handleConfirmDeactivation} userEmail={deactivatingUser?.email} />
             {viewingUserId && <UserDetailsModal userId={viewingUserId} onClose={() => setViewingUserId(null)} token={token} />}
@@ -307,7 +307,7 @@ const ProfilePage = () => {
                                 <div className="space-y-2">
                                     <label className={labelStyles}>Logo Actual</label>
                                     <div className="p-4 border border-dashed rounded-md">
-                                        <img src={`${API_URL}/logos/${user.logo_filename}?t=${new Date().getTime()}`} alt="Logo del negocio" className="max-h-24 rounded-md"/>
+                                        <img src={`${API_URL}/logos/${user.logo_filename}`} alt="Logo del negocio" className="max-h-24 rounded-md"/>
                                     </div>
                                 </div>
                             )}